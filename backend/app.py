@@ -8,11 +8,13 @@ load_dotenv()
 
 # Import routes
 from routes.auth_routes import auth_bp
-from routes.image_routes import image_bp
 from routes.recipe_routes import recipe_bp
+from utils.metrics import collect_metrics
+from utils.json_response import MongoJSONProvider
 
 # Create Flask app
 app = Flask(__name__)
+app.json = MongoJSONProvider(app)
 
 # Configuration
 app.config['SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'default-secret-key')
@@ -22,10 +24,26 @@ app.config['UPLOAD_FOLDER'] = os.getenv('UPLOAD_FOLDER', 'uploads')
 # Enable CORS
 CORS(app, resources={r"/api/*": {"origins": "*"}})
 
+# Vision routes can be disabled for workers that only serve recipe traffic
+VISION_ENABLED = os.getenv('VISION_ENABLED', 'True') == 'True'
+
 # Register blueprints
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
-app.register_blueprint(image_bp, url_prefix='/api/image')
 app.register_blueprint(recipe_bp, url_prefix='/api/recipes')
+if VISION_ENABLED:
+    from routes.image_routes import image_bp
+    app.register_blueprint(image_bp, url_prefix='/api/image')
+
+# Create MongoDB indexes once per worker
+if os.getenv('MONGO_ENSURE_INDEXES', 'True') == 'True':
+    from models.database import ensure_indexes
+    ensure_indexes()
+
+# Load and warm up the recognition model when the worker starts
+MODEL_EAGER_LOAD = os.getenv('MODEL_EAGER_LOAD', 'True') == 'True'
+if VISION_ENABLED and MODEL_EAGER_LOAD:
+    from models.ingredient_recognition import start_model_loading
+    start_model_loading()
 
 # Root route
 @app.route('/')
@@ -45,6 +63,25 @@ def index():
 def health():
     return jsonify({'status': 'healthy'}), 200
 
+# Readiness check (200 only once the model is loaded and warmed up; with
+# eager loading disabled the model loads on the first request, so the
+# worker is ready at once)
+@app.route('/ready')
+def ready():
+    if not VISION_ENABLED:
+        return jsonify({'ready': True, 'state': 'vision_disabled'}), 200
+    
+    from models.ingredient_recognition import get_model_status
+    status = get_model_status()
+    if not MODEL_EAGER_LOAD:
+        status['ready'] = True
+    return jsonify(status), 200 if status['ready'] else 503
+
+# Metrics
+@app.route('/metrics')
+def metrics():
+    return jsonify(collect_metrics()), 200
+
 # Error handlers
 @app.errorhandler(404)
 def not_found(error):
@@ -1,25 +1,58 @@
 from pymongo import MongoClient
+from bson import ObjectId
 from dotenv import load_dotenv
+import copy
 import os
+from utils.cache import TTLLRUCache
+from utils.metrics import register_metrics
+from utils.mongo_metrics import command_metrics, pool_metrics
+from utils.recipe_index import invalidate_recipe_index
 
 load_dotenv()
 
 # MongoDB Connection
 MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/intelligent_recipe')
-client = MongoClient(MONGO_URI)
+client = MongoClient(MONGO_URI, event_listeners=[command_metrics, pool_metrics])
 db = client['intelligent_recipe']
 
 # Collections
 users_collection = db['users']
 recipes_collection = db['recipes']
 user_preferences_collection = db['user_preferences']
+recognition_jobs_collection = db['recognition_jobs']
 
-# Create indexes for better query performance
-users_collection.create_index('username', unique=True)
-users_collection.create_index('email', unique=True)
-recipes_collection.create_index('name')
-recipes_collection.create_index('cuisine')
-recipes_collection.create_index('dietary_type')
+# Case-insensitive multikey index used by the aggregation matching engine.
+# Queries only use it when they run with the same collation.
+INGREDIENT_COLLATION = {'locale': 'en', 'strength': 2}
+
+def ensure_indexes():
+    """
+    Create indexes for better query performance
+    
+    Called once at app startup rather than on import, so importing this
+    module does not block on a round trip to MongoDB.
+    """
+    users_collection.create_index('username', unique=True)
+    users_collection.create_index('email', unique=True)
+    recipes_collection.create_index('name')
+    recipes_collection.create_index('cuisine')
+    recipes_collection.create_index('dietary_type')
+    recipes_collection.create_index(
+        'ingredients.name',
+        name='ingredients_name_ci',
+        collation=INGREDIENT_COLLATION
+    )
+    RecipeDB.trim_ingredient_names()
+    recognition_jobs_collection.create_index([('status', 1), ('created_at', 1)])
+    recognition_jobs_collection.create_index('expires_at', expireAfterSeconds=0)
+
+# Read-through cache for single-recipe lookups (detail and nutrition pages).
+# Invalidation is per process; the TTL bounds staleness across workers.
+recipe_cache = TTLLRUCache(
+    max_size=int(os.getenv('RECIPE_CACHE_SIZE', 256)),
+    ttl=float(os.getenv('RECIPE_CACHE_TTL', 300))
+)
+register_metrics('recipe_cache', recipe_cache.stats)
 
 def get_db():
     """Get database instance"""
@@ -34,18 +67,77 @@ class RecipeDB:
     @staticmethod
     def create_recipe(recipe_data):
         """Insert a new recipe"""
+        # Ingredient matching compares trimmed names on the index
+        for ingredient in recipe_data.get('ingredients') or []:
+            if isinstance(ingredient, dict) and isinstance(ingredient.get('name'), str):
+                ingredient['name'] = ingredient['name'].strip()
+        
         result = recipes_collection.insert_one(recipe_data)
+        # Make the new recipe findable by dish name right away
+        invalidate_recipe_index()
         return result.inserted_id
     
+    @staticmethod
+    def trim_ingredient_names():
+        """
+        Strip whitespace around stored ingredient names
+        
+        Recipes inserted before names were trimmed at write time would never
+        match the ingredient index otherwise.
+        
+        Returns:
+            Number of recipes updated
+        """
+        result = recipes_collection.update_many(
+            {'ingredients.name': {'$regex': r'^\s|\s$'}},
+            [{'$set': {'ingredients': {'$map': {
+                'input': '$ingredients',
+                'as': 'ing',
+                'in': {'$cond': [
+                    {'$eq': [{'$type': '$$ing.name'}, 'string']},
+                    {'$mergeObjects': ['$$ing', {'name': {'$trim': {'input': '$$ing.name'}}}]},
+                    '$$ing'
+                ]}
+            }}}}]
+        )
+        if result.modified_count:
+            recipe_cache.clear()
+            invalidate_recipe_index()
+        return result.modified_count
+    
     @staticmethod
     def get_recipe_by_id(recipe_id):
-        """Get recipe by ID"""
-        from bson import ObjectId
-        return recipes_collection.find_one({'_id': ObjectId(recipe_id)})
+        """Get recipe by ID (served from the LRU cache when possible)"""
+        key = ObjectId(recipe_id)
+        recipe = recipe_cache.get(key)
+        
+        if recipe is None:
+            recipe = recipes_collection.find_one({'_id': key})
+            if recipe is None:
+                return None
+            recipe_cache.set(key, recipe)
+        
+        # Callers mutate the returned document, so never hand out the cached one
+        return copy.deepcopy(recipe)
     
     @staticmethod
-    def search_recipes(filters=None):
-        """Search recipes with optional filters"""
+    def update_recipe_nutrition(recipe_id, nutrition):
+        """Store calculated nutrition on a recipe"""
+        result = recipes_collection.update_one(
+            {'_id': ObjectId(recipe_id)},
+            {'$set': {'nutrition': nutrition}}
+        )
+        RecipeDB.invalidate_recipe(recipe_id)
+        return result
+    
+    @staticmethod
+    def invalidate_recipe(recipe_id):
+        """Drop a recipe from the lookup cache (call from every recipe write path)"""
+        recipe_cache.invalidate(ObjectId(recipe_id))
+    
+    @staticmethod
+    def build_search_query(filters=None):
+        """Build a Mongo query from search filters"""
         query = {}
         if filters:
             if filters.get('cuisine'):
@@ -54,13 +146,43 @@ class RecipeDB:
                 query['dietary_type'] = filters['dietary_type']
             if filters.get('max_cooking_time'):
                 query['cooking_time'] = {'$lte': int(filters['max_cooking_time'])}
-        
-        return list(recipes_collection.find(query))
+        return query
+    
+    @staticmethod
+    def search_recipes(filters=None):
+        """Search recipes with optional filters"""
+        return list(RecipeDB.iter_recipes(filters))
+    
+    @staticmethod
+    def iter_recipes(filters=None):
+        """Get a cursor over recipes matching optional filters"""
+        return recipes_collection.find(RecipeDB.build_search_query(filters))
+    
+    @staticmethod
+    def aggregate_by_ingredients(pipeline):
+        """Run an ingredient matching pipeline using the ingredient index collation"""
+        return list(recipes_collection.aggregate(pipeline, collation=INGREDIENT_COLLATION))
     
     @staticmethod
     def get_all_recipes():
         """Get all recipes"""
         return list(recipes_collection.find())
+    
+    @staticmethod
+    def get_recipe_summaries():
+        """Get _id, name and category of every recipe (for the recipe token index)"""
+        return list(recipes_collection.find({}, {'name': 1, 'category': 1}))
+    
+    @staticmethod
+    def get_recipes_by_ids(recipe_ids):
+        """Get recipes by ID, in the order the IDs were given"""
+        recipes = {recipe['_id']: recipe for recipe in recipes_collection.find({'_id': {'$in': list(recipe_ids)}})}
+        return [recipes[recipe_id] for recipe_id in recipe_ids if recipe_id in recipes]
+    
+    @staticmethod
+    def sample_recipes(count):
+        """Get up to count random recipes"""
+        return list(recipes_collection.aggregate([{'$sample': {'size': count}}]))
 
 class UserDB:
     @staticmethod
@@ -77,13 +199,11 @@ class UserDB:
     @staticmethod
     def get_user_by_id(user_id):
         """Get user by ID"""
-        from bson import ObjectId
         return users_collection.find_one({'_id': ObjectId(user_id)})
     
     @staticmethod
     def update_user(user_id, update_data):
         """Update user data"""
-        from bson import ObjectId
         return users_collection.update_one(
             {'_id': ObjectId(user_id)},
             {'$set': update_data}
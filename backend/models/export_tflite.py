@@ -0,0 +1,201 @@
+import tensorflow as tf
+import numpy as np
+import argparse
+import json
+import os
+import random
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.ingredient_recognition import IngredientRecognitionModel, TFLiteIngredientModel, top_k_indices
+from utils.image_preprocessing import prepare_image_tensor
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+def list_images(data_dir, limit, seed=0, exclude=None):
+    """
+    Sample image paths evenly across the class folders of a training directory
+
+    Args:
+        data_dir: Directory with one folder per class
+        limit: Maximum number of images to return
+        seed: Random seed for reproducible sampling
+        exclude: Optional set of paths to skip (e.g. calibration images)
+
+    Returns:
+        List of image paths
+    """
+    rng = random.Random(seed)
+    exclude = exclude or set()
+
+    per_class = []
+    for class_name in sorted(os.listdir(data_dir)):
+        class_dir = os.path.join(data_dir, class_name)
+        if not os.path.isdir(class_dir):
+            continue
+        images = [os.path.join(class_dir, f) for f in sorted(os.listdir(class_dir))
+                  if f.lower().endswith(IMAGE_EXTENSIONS)]
+        images = [path for path in images if path not in exclude]
+        rng.shuffle(images)
+        per_class.append(images)
+
+    # Round-robin across classes so every class is represented
+    selected = []
+    while len(selected) < limit and any(per_class):
+        for images in per_class:
+            if images and len(selected) < limit:
+                selected.append(images.pop())
+
+    return selected
+
+def representative_dataset(image_paths):
+    """
+    Build the calibration generator used for full-int8 quantization
+
+    Args:
+        image_paths: List of calibration image paths
+
+    Returns:
+        Generator function yielding single preprocessed images
+    """
+    def generator():
+        for path in image_paths:
+            yield [prepare_image_tensor(path).astype(np.float32)]
+    return generator
+
+def convert_dynamic_range(keras_model):
+    """Convert with dynamic-range quantization (int8 weights, float activations)"""
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    return converter.convert()
+
+def convert_full_int8(keras_model, calibration_paths):
+    """Convert with full-integer quantization (int8 weights, activations and I/O)"""
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset(calibration_paths)
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.int8
+    converter.inference_output_type = tf.int8
+    return converter.convert()
+
+def evaluate_agreement(float_model, tflite_path, image_paths, top_k=5):
+    """
+    Compare a TFLite model against the float Keras model
+
+    Args:
+        float_model: Loaded IngredientRecognitionModel
+        tflite_path: Path to the .tflite model
+        image_paths: Evaluation image paths
+        top_k: Size of the top-k sets compared
+
+    Returns:
+        Dictionary with top-1 agreement and top-k overlap
+    """
+    tflite_model = TFLiteIngredientModel(tflite_path)
+
+    top1_agree = 0
+    float_top1_in_topk = 0
+    overlap_total = 0.0
+
+    for path in image_paths:
+        tensor = prepare_image_tensor(path)
+        float_probs = float_model.predict_probabilities(tensor)[0]
+        tflite_probs = tflite_model.predict_probabilities(tensor)[0]
+
+        float_top = list(top_k_indices(float_probs, top_k))
+        tflite_top = list(top_k_indices(tflite_probs, top_k))
+
+        top1_agree += int(float_top[0] == tflite_top[0])
+        float_top1_in_topk += int(float_top[0] in tflite_top)
+        overlap_total += len(set(float_top) & set(tflite_top)) / len(float_top)
+
+    count = max(len(image_paths), 1)
+    return {
+        'images': len(image_paths),
+        'top1_agreement': round(top1_agree / count, 4),
+        f'float_top1_in_top{top_k}': round(float_top1_in_topk / count, 4),
+        f'top{top_k}_overlap': round(overlap_total / count, 4),
+        'size_bytes': os.path.getsize(tflite_path)
+    }
+
+def export_tflite(model_path, data_dir, output_dir, num_calibration=200, num_eval=200, top_k=5):
+    """
+    Export the Keras model to dynamic-range and full-int8 TFLite models
+
+    Args:
+        model_path: Path to the trained .h5 model
+        data_dir: Training directory used for calibration and evaluation images
+        output_dir: Directory where .tflite files and the report are written
+        num_calibration: Number of calibration images
+        num_eval: Number of held-out images used to measure agreement
+        top_k: Size of the top-k sets compared in the report
+    """
+    print("=" * 50)
+    print("TFLITE EXPORT")
+    print("=" * 50)
+
+    float_model = IngredientRecognitionModel(model_path=model_path)
+    os.makedirs(output_dir, exist_ok=True)
+
+    calibration_paths = list_images(data_dir, num_calibration, seed=0)
+    eval_paths = list_images(data_dir, num_eval, seed=1, exclude=set(calibration_paths))
+    print(f"Calibration images: {len(calibration_paths)}")
+    print(f"Evaluation images: {len(eval_paths)}")
+
+    outputs = {
+        'dynamic': (os.path.join(output_dir, 'ingredient_model_dynamic.tflite'),
+                    lambda: convert_dynamic_range(float_model.model)),
+        'int8': (os.path.join(output_dir, 'ingredient_model_int8.tflite'),
+                 lambda: convert_full_int8(float_model.model, calibration_paths))
+    }
+
+    report = {
+        'source_model': model_path,
+        'source_size_bytes': os.path.getsize(model_path),
+        'variants': {}
+    }
+
+    for variant, (path, convert) in outputs.items():
+        print(f"\nConverting {variant} model...")
+        with open(path, 'wb') as f:
+            f.write(convert())
+        print(f"Saved {path}")
+
+        report['variants'][variant] = evaluate_agreement(float_model, path, eval_paths, top_k=top_k)
+        print(json.dumps(report['variants'][variant], indent=2))
+
+    report_path = os.path.join(output_dir, 'tflite_export_report.json')
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+    print("\n" + "=" * 50)
+    print("EXPORT COMPLETE")
+    print("=" * 50)
+    print(f"Report saved to: {report_path}")
+    print("Serve with: MODEL_BACKEND=tflite TFLITE_MODEL_PATH=<path> [TFLITE_NUM_THREADS=N]")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export ingredient model to quantized TFLite')
+    parser.add_argument('--model', default='models/ingredient_model.h5')
+    parser.add_argument('--data-dir', default='data/ingredients')
+    parser.add_argument('--output-dir', default='models')
+    parser.add_argument('--num-calibration', type=int, default=200)
+    parser.add_argument('--num-eval', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=5)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.data_dir):
+        print(f"Error: Data directory '{args.data_dir}' not found!")
+        sys.exit(1)
+
+    export_tflite(
+        args.model,
+        args.data_dir,
+        args.output_dir,
+        num_calibration=args.num_calibration,
+        num_eval=args.num_eval,
+        top_k=args.top_k
+    )
@@ -0,0 +1,436 @@
+"""
+Shared inference server
+
+Loads the recognition model once in a dedicated process and serves
+predictions to web workers over a local Unix socket, so a node holds one
+copy of TensorFlow and the model weights instead of one per gunicorn worker.
+
+Start the server, then point the web workers at it:
+
+    export INFERENCE_AUTHKEY=<shared secret>
+    python -m models.inference_server --socket /tmp/intelligent_recipe/inference.sock
+    INFERENCE_SOCKET=/tmp/intelligent_recipe/inference.sock gunicorn -w 4 app:app
+
+Requests are pickled over multiprocessing.connection, so the server only
+accepts clients presenting INFERENCE_AUTHKEY (it refuses to start without
+one) and its socket is only accessible to the user running it. Single images arriving from different workers are
+micro-batched inside the server when INFERENCE_BATCHING is enabled.
+
+Every prediction reply carries the class names and version of the model
+that produced it, so clients decode correctly across a hot-swap.
+"""
+import argparse
+import os
+import queue
+import threading
+import time
+from multiprocessing.connection import Listener, Client, AuthenticationError
+import numpy as np
+from models.ingredient_recognition import BaseRecognitionModel
+from utils.image_preprocessing import fill_tensor_slot
+
+INFERENCE_AUTHKEY = os.getenv('INFERENCE_AUTHKEY', '').encode()
+INFERENCE_INFO_TTL = float(os.getenv('INFERENCE_INFO_TTL', 30))
+INFERENCE_CALL_TIMEOUT = float(os.getenv('INFERENCE_CALL_TIMEOUT', 30))
+DEFAULT_SOCKET = '/tmp/intelligent_recipe/inference.sock'
+
+def require_authkey(authkey):
+    """
+    Refuse to use the inference socket without a shared secret
+
+    Raises:
+        ValueError: If authkey is empty
+    """
+    if not authkey:
+        raise ValueError('INFERENCE_AUTHKEY is not set; the inference server needs a shared secret')
+
+def to_model_batch(batch):
+    """
+    Convert a received batch into a float32 model tensor
+
+    uint8 pixel batches (4x smaller to send) are scaled into a new float32
+    array in place; float batches are assumed to be normalized already.
+
+    Args:
+        batch: numpy array of shape (N, H, W, 3)
+
+    Returns:
+        float32 numpy array scaled to [-1, 1]
+    """
+    batch = np.asarray(batch)
+    if batch.dtype == np.uint8:
+        return fill_tensor_slot(batch, np.empty(batch.shape, dtype=np.float32))
+    return batch.astype(np.float32, copy=False)
+
+PREDICT_OPS = ('predict', 'predict_joint', 'predict_embed')
+
+def reply_labels(labels, version):
+    """
+    Build the labels sent with a prediction reply
+
+    Args:
+        labels: Labels dictionary of the model that ran the prediction
+        version: Version tag of the serving model
+
+    Returns:
+        Dictionary with 'class_names', 'dish_class_names' and 'version'
+    """
+    return {
+        'class_names': list(labels['class_names']),
+        'dish_class_names': list(labels['dish_class_names']),
+        'version': version
+    }
+
+def handle_connection(conn, model_fn, info_fn, batcher=None, version_fn=None):
+    """
+    Serve requests from one client connection until it closes
+
+    Replies are ('ok', value, labels) or ('error', message, None); labels
+    are only set for predictions.
+
+    Args:
+        conn: multiprocessing.connection.Connection
+        model_fn: Callable returning the current recognition model (looked
+                  up per request so a hot-swapped model takes over)
+        info_fn: Callable returning the server info dictionary
+        batcher: Optional InferenceBatcher for single-image requests
+        version_fn: Callable returning the serving model's version tag
+    """
+    try:
+        while True:
+            try:
+                request = conn.recv()
+            except (EOFError, OSError):
+                break
+
+            try:
+                op = request[0]
+                if op in PREDICT_OPS:
+                    batch = to_model_batch(request[1])
+                    if op == 'predict' and batcher is not None and len(batch) == 1:
+                        batch_model, row = batcher.predict(batch)
+                        outputs, labels = row[np.newaxis], batch_model.labels()
+                    else:
+                        outputs, labels = model_fn().predict_labeled(op, batch)
+
+                    if isinstance(outputs, tuple):
+                        outputs = tuple(np.asarray(output) for output in outputs)
+                    else:
+                        outputs = np.asarray(outputs)
+                    version = version_fn() if version_fn is not None else None
+                    conn.send(('ok', outputs, reply_labels(labels, version)))
+                elif op == 'info':
+                    conn.send(('ok', info_fn(), None))
+                else:
+                    conn.send(('error', f'Unknown operation: {op}', None))
+            except Exception as e:
+                print(f"Inference request failed: {e}")
+                conn.send(('error', str(e), None))
+    finally:
+        conn.close()
+
+def serve_forever(listener, model_fn, info_fn, batcher=None, version_fn=None):
+    """
+    Accept client connections and serve each on its own thread
+
+    Args:
+        listener: multiprocessing.connection.Listener
+        model_fn: Callable returning the current recognition model
+        info_fn: Callable returning the server info dictionary
+        batcher: Optional InferenceBatcher for single-image requests
+        version_fn: Callable returning the serving model's version tag
+    """
+    while True:
+        try:
+            conn = listener.accept()
+        except AuthenticationError as e:
+            print(f"Rejected inference client: {e}")
+            continue
+        except OSError:
+            # Listener closed
+            break
+
+        threading.Thread(
+            target=handle_connection,
+            args=(conn, model_fn, info_fn, batcher, version_fn),
+            name='inference-connection',
+            daemon=True
+        ).start()
+
+def bind_listener(address, authkey):
+    """
+    Listen on a Unix socket only this user can connect to
+
+    The socket's directory is created with mode 0700 if it does not exist,
+    and the socket itself is created with mode 0600 (the umask is tightened
+    around bind, so it is never briefly open to other users).
+
+    Args:
+        address: Socket path
+        authkey: Shared secret clients must present
+
+    Returns:
+        multiprocessing.connection.Listener
+    """
+    directory = os.path.dirname(address)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory, mode=0o700)
+
+    # Remove a stale socket left behind by a previous run
+    if os.path.exists(address):
+        os.remove(address)
+
+    previous_umask = os.umask(0o177)
+    try:
+        listener = Listener(address, family='AF_UNIX', authkey=authkey)
+    finally:
+        os.umask(previous_umask)
+    os.chmod(address, 0o600)
+    return listener
+
+def serve(address, authkey=INFERENCE_AUTHKEY):
+    """
+    Load the model and serve it on a Unix socket
+
+    Args:
+        address: Socket path
+        authkey: Shared secret clients must present
+    """
+    try:
+        require_authkey(authkey)
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+    import models.ingredient_recognition as recognition
+
+    # This process is the inference server: always load the model locally
+    recognition.INFERENCE_SOCKET = ''
+    recognition._model_status['backend'] = recognition.MODEL_BACKEND
+
+    if not recognition.load_and_warmup_model():
+        raise SystemExit(1)
+
+    batcher = recognition.get_batcher() if recognition.INFERENCE_BATCHING else None
+    recognition.start_registry_watcher()
+
+    def info():
+        # Look the model up per request: the registry watcher may swap it
+        model = recognition.get_model()
+        return {
+            'class_names': list(model.class_names),
+            'dish_class_names': list(model.dish_class_names),
+            'has_dish_head': model.has_dish_head,
+            'supports_embeddings': model.supports_embeddings,
+            'backbone_version': recognition.get_backbone_version(),
+            'version': recognition.get_model_version(),
+            'status': recognition.get_model_status(),
+            'pid': os.getpid()
+        }
+
+    listener = bind_listener(address, authkey)
+    print(f"Inference server (pid {os.getpid()}) listening on {address}")
+    try:
+        serve_forever(listener, recognition.get_model, info, batcher, recognition.get_model_version)
+    finally:
+        listener.close()
+
+class RemoteRecognitionModel(BaseRecognitionModel):
+    def __init__(self, address, authkey=INFERENCE_AUTHKEY, info_ttl=INFERENCE_INFO_TTL, timeout=INFERENCE_CALL_TIMEOUT):
+        """
+        Recognition model client for the shared inference server
+
+        Keeps a small pool of connections so concurrent request threads do
+        not share one connection.
+
+        Args:
+            address: Server socket path
+            authkey: Shared secret
+            info_ttl: Seconds server info (status, capabilities) is cached;
+                      class names and version are also refreshed from
+                      every prediction reply
+            timeout: Seconds to wait for a reply before giving up
+
+        Raises:
+            ValueError: If authkey is empty
+        """
+        require_authkey(authkey)
+        self.address = address
+        self.authkey = authkey
+        self.info_ttl = info_ttl
+        self.timeout = timeout
+        self._connections = queue.LifoQueue()
+        self._info = None
+        self._info_time = 0.0
+        self._info_lock = threading.Lock()
+
+    def _connect(self):
+        try:
+            return Client(self.address, family='AF_UNIX', authkey=self.authkey)
+        except OSError as e:
+            raise ConnectionError(f'Inference server unavailable at {self.address}: {e}')
+
+    def _call(self, *request):
+        """
+        Send a request, retrying once on a fresh connection if a pooled one is stale
+
+        Raises:
+            ConnectionError: If the server is unavailable or does not reply
+                             within the timeout (a hung server is not retried)
+        """
+        for attempt in range(2):
+            try:
+                conn = self._connections.get_nowait() if attempt == 0 else self._connect()
+            except queue.Empty:
+                conn = self._connect()
+
+            try:
+                conn.send(request)
+                replied = conn.poll(self.timeout)
+                if replied:
+                    status, value, labels = conn.recv()
+            except (EOFError, OSError) as e:
+                conn.close()
+                if attempt == 1:
+                    raise ConnectionError(f'Inference server unavailable: {e}')
+                continue
+
+            if not replied:
+                # A late reply would be read by the next request, so drop the connection
+                conn.close()
+                raise ConnectionError(f'Inference server did not reply within {self.timeout}s')
+
+            self._connections.put(conn)
+            if status != 'ok':
+                raise RuntimeError(f'Inference server error: {value}')
+            return value, labels
+
+    def _remember_labels(self, labels):
+        """Update the cached info when a reply comes from a different model version"""
+        with self._info_lock:
+            if self._info is not None and self._info.get('version') != labels['version']:
+                self._info = dict(self._info, **labels)
+
+    def info(self, refresh=False):
+        """
+        Get server info (class names, model version, status)
+
+        Args:
+            refresh: Ignore the cached copy
+
+        Returns:
+            Info dictionary
+        """
+        with self._info_lock:
+            if refresh or self._info is None or time.time() - self._info_time > self.info_ttl:
+                self._info = self._call('info')[0]
+                self._info_time = time.time()
+            return self._info
+
+    @property
+    def class_names(self):
+        return self.info()['class_names']
+
+    @property
+    def dish_class_names(self):
+        return self.info().get('dish_class_names', [])
+
+    @property
+    def has_dish_head(self):
+        return self.info().get('has_dish_head', False)
+
+    @property
+    def supports_embeddings(self):
+        return self.info().get('supports_embeddings', False)
+
+    @property
+    def backbone_version(self):
+        return f"remote:{self.info()['backbone_version']}"
+
+    @property
+    def version(self):
+        return f"remote:{self.info()['version']}"
+
+    def wait_until_ready(self, timeout=120.0, interval=1.0):
+        """
+        Wait for the server to come up and finish loading its model
+
+        Args:
+            timeout: Seconds to wait
+            interval: Seconds between attempts
+
+        Raises:
+            ConnectionError: If the server is not ready in time
+        """
+        deadline = time.time() + timeout
+        while True:
+            try:
+                if self.info(refresh=True)['status'].get('ready'):
+                    return
+            except (ConnectionError, OSError):
+                pass
+            if time.time() >= deadline:
+                raise ConnectionError(f'Inference server at {self.address} not ready after {timeout}s')
+            time.sleep(interval)
+
+    def predict_labeled(self, op, batch_tensor):
+        """
+        Run a prediction in the inference server
+
+        Decode the outputs with the returned labels: they belong to the model
+        that ran the prediction, even if the server swapped models since the
+        last info refresh.
+
+        Args:
+            op: 'predict', 'predict_joint' or 'predict_embed'
+            batch_tensor: Normalized float32 tensor or uint8 pixels of shape (N, H, W, 3)
+
+        Returns:
+            (outputs, labels) tuple
+        """
+        outputs, labels = self._call(op, np.asarray(batch_tensor))
+        self._remember_labels(labels)
+        return outputs, labels
+
+    def predict_probabilities(self, batch_tensor):
+        """
+        Run the model in the inference server
+
+        Args:
+            batch_tensor: Normalized float32 tensor or uint8 pixels of shape (N, H, W, 3)
+
+        Returns:
+            numpy array of shape (N, num_classes)
+        """
+        return self.predict_labeled('predict', batch_tensor)[0]
+
+    def predict_joint(self, batch_tensor):
+        """
+        Run the ingredient and dish heads in the inference server
+
+        Args:
+            batch_tensor: Normalized float32 tensor or uint8 pixels of shape (N, H, W, 3)
+
+        Returns:
+            (ingredient_probabilities, dish_probabilities) tuple
+        """
+        return self.predict_labeled('predict_joint', batch_tensor)[0]
+
+    def predict_with_embeddings(self, batch_tensor):
+        """
+        Run the ingredient head in the inference server and return the
+        pooled backbone embeddings too
+
+        Args:
+            batch_tensor: Normalized float32 tensor or uint8 pixels of shape (N, H, W, 3)
+
+        Returns:
+            (probabilities, embeddings) tuple
+        """
+        return self.predict_labeled('predict_embed', batch_tensor)[0]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve the recognition model to web workers over a Unix socket')
+    parser.add_argument('--socket', default=os.getenv('INFERENCE_SOCKET') or DEFAULT_SOCKET)
+    args = parser.parse_args()
+
+    serve(args.socket)
@@ -1,23 +1,227 @@
-import tensorflow as tf
-from tensorflow.keras.applications import MobileNetV2
-from tensorflow.keras.models import Model, load_model
-from tensorflow.keras.layers import Dense, GlobalAveragePooling2D, Dropout
+# TensorFlow is imported inside the functions that need it so processes
+# that never run inference (recipe-only workers, tests, scripts) start fast
+import hashlib
 import numpy as np
 import os
+import threading
+import time
+from PIL import Image
+from utils.image_preprocessing import image_to_tensor
+from utils.metrics import register_metrics
 
-class IngredientRecognitionModel:
-    def __init__(self, num_classes=20, model_path=None):
+IMAGE_SIZE = (224, 224)
+
+# Serving backend: 'compiled' (tf.function), 'keras' (model.predict) or 'tflite'
+MODEL_BACKEND = os.getenv('MODEL_BACKEND', 'compiled')
+
+# TensorFlow thread pools (0 lets TensorFlow choose)
+TF_INTRA_OP_THREADS = int(os.getenv('TF_INTRA_OP_THREADS', 0))
+TF_INTER_OP_THREADS = int(os.getenv('TF_INTER_OP_THREADS', 0))
+
+_threads_configured = False
+
+def configure_tf_threads():
+    """
+    Apply TF_INTRA_OP_THREADS / TF_INTER_OP_THREADS to the TensorFlow runtime
+    
+    Must run before the first TensorFlow op executes; later calls are no-ops.
+    """
+    global _threads_configured
+    if _threads_configured:
+        return
+    _threads_configured = True
+    
+    import tensorflow as tf
+    try:
+        if TF_INTRA_OP_THREADS:
+            tf.config.threading.set_intra_op_parallelism_threads(TF_INTRA_OP_THREADS)
+        if TF_INTER_OP_THREADS:
+            tf.config.threading.set_inter_op_parallelism_threads(TF_INTER_OP_THREADS)
+    except RuntimeError as e:
+        print(f"Warning: TensorFlow runtime already initialized, thread settings ignored: {e}")
+
+def top_k_indices(probabilities, k):
+    """
+    Get indices of the k largest probabilities, highest first
+    
+    Uses argpartition so only the top k values are sorted.
+    
+    Args:
+        probabilities: 1D array of class probabilities
+        k: Number of indices to return
+    
+    Returns:
+        numpy array of indices
+    """
+    k = min(k, len(probabilities))
+    if k <= 0:
+        return np.array([], dtype=int)
+    
+    top = np.argpartition(probabilities, -k)[-k:]
+    return top[np.argsort(probabilities[top])[::-1]]
+
+def load_class_names(model_path, filename='class_names.txt'):
+    """
+    Load class names stored next to a model file
+    
+    Args:
+        model_path: Path to the model file
+        filename: Name of the class names file in the model's directory
+    
+    Returns:
+        List of class names (empty if the file is missing)
+    """
+    class_names_path = os.path.join(os.path.dirname(model_path), filename)
+    if not os.path.exists(class_names_path):
+        return []
+    
+    with open(class_names_path, 'r') as f:
+        return [line.strip() for line in f if line.strip()]
+
+class BaseRecognitionModel:
+    """
+    Shared prediction helpers for recognition backends
+    
+    Subclasses provide class_names and predict_probabilities(batch_tensor).
+    Backends with a dish head also provide dish_class_names and
+    predict_joint(batch_tensor); backends exposing backbone embeddings
+    provide predict_with_embeddings(batch_tensor).
+    """
+    class_names = []
+    dish_class_names = []
+    
+    @property
+    def has_dish_head(self):
+        return False
+    
+    def predict_joint(self, batch_tensor):
+        """
+        Run the ingredient and dish heads on one shared backbone pass
+        
+        Returns:
+            (ingredient_probabilities, dish_probabilities) tuple
+        """
+        raise NotImplementedError('This recognition backend has no dish head')
+    
+    @property
+    def supports_embeddings(self):
+        return False
+    
+    def predict_with_embeddings(self, batch_tensor):
+        """
+        Run the ingredient head and return the pooled backbone embeddings too
+        
+        Returns:
+            (probabilities, embeddings) tuple
+        """
+        raise NotImplementedError('This recognition backend does not expose embeddings')
+    
+    def labels(self):
+        """Class names of both heads, for decoding this model's outputs"""
+        return {'class_names': self.class_names, 'dish_class_names': self.dish_class_names}
+    
+    def predict_labeled(self, op, batch_tensor):
+        """
+        Run a prediction and return the labels to decode its outputs with
+        
+        A remote backend may swap models between two calls, so callers decode
+        with the labels returned here instead of reading class_names after
+        predicting.
+        
+        Args:
+            op: 'predict', 'predict_joint' or 'predict_embed'
+            batch_tensor: Preprocessed tensor of shape (N, 224, 224, 3)
+        
+        Returns:
+            (outputs, labels) tuple; outputs is what predict_probabilities,
+            predict_joint or predict_with_embeddings returns and labels is a
+            dictionary with 'class_names' and 'dish_class_names'
+        """
+        if op == 'predict':
+            outputs = self.predict_probabilities(batch_tensor)
+        elif op == 'predict_joint':
+            outputs = self.predict_joint(batch_tensor)
+        elif op == 'predict_embed':
+            outputs = self.predict_with_embeddings(batch_tensor)
+        else:
+            raise ValueError(f"Unknown prediction: {op}")
+        return outputs, self.labels()
+    
+    def predict(self, image_tensor, top_k=3):
+        """
+        Predict ingredients from image tensor
+        
+        Args:
+            image_tensor: Preprocessed image tensor
+            top_k: Number of top predictions to return
+        
+        Returns:
+            List of tuples (class_name, confidence)
+        """
+        return self.predict_batch(image_tensor, top_k=top_k)[0]
+    
+    def predict_batch(self, batch_tensor, top_k=3):
+        """
+        Predict ingredients for a batch of images in one forward pass
+        
+        Args:
+            batch_tensor: Preprocessed tensor of shape (N, 224, 224, 3)
+            top_k: Number of top predictions to return per image
+        
+        Returns:
+            List of N prediction lists
+        """
+        probabilities, labels = self.predict_labeled('predict', batch_tensor)
+        return [self.decode_predictions(row, top_k=top_k, class_names=labels['class_names']) for row in probabilities]
+    
+    def decode_predictions(self, probabilities, top_k=3, class_names=None):
+        """
+        Convert one row of class probabilities to named predictions
+        
+        Args:
+            probabilities: 1D array of class probabilities
+            top_k: Number of top predictions to return
+            class_names: Labels for the row (defaults to the ingredient classes)
+        
+        Returns:
+            List of dicts with 'name' and 'confidence'
+        """
+        if class_names is None:
+            class_names = self.class_names
+        
+        results = []
+        for idx in top_k_indices(probabilities, top_k):
+            class_name = class_names[idx] if idx < len(class_names) else f"class_{idx}"
+            confidence = float(probabilities[idx])
+            results.append({
+                'name': class_name,
+                'confidence': confidence
+            })
+        
+        return results
+    
+class IngredientRecognitionModel(BaseRecognitionModel):
+    def __init__(self, num_classes=20, model_path=None, compiled=True):
         """
         Initialize the ingredient recognition model
         
         Args:
             num_classes: Number of ingredient classes
             model_path: Path to saved model (if loading existing model)
+            compiled: Serve predictions through a traced tf.function instead
+                      of model.predict
         """
         self.num_classes = num_classes
         self.model_path = model_path
         self.model = None
         self.class_names = []
+        self.compiled = compiled
+        self._serving_fn = None
+        self.joint_model = None
+        self.dish_class_names = []
+        self._joint_fn = None
+        self.embedding_model = None
+        self._embedding_fn = None
         
         if model_path and os.path.exists(model_path):
             self.load_model(model_path)
@@ -28,6 +232,10 @@ class IngredientRecognitionModel:
         """
         Build MobileNetV2 model with transfer learning
         """
+        from tensorflow.keras.applications import MobileNetV2
+        from tensorflow.keras.models import Model
+        from tensorflow.keras.layers import Dense, GlobalAveragePooling2D, Dropout
+        
         # Load pre-trained MobileNetV2
         self.base_model = MobileNetV2(
             input_shape=(224, 224, 3),
@@ -47,6 +255,7 @@ class IngredientRecognitionModel:
         
         # Create final model
         self.model = Model(inputs=self.base_model.input, outputs=predictions)
+        self._serving_fn = None
         
         # Compile model
         self.model.compile(
@@ -78,39 +287,154 @@ class IngredientRecognitionModel:
         print(f"Trainable layers in base model: {trainable_count}/{len(self.base_model.layers)}")
         
         # Recompile with lower learning rate
+        import tensorflow as tf
         self.model.compile(
             optimizer=tf.keras.optimizers.Adam(learning_rate=0.0001),
             loss='categorical_crossentropy',
             metrics=['accuracy']
         )
     
-    def predict(self, image_tensor, top_k=3):
+    def predict_probabilities(self, batch_tensor):
         """
-        Predict ingredients from image tensor
+        Run the model and return raw class probabilities
         
         Args:
-            image_tensor: Preprocessed image tensor
-            top_k: Number of top predictions to return
+            batch_tensor: Preprocessed tensor of shape (N, 224, 224, 3)
         
         Returns:
-            List of tuples (class_name, confidence)
+            numpy array of shape (N, num_classes)
         """
         if self.model is None:
             raise ValueError("Model not loaded or built")
         
-        predictions = self.model.predict(image_tensor)
-        top_indices = np.argsort(predictions[0])[-top_k:][::-1]
+        if not self.compiled:
+            return self.model.predict(batch_tensor, verbose=0)
         
-        results = []
-        for idx in top_indices:
-            class_name = self.class_names[idx] if idx < len(self.class_names) else f"class_{idx}"
-            confidence = float(predictions[0][idx])
-            results.append({
-                'name': class_name,
-                'confidence': confidence
-            })
+        if self._serving_fn is None:
+            self._build_serving_function()
         
-        return results
+        import tensorflow as tf
+        inputs = tf.convert_to_tensor(batch_tensor, dtype=tf.float32)
+        return self._serving_fn(inputs).numpy()
+    
+    def _build_serving_function(self):
+        """
+        Wrap the model in a tf.function with a fixed input signature and trace it
+        
+        Calling the traced function skips the data adapter and step machinery
+        that model.predict sets up on every call.
+        """
+        self._serving_fn = self._trace_serving_function(self.model)
+    
+    def _trace_serving_function(self, model):
+        """Trace a tf.function calling the given Keras model in inference mode"""
+        import tensorflow as tf
+        
+        @tf.function(input_signature=[
+            tf.TensorSpec(shape=(None, IMAGE_SIZE[0], IMAGE_SIZE[1], 3), dtype=tf.float32)
+        ])
+        def serve(images):
+            return model(images, training=False)
+        
+        serve.get_concrete_function()
+        return serve
+    
+    def feature_model(self):
+        """
+        Keras model from the input image to the pooled backbone features
+        
+        Returns:
+            Model whose output is the GlobalAveragePooling2D layer
+        """
+        from tensorflow.keras.models import Model
+        from tensorflow.keras.layers import GlobalAveragePooling2D
+        
+        for layer in self.model.layers:
+            if isinstance(layer, GlobalAveragePooling2D):
+                return Model(inputs=self.model.input, outputs=layer.output)
+        raise ValueError("Model has no GlobalAveragePooling2D feature layer")
+    
+    def attach_dish_head(self, head_path):
+        """
+        Attach a dish classifier head trained on this model's backbone features
+        
+        Builds a joint model whose pooled backbone features feed both the
+        ingredient head and the dish head, so one backbone pass serves both.
+        
+        Args:
+            head_path: Path to the dish head saved by models/train_dish_head.py
+        """
+        from tensorflow.keras.models import Model, load_model
+        
+        head = load_model(head_path)
+        features = self.feature_model().output
+        self.joint_model = Model(inputs=self.model.input, outputs=[self.model.output, head(features)])
+        self.dish_class_names = load_class_names(head_path, 'dish_class_names.txt')
+        self._joint_fn = self._trace_serving_function(self.joint_model) if self.compiled else None
+        print(f"Dish head loaded from {head_path} ({len(self.dish_class_names)} dishes)")
+    
+    @property
+    def has_dish_head(self):
+        return self.joint_model is not None
+    
+    def predict_joint(self, batch_tensor):
+        """
+        Run the ingredient and dish heads on one shared backbone pass
+        
+        Args:
+            batch_tensor: Preprocessed tensor of shape (N, 224, 224, 3)
+        
+        Returns:
+            (ingredient_probabilities, dish_probabilities) tuple of numpy arrays
+        """
+        if self.joint_model is None:
+            raise ValueError("No dish head attached")
+        
+        if not self.compiled:
+            ingredients, dishes = self.joint_model.predict(batch_tensor, verbose=0)
+            return ingredients, dishes
+        
+        import tensorflow as tf
+        ingredients, dishes = self._joint_fn(tf.convert_to_tensor(batch_tensor, dtype=tf.float32))
+        return ingredients.numpy(), dishes.numpy()
+    
+    def enable_embeddings(self):
+        """
+        Build a model returning both the class probabilities and the pooled
+        backbone features, for few-shot nearest-neighbour search
+        """
+        from tensorflow.keras.models import Model
+        
+        self.embedding_model = Model(
+            inputs=self.model.input,
+            outputs=[self.model.output, self.feature_model().output]
+        )
+        self._embedding_fn = self._trace_serving_function(self.embedding_model) if self.compiled else None
+    
+    @property
+    def supports_embeddings(self):
+        return self.embedding_model is not None
+    
+    def predict_with_embeddings(self, batch_tensor):
+        """
+        Run the ingredient head and return the pooled backbone embeddings too
+        
+        Args:
+            batch_tensor: Preprocessed tensor of shape (N, 224, 224, 3)
+        
+        Returns:
+            (probabilities, embeddings) tuple of numpy arrays
+        """
+        if self.embedding_model is None:
+            raise ValueError("Embeddings not enabled")
+        
+        if not self.compiled:
+            probabilities, embeddings = self.embedding_model.predict(batch_tensor, verbose=0)
+            return probabilities, embeddings
+        
+        import tensorflow as tf
+        probabilities, embeddings = self._embedding_fn(tf.convert_to_tensor(batch_tensor, dtype=tf.float32))
+        return probabilities.numpy(), embeddings.numpy()
     
     def save_model(self, path):
         """Save model to file"""
@@ -120,38 +444,697 @@ class IngredientRecognitionModel:
     
     def load_model(self, path):
         """Load model from file"""
+        from tensorflow.keras.models import load_model
         self.model = load_model(path)
+        self._serving_fn = None
         print(f"Model loaded from {path}")
         
+        # Trace the serving function once at load instead of on first request
+        if self.compiled:
+            self._build_serving_function()
+        
         # Try to load class names
-        class_names_path = os.path.join(os.path.dirname(path), 'class_names.txt')
-        if os.path.exists(class_names_path):
-            with open(class_names_path, 'r') as f:
-                self.class_names = [line.strip() for line in f if line.strip()]
+        self.class_names = load_class_names(path)
+        if self.class_names:
             print(f"Loaded {len(self.class_names)} class names")
 
-# Global model instance (lazy loading)
+class TFLiteIngredientModel(BaseRecognitionModel):
+    def __init__(self, model_path, num_threads=None):
+        """
+        Ingredient recognition backed by a TFLite model
+        
+        Supports float, dynamic-range and full-int8 models produced by
+        models/export_tflite.py. The standalone tflite_runtime package is used
+        when installed, otherwise the interpreter bundled with TensorFlow.
+        
+        Args:
+            model_path: Path to the .tflite file
+            num_threads: Interpreter thread count (None lets TFLite choose)
+        """
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+        
+        self.model_path = model_path
+        self.num_threads = num_threads
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self.class_names = load_class_names(model_path)
+        
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input['shape'][0])
+        
+        # The interpreter holds mutable tensor buffers and is not thread-safe
+        self._lock = threading.Lock()
+        print(f"TFLite model loaded from {model_path} (input {np.dtype(self._input['dtype']).name})")
+    
+    def _resize_batch(self, batch_size):
+        """Resize the interpreter input to a new batch size"""
+        shape = list(self._input['shape'])
+        shape[0] = batch_size
+        self.interpreter.resize_tensor_input(self._input['index'], shape)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = batch_size
+    
+    def predict_probabilities(self, batch_tensor):
+        """
+        Run the TFLite model and return raw class probabilities
+        
+        Args:
+            batch_tensor: Preprocessed float tensor of shape (N, 224, 224, 3)
+        
+        Returns:
+            numpy array of shape (N, num_classes)
+        """
+        batch = np.asarray(batch_tensor, dtype=np.float32)
+        
+        with self._lock:
+            if batch.shape[0] != self._batch_size:
+                self._resize_batch(batch.shape[0])
+            
+            input_dtype = self._input['dtype']
+            if input_dtype != np.float32:
+                scale, zero_point = self._input['quantization']
+                info = np.iinfo(input_dtype)
+                batch = np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(input_dtype)
+            
+            self.interpreter.set_tensor(self._input['index'], batch)
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self._output['index'])
+            
+            if self._output['dtype'] != np.float32:
+                scale, zero_point = self._output['quantization']
+                output = (output.astype(np.float32) - zero_point) * scale
+        
+        return output
+
+# TFLite backend settings (MODEL_BACKEND=tflite)
+TFLITE_MODEL_PATH = os.getenv('TFLITE_MODEL_PATH', 'models/ingredient_model_int8.tflite')
+TFLITE_NUM_THREADS = int(os.getenv('TFLITE_NUM_THREADS', 0)) or None
+
+# Refuse to serve an untrained ImageNet-initialized model unless explicitly allowed
+ALLOW_UNTRAINED_MODEL = os.getenv('ALLOW_UNTRAINED_MODEL', 'False') == 'True'
+MODEL_PATH = os.getenv('MODEL_PATH', 'models/ingredient_model.h5')
+MODEL_WARMUP_RUNS = int(os.getenv('MODEL_WARMUP_RUNS', 3))
+
+# Dish classifier head on the ingredient model's backbone (models/train_dish_head.py)
+DISH_HEAD_PATH = os.getenv('DISH_HEAD_PATH', 'models/dish_head.h5')
+
+# Send inference to a shared server process (models/inference_server.py)
+# instead of loading the model in every web worker
+INFERENCE_SOCKET = os.getenv('INFERENCE_SOCKET', '')
+INFERENCE_SERVER_WAIT = float(os.getenv('INFERENCE_SERVER_WAIT', 120))
+
+# Few-shot classes recognized by nearest-neighbour search over backbone
+# embeddings (utils/embedding_index.py)
+FEW_SHOT_ENABLED = os.getenv('FEW_SHOT_ENABLED', 'False') == 'True'
+
+# Global model instance (replaced wholesale when a new registry version is
+# swapped in; requests keep the instance they started with)
 _model_instance = None
+_model_lock = threading.Lock()
+_swap_lock = threading.Lock()
+
+# Readiness state (set once the model is loaded and warmed up)
+_model_ready = threading.Event()
+_model_status = {
+    'state': 'not_loaded',
+    'backend': 'remote' if INFERENCE_SOCKET else MODEL_BACKEND,
+    'error': None,
+    'load_seconds': None,
+    'version': None,
+    'loaded_at': None,
+    'swap': None
+}
+
+# Content hash of each weights file with the (size, mtime) it was computed for
+_weights_digests = {}
 
-def get_model(model_path='models/ingredient_model.h5'):
+def model_source(version=None, model_path=MODEL_PATH):
     """
-    Get or create model instance (singleton pattern)
+    Get the files a model is served from
+    
+    Args:
+        version: Registry version (None serves MODEL_PATH and friends, or the
+                 active registry version when MODEL_REGISTRY_DIR is set)
+        model_path: Keras model path used outside the registry
+    
+    Returns:
+        Dictionary with 'version', 'model_path', 'tflite_path' and 'dish_head_path'
+    """
+    from models.model_registry import MODEL_REGISTRY_DIR, get_active_version, version_source
+    
+    if version is None and MODEL_REGISTRY_DIR:
+        version = get_active_version(MODEL_REGISTRY_DIR)
+        if version is None:
+            print(f"Model registry {MODEL_REGISTRY_DIR} is empty, serving {model_path}")
+    
+    if version is not None:
+        return version_source(version, MODEL_REGISTRY_DIR)
+    
+    return {
+        'version': None,
+        'model_path': model_path,
+        'tflite_path': TFLITE_MODEL_PATH,
+        'dish_head_path': DISH_HEAD_PATH
+    }
+
+def _create_model(source):
+    """Create the serving model for the configured backend from a model source"""
+    if INFERENCE_SOCKET:
+        from models.inference_server import RemoteRecognitionModel
+        return RemoteRecognitionModel(INFERENCE_SOCKET)
+    
+    if MODEL_BACKEND == 'tflite':
+        model = TFLiteIngredientModel(source['tflite_path'], num_threads=TFLITE_NUM_THREADS)
+        model.source = source
+        return model
+    
+    model_path = source['model_path']
+    if not os.path.exists(model_path) and not ALLOW_UNTRAINED_MODEL:
+        raise FileNotFoundError(
+            f"Model file '{model_path}' not found. Train it with models/train_model.py "
+            "or set ALLOW_UNTRAINED_MODEL=True to serve an untrained model."
+        )
+    
+    configure_tf_threads()
+    model = IngredientRecognitionModel(
+        model_path=model_path,
+        compiled=MODEL_BACKEND != 'keras'
+    )
+    
+    if os.path.exists(source['dish_head_path']):
+        model.attach_dish_head(source['dish_head_path'])
+    
+    if FEW_SHOT_ENABLED:
+        model.enable_embeddings()
+    
+    model.source = source
+    return model
+
+def get_model(model_path=MODEL_PATH):
+    """
+    Get or create model instance (thread-safe singleton)
+    
+    A model loaded lazily (eager loading disabled) is reported ready as soon
+    as it exists; the eager loader reports readiness after warming it up.
     """
     global _model_instance
     if _model_instance is None:
-        _model_instance = IngredientRecognitionModel(model_path=model_path)
+        with _model_lock:
+            if _model_instance is None:
+                _model_instance = _create_model(model_source(model_path=model_path))
+                _model_status['version'] = getattr(_model_instance, 'source', {}).get('version')
+                if _model_status['state'] == 'not_loaded':
+                    _model_status.update({'state': 'ready', 'error': None, 'loaded_at': time.time()})
+                    _model_ready.set()
     return _model_instance
 
+def weights_digest(path):
+    """
+    Get a content hash of a weights file
+    
+    The file is only re-read when its size or modification time changes, so
+    a touch or a redeploy of identical weights yields the same digest.
+    
+    Args:
+        path: Weights file path
+    
+    Returns:
+        First 16 hex digits of the file's SHA-256, or 'missing'
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return 'missing'
+    
+    signature = (stat.st_size, stat.st_mtime_ns)
+    cached = _weights_digests.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            hasher.update(chunk)
+    digest = hasher.hexdigest()[:16]
+    _weights_digests[path] = (signature, digest)
+    return digest
+
+def get_backbone_version():
+    """
+    Get a tag identifying the ingredient model alone
+    
+    Few-shot embeddings are only comparable between images embedded by the
+    same backbone, so the embedding index is tagged with this. The tag is
+    derived from the weights' content, so it survives redeploys of the same
+    model and changes whenever the weights do.
+    
+    Returns:
+        String of backend and weights content hash
+    """
+    if INFERENCE_SOCKET:
+        return get_model().backbone_version
+    
+    source = get_model().source
+    path = source['tflite_path'] if MODEL_BACKEND == 'tflite' else source['model_path']
+    return f"{MODEL_BACKEND}:{weights_digest(path)}"
+
+def get_model_version():
+    """
+    Get a tag identifying the serving model, used to invalidate cached results
+    
+    Returns:
+        String of backend and weights hash (plus the dish head's modification
+        time, when one is served, and the few-shot index revision)
+    """
+    if INFERENCE_SOCKET:
+        version = get_model().version
+    else:
+        version = get_backbone_version()
+        dish_head_path = get_model().source['dish_head_path']
+        if MODEL_BACKEND != 'tflite' and os.path.exists(dish_head_path):
+            version += f"+dish:{int(os.path.getmtime(dish_head_path))}"
+    
+    if FEW_SHOT_ENABLED:
+        version += f"+fewshot:{get_few_shot_index().revision}"
+    return version
+
+def warmup_model(model, num_runs=MODEL_WARMUP_RUNS):
+    """
+    Run a few inferences so graph tracing and allocation happen before traffic
+    
+    Args:
+        model: Loaded recognition model
+        num_runs: Number of warmup inferences
+    """
+    if INFERENCE_SOCKET:
+        # The server warms its own model; wait until it is up and answering
+        model.wait_until_ready(timeout=INFERENCE_SERVER_WAIT)
+        model.predict_probabilities(np.zeros((1, IMAGE_SIZE[0], IMAGE_SIZE[1], 3), dtype=np.uint8))
+        return
+    
+    dummy = np.zeros((1, IMAGE_SIZE[0], IMAGE_SIZE[1], 3), dtype=np.float32)
+    for _ in range(num_runs):
+        model.predict_probabilities(dummy)
+        if model.has_dish_head:
+            model.predict_joint(dummy)
+        if model.supports_embeddings:
+            model.predict_with_embeddings(dummy)
+    
+    if INFERENCE_BATCHING:
+        get_batcher()
+
+def load_and_warmup_model():
+    """
+    Load the model and warm it up, recording readiness
+    
+    Returns:
+        Boolean indicating if the model is ready
+    """
+    start = time.perf_counter()
+    _model_status.update({'state': 'loading', 'error': None})
+    
+    try:
+        model = get_model()
+        _model_status['state'] = 'warming_up'
+        warmup_model(model)
+    except Exception as e:
+        print(f"Model loading failed: {e}")
+        _model_status.update({'state': 'failed', 'error': str(e)})
+        return False
+    
+    _model_status.update({
+        'state': 'ready',
+        'load_seconds': round(time.perf_counter() - start, 3),
+        'loaded_at': time.time()
+    })
+    _model_ready.set()
+    print(f"Model ready ({_model_status['backend']}) in {_model_status['load_seconds']}s")
+    return True
+
+def swap_model(version):
+    """
+    Load a registry version, warm it up and make it the serving model
+    
+    The new model is fully loaded and warmed up before the shared reference
+    is replaced, so requests never hit a cold model. Requests already running
+    finish on the model they started with; the old model is freed once they
+    release it.
+    
+    Args:
+        version: Registry version to serve
+    
+    Returns:
+        Boolean indicating if the version is serving (on failure the current
+        model keeps serving)
+    """
+    global _model_instance
+    
+    with _swap_lock:
+        # Another caller (the registry watcher or an admin activation) may
+        # have swapped to this version while we waited for the lock
+        if _model_status['version'] == version and _model_status['state'] == 'ready':
+            return True
+        
+        start = time.perf_counter()
+        _model_status['swap'] = {'state': 'loading', 'version': version, 'error': None}
+        print(f"Loading model version {version}...")
+        
+        try:
+            model = _create_model(model_source(version))
+            warmup_model(model)
+        except Exception as e:
+            print(f"Model version {version} failed to load, keeping the current model: {e}")
+            _model_status['swap'] = {'state': 'failed', 'version': version, 'error': str(e)}
+            return False
+        
+        with _model_lock:
+            previous = _model_instance
+            _model_instance = model
+        
+        load_seconds = round(time.perf_counter() - start, 3)
+        _model_status.update({
+            'state': 'ready',
+            'error': None,
+            'version': version,
+            'load_seconds': load_seconds,
+            'loaded_at': time.time(),
+            'swap': {'state': 'done', 'version': version, 'error': None}
+        })
+        _model_ready.set()
+        
+        previous_version = getattr(previous, 'source', {}).get('version')
+        print(f"Swapped model {previous_version} -> {version} in {load_seconds}s")
+        return True
+
+def watch_model_registry(interval=None):
+    """
+    Poll the model registry and swap in newly activated versions
+    
+    Runs forever; a version that failed to load is not retried until a
+    different version is activated.
+    
+    Args:
+        interval: Seconds between polls (defaults to MODEL_REGISTRY_POLL)
+    """
+    from models.model_registry import MODEL_REGISTRY_DIR, MODEL_REGISTRY_POLL, get_active_version
+    
+    interval = interval or MODEL_REGISTRY_POLL
+    failed_version = None
+    while True:
+        time.sleep(interval)
+        try:
+            version = get_active_version(MODEL_REGISTRY_DIR)
+        except OSError as e:
+            print(f"Could not read model registry: {e}")
+            continue
+        
+        # Leave the initial load to the loader thread, and let a swap that
+        # is already running (e.g. started by an admin activation) finish
+        if _model_status['state'] in ('not_loaded', 'loading', 'warming_up') or _swap_lock.locked():
+            continue
+        if version in (None, _model_status['version'], failed_version):
+            continue
+        
+        if not swap_model(version):
+            failed_version = version
+
+def start_registry_watcher():
+    """
+    Start watching the model registry in a background thread
+    
+    Returns:
+        The watcher thread, or None if MODEL_REGISTRY_DIR is not set or
+        inference runs in the shared server (which watches the registry)
+    """
+    from models.model_registry import MODEL_REGISTRY_DIR
+    
+    if not MODEL_REGISTRY_DIR or INFERENCE_SOCKET:
+        return None
+    
+    thread = threading.Thread(target=watch_model_registry, name='model-registry-watcher', daemon=True)
+    thread.start()
+    return thread
+
+def activate_model_version(version):
+    """
+    Activate a registry version for all workers and start swapping to it here
+    
+    Other workers (or the shared inference server) swap on their next
+    registry poll.
+    
+    Args:
+        version: Registry version to serve
+    
+    Returns:
+        The swap thread, or None when inference runs in the shared server
+    
+    Raises:
+        ValueError: If the version is not in the registry
+    """
+    from models.model_registry import MODEL_REGISTRY_DIR, set_active_version
+    
+    if not MODEL_REGISTRY_DIR:
+        raise ValueError("Model registry not configured (set MODEL_REGISTRY_DIR)")
+    set_active_version(version, MODEL_REGISTRY_DIR)
+    
+    if INFERENCE_SOCKET:
+        return None
+    
+    thread = threading.Thread(target=swap_model, args=(version,), name='model-swap', daemon=True)
+    thread.start()
+    return thread
+
+def get_serving_model_info():
+    """
+    Get the serving model's version, load time and registry state
+    
+    Returns:
+        Dictionary for the model admin endpoint
+    """
+    from models.model_registry import MODEL_REGISTRY_DIR, get_active_version, list_versions
+    
+    status = get_model_status()
+    if INFERENCE_SOCKET and status['ready']:
+        # Versions are loaded and swapped in the shared inference server
+        status = dict(get_model().info(refresh=True)['status'], backend='remote')
+    
+    info = {
+        'status': status,
+        'model_version': get_model_version() if status['ready'] else None
+    }
+    if MODEL_REGISTRY_DIR:
+        info['registry'] = {
+            'path': MODEL_REGISTRY_DIR,
+            'active': get_active_version(MODEL_REGISTRY_DIR),
+            'versions': list_versions(MODEL_REGISTRY_DIR)
+        }
+    return info
+
+def start_model_loading():
+    """
+    Load and warm up the model in a background thread at worker start
+    
+    Also starts watching the model registry when MODEL_REGISTRY_DIR is set.
+    
+    Returns:
+        The loader thread
+    """
+    thread = threading.Thread(target=load_and_warmup_model, name='model-loader', daemon=True)
+    thread.start()
+    start_registry_watcher()
+    return thread
+
+def is_model_ready():
+    """Check whether the model has been loaded and warmed up"""
+    return _model_ready.is_set()
+
+def get_model_status():
+    """Get model loading state for the readiness endpoint"""
+    return dict(_model_status, ready=is_model_ready())
+
+# Micro-batching of concurrent single-image requests (opt-in)
+INFERENCE_BATCHING = os.getenv('INFERENCE_BATCHING', 'False') == 'True'
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv('INFERENCE_MAX_BATCH_SIZE', 16))
+INFERENCE_MAX_WAIT_MS = float(os.getenv('INFERENCE_MAX_WAIT_MS', 10))
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+def _predict_batch_with_model(batch):
+    """
+    Batcher function: run one batch and pair each output row with the model
+    that produced it
+    
+    The serving model may be hot-swapped between a request capturing it and
+    its batch running, so callers decode each row with the model returned
+    here rather than the one they captured.
+    
+    Returns:
+        List of (model, probabilities) tuples
+    """
+    model = get_model()
+    return [(model, row) for row in model.predict_probabilities(batch)]
+
+def get_batcher():
+    """
+    Get or create the shared inference batcher
+    
+    Each result is a (model, probabilities) tuple; see _predict_batch_with_model.
+    """
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                from utils.inference_batcher import InferenceBatcher
+                _batcher = InferenceBatcher(
+                    _predict_batch_with_model,
+                    max_batch_size=INFERENCE_MAX_BATCH_SIZE,
+                    max_wait_ms=INFERENCE_MAX_WAIT_MS,
+                    name='ingredient'
+                )
+                register_metrics('inference_batching', _batcher.stats)
+    return _batcher
+
 def predict_ingredients(image_tensor, top_k=3):
     """
     Predict ingredients from preprocessed image tensor
     
+    When INFERENCE_BATCHING is enabled, single images are routed through the
+    shared batcher so concurrent requests share one forward pass. A resized
+    PIL image is scaled straight into the batcher's preallocated buffer.
+    With INFERENCE_SOCKET set, the shared inference server does the batching
+    and resized images are sent as uint8 pixels.
+    
     Args:
-        image_tensor: Preprocessed image tensor
+        image_tensor: Preprocessed image tensor, or an RGB PIL Image already
+                      resized to the model input size
         top_k: Number of top predictions
     
     Returns:
         List of ingredient predictions
     """
     model = get_model()
+    is_image = isinstance(image_tensor, Image.Image)
+    
+    if few_shot_active(model):
+        if is_image:
+            image_tensor = np.asarray(image_tensor)[np.newaxis] if INFERENCE_SOCKET else image_to_tensor(image_tensor)
+        return predict_with_few_shot(model, image_tensor, top_k)[0]
+    
+    if INFERENCE_SOCKET:
+        if is_image:
+            image_tensor = np.asarray(image_tensor)[np.newaxis]
+        return model.predict(image_tensor, top_k=top_k)
+    
+    if INFERENCE_BATCHING and (is_image or image_tensor.shape[0] == 1):
+        batch_model, probabilities = get_batcher().predict(image_tensor)
+        return batch_model.decode_predictions(probabilities, top_k=top_k)
+    
+    if is_image:
+        image_tensor = image_to_tensor(image_tensor)
     return model.predict(image_tensor, top_k=top_k)
+
+def predict_ingredients_batch(batch_tensor, top_k=3):
+    """
+    Predict ingredients for several images in one forward pass
+    
+    Args:
+        batch_tensor: Preprocessed tensor of shape (N, 224, 224, 3)
+        top_k: Number of top predictions per image
+    
+    Returns:
+        List of N prediction lists
+    """
+    model = get_model()
+    if few_shot_active(model):
+        return predict_with_few_shot(model, batch_tensor, top_k)
+    return model.predict_batch(batch_tensor, top_k=top_k)
+
+def predict_dish_and_ingredients(image_tensor, top_k=3):
+    """
+    Predict the dish and its ingredients with a single backbone pass
+    
+    Args:
+        image_tensor: Preprocessed image tensor, or an RGB PIL Image already
+                      resized to the model input size
+        top_k: Number of top predictions for each head
+    
+    Returns:
+        (dish_predictions, ingredient_predictions) tuple of prediction lists
+    
+    Raises:
+        RuntimeError: If the serving model has no dish head
+    """
+    model = get_model()
+    if not model.has_dish_head:
+        raise RuntimeError(f"No dish head available (train one with models/train_dish_head.py -> {DISH_HEAD_PATH})")
+    
+    if isinstance(image_tensor, Image.Image):
+        if INFERENCE_SOCKET:
+            image_tensor = np.asarray(image_tensor)[np.newaxis]
+        else:
+            image_tensor = image_to_tensor(image_tensor)
+    
+    (ingredients, dishes), labels = model.predict_labeled('predict_joint', image_tensor)
+    return (
+        model.decode_predictions(dishes[0], top_k=top_k, class_names=labels['dish_class_names']),
+        model.decode_predictions(ingredients[0], top_k=top_k, class_names=labels['class_names'])
+    )
+
+def get_few_shot_index():
+    """Get the few-shot embedding index for the serving backbone"""
+    from utils.embedding_index import get_embedding_index
+    return get_embedding_index(model_version=get_backbone_version())
+
+def few_shot_active(model):
+    """Check whether few-shot classes should be searched for this model"""
+    return FEW_SHOT_ENABLED and model.supports_embeddings and len(get_few_shot_index()) > 0
+
+def predict_with_few_shot(model, batch_tensor, top_k=3):
+    """
+    Predict with the softmax head and the few-shot index from one backbone pass
+    
+    Images go straight to the model rather than through the micro-batcher,
+    which only returns class probabilities.
+    
+    Args:
+        model: Serving model supporting embeddings
+        batch_tensor: Preprocessed tensor of shape (N, 224, 224, 3)
+        top_k: Number of top predictions per image
+    
+    Returns:
+        List of N prediction lists merging both sources
+    """
+    from utils.embedding_index import merge_predictions
+    
+    (probabilities, embeddings), labels = model.predict_labeled('predict_embed', batch_tensor)
+    few_shot = get_few_shot_index().classify(embeddings)
+    return [
+        merge_predictions(model.decode_predictions(row, top_k=top_k, class_names=labels['class_names']), matches, top_k=top_k)
+        for row, matches in zip(probabilities, few_shot)
+    ]
+
+def embed_images(batch_tensor):
+    """
+    Compute pooled backbone embeddings for few-shot examples
+    
+    Args:
+        batch_tensor: Preprocessed tensor of shape (N, 224, 224, 3)
+    
+    Returns:
+        numpy array of shape (N, D)
+    
+    Raises:
+        RuntimeError: If the serving model does not expose embeddings
+    """
+    model = get_model()
+    if not model.supports_embeddings:
+        raise RuntimeError("Serving model does not expose embeddings (set FEW_SHOT_ENABLED=True, Keras backends only)")
+    return model.predict_with_embeddings(batch_tensor)[1]
@@ -0,0 +1,110 @@
+"""
+Versioned model registry
+
+Each model version lives in its own directory with the files it is served
+from; an ACTIVE file names the version workers should serve:
+
+    models/registry/
+        ACTIVE                          # e.g. "2024-06-01"
+        2024-05-12/
+            ingredient_model.h5
+            class_names.txt
+        2024-06-01/
+            ingredient_model.h5
+            class_names.txt
+            dish_head.h5                # optional
+            dish_class_names.txt
+            ingredient_model_int8.tflite  # optional (MODEL_BACKEND=tflite)
+
+Without an ACTIVE file the newest version (by name) is served. Workers poll
+the ACTIVE file and hot-swap to a newly activated version without restarting.
+"""
+import os
+
+MODEL_REGISTRY_DIR = os.getenv('MODEL_REGISTRY_DIR', '')
+MODEL_REGISTRY_POLL = float(os.getenv('MODEL_REGISTRY_POLL', 30))
+
+ACTIVE_FILE = 'ACTIVE'
+MODEL_FILE = 'ingredient_model.h5'
+TFLITE_FILE = 'ingredient_model_int8.tflite'
+DISH_HEAD_FILE = 'dish_head.h5'
+
+def list_versions(registry_dir=MODEL_REGISTRY_DIR):
+    """
+    List the versions available in the registry
+
+    Args:
+        registry_dir: Registry directory
+
+    Returns:
+        Sorted list of version names (directories holding a model file)
+    """
+    if not registry_dir or not os.path.isdir(registry_dir):
+        return []
+
+    versions = []
+    for name in os.listdir(registry_dir):
+        version_dir = os.path.join(registry_dir, name)
+        if os.path.exists(os.path.join(version_dir, MODEL_FILE)) or os.path.exists(os.path.join(version_dir, TFLITE_FILE)):
+            versions.append(name)
+    return sorted(versions)
+
+def get_active_version(registry_dir=MODEL_REGISTRY_DIR):
+    """
+    Get the version workers should serve
+
+    Args:
+        registry_dir: Registry directory
+
+    Returns:
+        Version named in the ACTIVE file, else the newest version, else None
+    """
+    active_path = os.path.join(registry_dir, ACTIVE_FILE)
+    if os.path.exists(active_path):
+        with open(active_path, 'r') as f:
+            version = f.read().strip()
+        if version:
+            return version
+
+    versions = list_versions(registry_dir)
+    return versions[-1] if versions else None
+
+def set_active_version(version, registry_dir=MODEL_REGISTRY_DIR):
+    """
+    Activate a version for every worker watching the registry
+
+    Args:
+        version: Version name
+        registry_dir: Registry directory
+
+    Raises:
+        ValueError: If the version is not in the registry
+    """
+    if version not in list_versions(registry_dir):
+        raise ValueError(f"Unknown model version: {version}")
+
+    active_path = os.path.join(registry_dir, ACTIVE_FILE)
+    temp_path = f"{active_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as f:
+        f.write(f"{version}\n")
+    os.replace(temp_path, active_path)
+
+def version_source(version, registry_dir=MODEL_REGISTRY_DIR):
+    """
+    Get the files a registry version is served from
+
+    Args:
+        version: Version name
+        registry_dir: Registry directory
+
+    Returns:
+        Dictionary with 'version', 'model_path', 'tflite_path' and
+        'dish_head_path' (class names are read from the same directory)
+    """
+    version_dir = os.path.join(registry_dir, version)
+    return {
+        'version': version,
+        'model_path': os.path.join(version_dir, MODEL_FILE),
+        'tflite_path': os.path.join(version_dir, TFLITE_FILE),
+        'dish_head_path': os.path.join(version_dir, DISH_HEAD_FILE)
+    }
@@ -0,0 +1,136 @@
+import tensorflow as tf
+from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
+from tensorflow.keras.layers import Input, Dense, Dropout
+from tensorflow.keras.models import Model
+import os
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.ingredient_recognition import IngredientRecognitionModel
+from models.train_model import create_data_generators
+
+def build_dish_head(num_features, num_dishes):
+    """
+    Build the dish classifier head that runs on pooled backbone features
+
+    Args:
+        num_features: Size of the backbone feature vector
+        num_dishes: Number of dish classes
+
+    Returns:
+        Keras model from features to dish probabilities
+    """
+    features = Input(shape=(num_features,), name='backbone_features')
+    x = Dense(128, activation='relu')(features)
+    x = Dropout(0.5)(x)
+    dishes = Dense(num_dishes, activation='softmax', name='dish')(x)
+    return Model(inputs=features, outputs=dishes, name='dish_head')
+
+def train_dish_head(data_dir, model_path='models/ingredient_model.h5', output_path='models/dish_head.h5',
+                    epochs=20, batch_size=32, validation_split=0.2):
+    """
+    Train a dish classifier head on the ingredient model's frozen backbone
+
+    The backbone (including the layers fine-tuned for ingredients) is frozen,
+    so at serving time one backbone pass feeds both heads.
+
+    Args:
+        data_dir: Directory containing dish images (folder-based labels)
+                  Structure: data_dir/dish_name/image.jpg
+        model_path: Trained ingredient model whose backbone is reused
+        output_path: Where to save the dish head
+        epochs: Number of training epochs
+        batch_size: Batch size for training
+        validation_split: Fraction of data for validation
+    """
+    print("=" * 50)
+    print("DISH HEAD TRAINING (shared backbone)")
+    print("=" * 50)
+
+    dish_names = sorted([d for d in os.listdir(data_dir)
+                         if os.path.isdir(os.path.join(data_dir, d))])
+    print(f"\nFound {len(dish_names)} dish classes:")
+    for i, name in enumerate(dish_names):
+        num_images = len(os.listdir(os.path.join(data_dir, name)))
+        print(f"  {i+1}. {name}: {num_images} images")
+
+    train_generator, validation_generator = create_data_generators(data_dir, batch_size, validation_split)
+
+    # Frozen backbone from the trained ingredient model
+    print(f"\nLoading backbone from {model_path}...")
+    ingredient_model = IngredientRecognitionModel(model_path=model_path, compiled=False)
+    backbone = ingredient_model.feature_model()
+    backbone.trainable = False
+
+    head = build_dish_head(backbone.output_shape[-1], len(dish_names))
+    training_model = Model(inputs=backbone.input, outputs=head(backbone.output))
+    training_model.compile(
+        optimizer=tf.keras.optimizers.Adam(learning_rate=0.001),
+        loss='categorical_crossentropy',
+        metrics=['accuracy']
+    )
+
+    early_stopping = EarlyStopping(
+        monitor='val_loss',
+        patience=5,
+        restore_best_weights=True,
+        verbose=1
+    )
+
+    reduce_lr = ReduceLROnPlateau(
+        monitor='val_loss',
+        factor=0.5,
+        patience=3,
+        min_lr=1e-7,
+        verbose=1
+    )
+
+    training_model.fit(
+        train_generator,
+        epochs=epochs,
+        validation_data=validation_generator,
+        callbacks=[early_stopping, reduce_lr]
+    )
+
+    # Only the head is saved; serving attaches it to the ingredient model
+    head.save(output_path)
+
+    dish_names_path = os.path.join(os.path.dirname(output_path), 'dish_class_names.txt')
+    with open(dish_names_path, 'w') as f:
+        for name in dish_names:
+            f.write(f"{name}\n")
+
+    print("\n" + "=" * 50)
+    print("TRAINING COMPLETE")
+    print("=" * 50)
+    print(f"Dish head saved to: {output_path}")
+    print(f"Dish class names saved to: {dish_names_path}")
+
+    print("\nFinal evaluation on validation set:")
+    val_loss, val_accuracy = training_model.evaluate(validation_generator)
+    print(f"Validation Loss: {val_loss:.4f}")
+    print(f"Validation Accuracy: {val_accuracy:.4f}")
+
+if __name__ == '__main__':
+    # Default data directory
+    data_directory = 'data/dishes'
+
+    if not os.path.exists(data_directory):
+        print(f"Error: Data directory '{data_directory}' not found!")
+        print("\nPlease organize your dish images as follows:")
+        print("  data/dishes/")
+        print("    ├── pasta/")
+        print("    │   ├── img1.jpg")
+        print("    │   └── img2.jpg")
+        print("    ├── fried_rice/")
+        print("    │   └── ...")
+        print("    └── ...")
+        sys.exit(1)
+
+    if not os.path.exists('models/ingredient_model.h5'):
+        print("Error: Train the ingredient model first (python models/train_model.py)")
+        sys.exit(1)
+
+    train_dish_head(data_directory)
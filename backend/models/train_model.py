@@ -9,32 +9,18 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from models.ingredient_recognition import IngredientRecognitionModel
 
-def train_model(data_dir, epochs=50, batch_size=32, validation_split=0.2):
+def create_data_generators(data_dir, batch_size=32, validation_split=0.2):
     """
-    Train the ingredient recognition model using transfer learning
+    Create augmented training and validation generators for a folder dataset
     
     Args:
-        data_dir: Directory containing training data (folder-based labels)
-                  Structure: data_dir/class_name/image.jpg
-        epochs: Number of training epochs
+        data_dir: Directory with one folder per class
         batch_size: Batch size for training
         validation_split: Fraction of data for validation
-    """
-    
-    print("=" * 50)
-    print("INGREDIENT RECOGNITION MODEL TRAINING")
-    print("=" * 50)
-    
-    # Count number of classes
-    class_names = sorted([d for d in os.listdir(data_dir) 
-                         if os.path.isdir(os.path.join(data_dir, d))])
-    num_classes = len(class_names)
-    
-    print(f"\nFound {num_classes} ingredient classes:")
-    for i, name in enumerate(class_names):
-        num_images = len(os.listdir(os.path.join(data_dir, name)))
-        print(f"  {i+1}. {name}: {num_images} images")
     
+    Returns:
+        (train_generator, validation_generator) tuple
+    """
     # Data augmentation for training
     train_datagen = ImageDataGenerator(
         preprocessing_function=tf.keras.applications.mobilenet_v2.preprocess_input,
@@ -64,6 +50,36 @@ def train_model(data_dir, epochs=50, batch_size=32, validation_split=0.2):
         subset='validation'
     )
     
+    return train_generator, validation_generator
+
+def train_model(data_dir, epochs=50, batch_size=32, validation_split=0.2):
+    """
+    Train the ingredient recognition model using transfer learning
+    
+    Args:
+        data_dir: Directory containing training data (folder-based labels)
+                  Structure: data_dir/class_name/image.jpg
+        epochs: Number of training epochs
+        batch_size: Batch size for training
+        validation_split: Fraction of data for validation
+    """
+    
+    print("=" * 50)
+    print("INGREDIENT RECOGNITION MODEL TRAINING")
+    print("=" * 50)
+    
+    # Count number of classes
+    class_names = sorted([d for d in os.listdir(data_dir) 
+                         if os.path.isdir(os.path.join(data_dir, d))])
+    num_classes = len(class_names)
+    
+    print(f"\nFound {num_classes} ingredient classes:")
+    for i, name in enumerate(class_names):
+        num_images = len(os.listdir(os.path.join(data_dir, name)))
+        print(f"  {i+1}. {name}: {num_images} images")
+    
+    train_generator, validation_generator = create_data_generators(data_dir, batch_size, validation_split)
+    
     # Create model
     print("\nBuilding model...")
     model = IngredientRecognitionModel(num_classes=num_classes)
@@ -1,15 +1,40 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, url_for
 from werkzeug.utils import secure_filename
 import os
-from utils.image_preprocessing import prepare_image_tensor
-from utils.ocr_processor import process_packaged_food_image
-from models.ingredient_recognition import predict_ingredients
+import queue
+from utils.image_context import ImageContext
+from utils.ocr_processor import process_packaged_food_image, OCR_PIPELINE_VERSION
+from utils.recognition_cache import recognition_cache, RECOGNITION_CACHE_ENABLED
+from utils.recognition_pipeline import recognize_image, recognize_batch, RECOGNIZE_MODE, RECOGNIZE_MODES
+from utils.job_queue import JobQueue, MemoryJobStore, MongoJobStore
+from utils.metrics import register_metrics
+from utils.recipe_index import get_recipe_index
+from utils.auth import admin_required
+from utils.admission import admission_limited
+from utils.image_preprocessing import images_to_batch
+from models.ingredient_recognition import (
+    get_model_version,
+    get_few_shot_index,
+    embed_images,
+    FEW_SHOT_ENABLED,
+    activate_model_version,
+    get_serving_model_info
+)
 
 image_bp = Blueprint('image', __name__)
 
 UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
 
+RECOGNITION_JOB_WORKERS = int(os.getenv('RECOGNITION_JOB_WORKERS', 2))
+RECOGNITION_JOB_QUEUE_SIZE = int(os.getenv('RECOGNITION_JOB_QUEUE_SIZE', 32))
+RECOGNITION_JOB_TTL = int(os.getenv('RECOGNITION_JOB_TTL', 600))
+RECOGNITION_JOB_LEASE = int(os.getenv('RECOGNITION_JOB_LEASE', 300))
+# 'mongo' shares jobs between all workers; 'memory' only works with one worker
+RECOGNITION_JOB_STORE = os.getenv('RECOGNITION_JOB_STORE', 'mongo')
+MAX_BATCH_IMAGES = int(os.getenv('MAX_BATCH_IMAGES', 20))
+DISH_RECIPE_CANDIDATES = int(os.getenv('DISH_RECIPE_CANDIDATES', 50))
+
 # Create upload folder if it doesn't exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
@@ -17,6 +42,128 @@ def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def get_cached_result(kind, context, version, near_duplicates=True):
+    """
+    Look up a cached recognition result for an uploaded image
+    
+    Args:
+        kind: Result type
+        context: ImageContext for the upload
+        version: Version tag the result must have been produced with
+        near_duplicates: Also accept results of perceptually similar images
+                         (off for OCR: similar-looking labels carry different
+                         text; OCR-derived results are also stored exact-only)
+    """
+    if not RECOGNITION_CACHE_ENABLED:
+        return None
+    phash_fn = (lambda: context.perceptual_hash) if near_duplicates else None
+    return recognition_cache.get(kind, context.sha256, version, phash_fn=phash_fn)
+
+def cache_result(kind, context, version, result, near_duplicates=True):
+    """
+    Store a recognition result for an uploaded image
+    
+    Args:
+        kind: Result type
+        context: ImageContext for the upload
+        version: Version tag of the producer
+        result: Result to cache
+        near_duplicates: Serve the result for perceptually similar images too
+    """
+    if not RECOGNITION_CACHE_ENABLED:
+        return
+    if near_duplicates:
+        recognition_cache.put(kind, context.sha256, version, result, phash=context.perceptual_hash)
+    else:
+        recognition_cache.put(kind, context.sha256, version, result, near_duplicates=False)
+
+def has_ocr_output(result):
+    """Check whether a recognition result contains ingredients read by OCR"""
+    return result['method'] in ('ocr', 'fused') or bool(result.get('raw_text'))
+
+def is_cacheable(result):
+    """
+    Check whether a recognition result is complete enough to cache
+    
+    Placeholders and fused results where a branch failed or timed out are
+    degraded by a transient problem, so the next upload should try again.
+    """
+    if result['method'] == 'placeholder':
+        return False
+    return all(branch['status'] == 'ok' for branch in result.get('branches', {}).values())
+
+def run_recognition(context, mode, multi_crop=False):
+    """
+    Recognize ingredients in an upload, serving repeats from the cache
+    
+    Args:
+        context: ImageContext for the upload
+        mode: Recognition mode
+        multi_crop: Use multi-region detection for the model
+    
+    Returns:
+        Result dictionary
+    """
+    cache_kind = f'recognize:{mode}:multi_crop' if multi_crop else f'recognize:{mode}'
+    try:
+        cache_version = f"{get_model_version()}|{OCR_PIPELINE_VERSION}"
+    except Exception as e:
+        # The model failed to load: skip the cache and let recognition fall
+        # back to OCR or the placeholder
+        print(f"Model unavailable, bypassing the recognition cache: {e}")
+        return recognize_image(context, mode, multi_crop=multi_crop)
+    
+    cached = get_cached_result(cache_kind, context, cache_version)
+    if cached:
+        return dict(cached, cached=True)
+    
+    result = recognize_image(context, mode, multi_crop=multi_crop)
+    
+    if is_cacheable(result):
+        cache_result(cache_kind, context, cache_version, result, near_duplicates=not has_ocr_output(result))
+    
+    return result
+
+def parse_recognize_options():
+    """
+    Read the recognition mode and multi_crop flag from the request
+    
+    Returns:
+        (mode, multi_crop, error_message) tuple
+    """
+    mode = request.args.get('mode') or request.form.get('mode') or RECOGNIZE_MODE
+    if mode not in RECOGNIZE_MODES:
+        return None, False, f'Invalid mode. Use one of: {", ".join(RECOGNIZE_MODES)}'
+    
+    multi_crop = (request.args.get('multi_crop') or request.form.get('multi_crop', 'false')).lower() == 'true'
+    return mode, multi_crop, None
+
+def _run_recognition_job(payload):
+    context = ImageContext(payload['data'], filename=payload['filename'])
+    return run_recognition(context, payload['mode'], payload['multi_crop'])
+
+def _create_job_store():
+    """Create the job store shared by the workers of this deployment"""
+    if RECOGNITION_JOB_STORE == 'memory':
+        return MemoryJobStore(RECOGNITION_JOB_QUEUE_SIZE)
+    
+    from models.database import recognition_jobs_collection
+    return MongoJobStore(
+        recognition_jobs_collection,
+        max_queue_size=RECOGNITION_JOB_QUEUE_SIZE,
+        result_ttl=RECOGNITION_JOB_TTL,
+        lease_timeout=RECOGNITION_JOB_LEASE
+    )
+
+recognition_jobs = JobQueue(
+    _run_recognition_job,
+    num_workers=RECOGNITION_JOB_WORKERS,
+    result_ttl=RECOGNITION_JOB_TTL,
+    name='recognition',
+    store=_create_job_store()
+)
+register_metrics('recognition_jobs', recognition_jobs.stats)
+
 @image_bp.route('/upload', methods=['POST'])
 def upload_image():
     """
@@ -57,14 +204,18 @@ def upload_image():
         return jsonify({'message': f'Error uploading image: {str(e)}'}), 500
 
 @image_bp.route('/recognize', methods=['POST'])
+@admission_limited('vision')
 def recognize_ingredients():
     """
     Recognize ingredients from uploaded image
-    - First tries OCR for packaged food labels
-    - Falls back to ML model for fresh ingredients
+    - sequential (default): tries OCR for packaged food labels first and
+      falls back to ML model for fresh ingredients
+    - fused: runs OCR and the ML model concurrently and merges the results
     
     Form data:
         image: File
+        mode: "sequential" | "fused" (optional, also accepted as query parameter)
+        multi_crop: "true" to detect ingredients in multiple image regions (optional)
     
     Returns:
         {
@@ -72,7 +223,7 @@ def recognize_ingredients():
                 {"name": "tomato", "confidence": 0.95},
                 ...
             ],
-            "method": "ocr" | "ml_model"
+            "method": "ocr" | "ml_model" | "fused"
         }
     """
     try:
@@ -87,69 +238,341 @@ def recognize_ingredients():
         if not allowed_file(file.filename):
             return jsonify({'message': 'Invalid file type'}), 400
         
-        # Try OCR first (for packaged food labels)
+        mode, multi_crop, error = parse_recognize_options()
+        if error:
+            return jsonify({'message': error}), 400
+        
+        # Read and decode the upload once for both OCR and the model
+        context = ImageContext.from_upload(file)
+        
+        return jsonify(run_recognition(context, mode, multi_crop)), 200
+        
+    except Exception as e:
+        return jsonify({'message': f'Error recognizing ingredients: {str(e)}'}), 500
+
+@image_bp.route('/recognize/batch', methods=['POST'])
+@admission_limited('vision')
+def recognize_ingredients_batch():
+    """
+    Recognize ingredients in several images (e.g. a pantry scan) at once
+    
+    Images are decoded in parallel and classified in one batched forward
+    pass. The merged ingredient list can be sent to /api/recipes/recommend
+    as is.
+    
+    Form data:
+        images: Files (repeat the field for each image)
+    
+    Returns:
+        {
+            "results": [
+                {"filename": "shelf1.jpg", "status": "ok", "ingredients": [...]},
+                ...
+            ],
+            "ingredients": [
+                {"name": "tomato", "confidence": 0.95, "images": 2},
+                ...
+            ],
+            "method": "ml_model_batch"
+        }
+    """
+    try:
+        files = [f for f in request.files.getlist('images') if f.filename]
+        
+        if not files:
+            return jsonify({'message': 'No image files provided'}), 400
+        
+        if len(files) > MAX_BATCH_IMAGES:
+            return jsonify({'message': f'Too many images. Maximum is {MAX_BATCH_IMAGES}'}), 400
+        
+        invalid = [f.filename for f in files if not allowed_file(f.filename)]
+        if invalid:
+            return jsonify({'message': f'Invalid file type: {", ".join(invalid)}'}), 400
+        
+        contexts = [ImageContext.from_upload(f) for f in files]
+        result = recognize_batch(contexts)
+        result['count'] = len(contexts)
+        
+        return jsonify(result), 200
+        
+    except Exception as e:
+        return jsonify({'message': f'Error recognizing ingredients: {str(e)}'}), 500
+
+@image_bp.route('/few-shot/examples', methods=['POST'])
+@admin_required
+@admission_limited('vision')
+def add_few_shot_examples(current_user):
+    """
+    Add labeled example images for a few-shot ingredient class
+    
+    The examples' backbone embeddings are stored in the few-shot index; the
+    class is recognized by /recognize within seconds, without retraining.
+    
+    Form data:
+        label: Ingredient name
+        images: Files (repeat the field for each image, 3-10 recommended)
+    
+    Returns:
+        201 {"label": "dragon fruit", "added": 5, "examples": 5, "revision": 3}
+    """
+    try:
+        if not FEW_SHOT_ENABLED:
+            return jsonify({'message': 'Few-shot classes are disabled (set FEW_SHOT_ENABLED=True)'}), 503
+        
+        label = request.form.get('label', '').strip().lower()
+        if not label:
+            return jsonify({'message': 'No label provided'}), 400
+        
+        files = [f for f in request.files.getlist('images') if f.filename]
+        if not files:
+            return jsonify({'message': 'No image files provided'}), 400
+        
+        if len(files) > MAX_BATCH_IMAGES:
+            return jsonify({'message': f'Too many images. Maximum is {MAX_BATCH_IMAGES}'}), 400
+        
+        invalid = [f.filename for f in files if not allowed_file(f.filename)]
+        if invalid:
+            return jsonify({'message': f'Invalid file type: {", ".join(invalid)}'}), 400
+        
+        contexts = [ImageContext.from_upload(f) for f in files]
+        embeddings = embed_images(images_to_batch([context.model_input() for context in contexts]))
+        
+        # Locked against other workers from reload to save
+        index = get_few_shot_index()
+        with index.update():
+            count = index.add(label, embeddings)
+        
+        print(f"{current_user['username']} added {len(contexts)} few-shot examples for '{label}'")
+        return jsonify({
+            'label': label,
+            'added': len(contexts),
+            'examples': count,
+            'revision': index.revision
+        }), 201
+        
+    except Exception as e:
+        return jsonify({'message': f'Error adding few-shot examples: {str(e)}'}), 500
+
+@image_bp.route('/few-shot/classes', methods=['GET'])
+def list_few_shot_classes():
+    """
+    List few-shot classes and their number of examples
+    
+    Returns:
+        {"classes": {"dragon fruit": 5, ...}, "revision": 3}
+    """
+    try:
+        if not FEW_SHOT_ENABLED:
+            return jsonify({'message': 'Few-shot classes are disabled (set FEW_SHOT_ENABLED=True)'}), 503
+        
+        index = get_few_shot_index()
+        return jsonify({'classes': index.class_counts(), 'revision': index.revision}), 200
+        
+    except Exception as e:
+        return jsonify({'message': f'Error listing few-shot classes: {str(e)}'}), 500
+
+@image_bp.route('/few-shot/classes/<label>', methods=['DELETE'])
+@admin_required
+def delete_few_shot_class(current_user, label):
+    """
+    Remove all examples of a few-shot class
+    
+    Returns:
+        {"label": "dragon fruit", "removed": 5, "revision": 4}
+    """
+    try:
+        if not FEW_SHOT_ENABLED:
+            return jsonify({'message': 'Few-shot classes are disabled (set FEW_SHOT_ENABLED=True)'}), 503
+        
+        label = label.strip().lower()
+        index = get_few_shot_index()
+        with index.update():
+            removed = index.remove(label)
+        if not removed:
+            return jsonify({'message': f'Unknown few-shot class: {label}'}), 404
+        
+        return jsonify({'label': label, 'removed': removed, 'revision': index.revision}), 200
+        
+    except Exception as e:
+        return jsonify({'message': f'Error removing few-shot class: {str(e)}'}), 500
+
+@image_bp.route('/model', methods=['GET'])
+@admin_required
+def model_info(current_user):
+    """
+    Report the serving model version and load time
+    
+    Returns:
+        {
+            "status": {"state": "ready", "version": "2024-06-01", "load_seconds": 4.2, "loaded_at": ..., "swap": {...}},
+            "model_version": "compiled:2024-06-01/ingredient_model.h5:1717200000",
+            "registry": {"active": "2024-06-01", "versions": ["2024-05-12", "2024-06-01"]}
+        }
+    """
+    try:
+        return jsonify(get_serving_model_info()), 200
+        
+    except Exception as e:
+        return jsonify({'message': f'Error getting model info: {str(e)}'}), 500
+
+@image_bp.route('/model/activate', methods=['POST'])
+@admin_required
+def activate_model(current_user):
+    """
+    Switch every worker to another model registry version without restarting
+    
+    This worker starts loading the version in the background right away;
+    the others swap on their next registry poll (MODEL_REGISTRY_POLL).
+    The current model keeps serving until the new one is warmed up.
+    
+    Request body:
+        {"version": "2024-06-01"}
+    
+    Returns:
+        202 {"version": "2024-06-01", "message": "..."}
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        version = str(data.get('version', '')).strip()
+        if not version:
+            return jsonify({'message': 'No version provided'}), 400
+        
         try:
-            print("=" * 50)
-            print("Attempting OCR extraction...")
-            file.seek(0)  # Reset file pointer
-            ocr_result = process_packaged_food_image(file)
-            
-            print(f"OCR raw text: {ocr_result.get('raw_text', '')[:200]}")
-            print(f"OCR cleaned text: {ocr_result.get('cleaned_text', '')[:200]}")
-            print(f"OCR ingredients: {ocr_result.get('ingredients', [])}")
-            
-            # If OCR found ingredients, use them
-            if ocr_result['ingredients'] and len(ocr_result['ingredients']) >= 2:
-                print(f"✓ OCR SUCCESS: Found {len(ocr_result['ingredients'])} ingredients")
-                ingredients = [{'name': ing, 'confidence': 0.90} for ing in ocr_result['ingredients']]
-                
-                return jsonify({
-                    'ingredients': ingredients,
-                    'method': 'ocr',
-                    'raw_text': ocr_result.get('raw_text', ''),
-                    'message': f'Detected {len(ingredients)} ingredients using OCR'
-                }), 200
-            else:
-                print(f"✗ OCR found only {len(ocr_result.get('ingredients', []))} ingredients, trying ML model...")
-        
-        except Exception as ocr_error:
-            import traceback
-            print(f"✗ OCR FAILED with error: {ocr_error}")
-            print(f"Traceback: {traceback.format_exc()}")
-            print("Trying ML model...")
-            print("=" * 50)
-        
-        # If OCR didn't work or found few ingredients, try ML model (for fresh ingredients)
+            activate_model_version(version)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        
+        print(f"{current_user['username']} activated model version {version}")
+        return jsonify({
+            'version': version,
+            'message': f'Model version {version} activated; workers swap once it is loaded'
+        }), 202
+        
+    except Exception as e:
+        return jsonify({'message': f'Error activating model: {str(e)}'}), 500
+
+@image_bp.route('/jobs', methods=['POST'])
+def create_recognition_job():
+    """
+    Queue ingredient recognition for background processing
+    
+    Form data:
+        image: File
+        mode: "sequential" | "fused" (optional)
+        multi_crop: "true" to detect ingredients in multiple image regions (optional)
+    
+    Returns:
+        202 {
+            "job_id": "...",
+            "status": "queued",
+            "status_url": "/api/image/jobs/<job_id>"
+        }
+        429 with a Retry-After header when the queue is full
+    """
+    try:
+        if 'image' not in request.files:
+            return jsonify({'message': 'No image file provided'}), 400
+        
+        file = request.files['image']
+        
+        if file.filename == '':
+            return jsonify({'message': 'No file selected'}), 400
+        
+        if not allowed_file(file.filename):
+            return jsonify({'message': 'Invalid file type'}), 400
+        
+        mode, multi_crop, error = parse_recognize_options()
+        if error:
+            return jsonify({'message': error}), 400
+        
+        file.seek(0)
+        payload = {
+            'data': file.read(),
+            'filename': file.filename,
+            'mode': mode,
+            'multi_crop': multi_crop
+        }
+        
         try:
-            file.seek(0)  # Reset file pointer
-            image_tensor = prepare_image_tensor(file)
-            file.seek(0)
-            
-            predictions = predict_ingredients(image_tensor, top_k=5)
-            
-            return jsonify({
-                'ingredients': predictions,
-                'method': 'ml_model',
-                'message': 'Ingredients recognized using ML model'
-            }), 200
-            
-        except Exception as model_error:
-            # If both OCR and model fail, return placeholder
-            print(f"Model error: {model_error}")
-            return jsonify({
-                'ingredients': [
-                    {'name': 'tomato', 'confidence': 0.85},
-                    {'name': 'onion', 'confidence': 0.75},
-                    {'name': 'garlic', 'confidence': 0.65}
-                ],
-                'method': 'placeholder',
-                'message': 'Using placeholder data (OCR and model unavailable)'
-            }), 200
+            job_id = recognition_jobs.submit(payload)
+        except queue.Full:
+            retry_after = recognition_jobs.retry_after()
+            response = jsonify({
+                'message': 'Recognition queue is full, please retry later',
+                'retry_after': retry_after
+            })
+            response.headers['Retry-After'] = str(retry_after)
+            return response, 429
+        
+        status_url = url_for('image.get_recognition_job', job_id=job_id)
+        response = jsonify({
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': status_url
+        })
+        response.headers['Location'] = status_url
+        return response, 202
         
     except Exception as e:
-        return jsonify({'message': f'Error recognizing ingredients: {str(e)}'}), 500
+        return jsonify({'message': f'Error queueing recognition: {str(e)}'}), 500
+
+@image_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_recognition_job(job_id):
+    """
+    Get the status of a recognition job
+    
+    Returns:
+        {
+            "job_id": "...",
+            "status": "queued" | "running" | "done" | "failed",
+            "result": {...},
+            "error": null
+        }
+    """
+    job = recognition_jobs.get(job_id)
+    if job is None:
+        return jsonify({'message': 'Job not found or expired'}), 404
+    
+    return jsonify(job), 200
+
+def find_similar_recipes(dish_name, ingredients, limit=12):
+    """
+    Find recipes similar to a recognized dish
+    
+    Recipes whose name or category contain the dish's words come first,
+    looked up in the recipe token index. If fewer than 5 are found, the
+    list is topped up by ranking the top DISH_RECIPE_CANDIDATES
+    ingredient matches from MongoDB with the hybrid engine, instead of
+    ranking the whole catalog.
+    
+    Args:
+        dish_name: Recognized dish name
+        ingredients: Ingredient names expected in or detected on the dish
+        limit: Maximum number of recipes to return
+    
+    Returns:
+        List of recipe documents without duplicates
+    """
+    from models.database import RecipeDB
+    
+    recipe_ids = get_recipe_index().search(dish_name, limit=limit)
+    similar_recipes = RecipeDB.get_recipes_by_ids(recipe_ids)
+    
+    if len(similar_recipes) < 5 and ingredients:
+        from utils.recommendation_engine import get_recommendations, db_ingredient_matching
+        candidates = db_ingredient_matching(ingredients, top_n=DISH_RECIPE_CANDIDATES)
+        recommended = get_recommendations(ingredients, candidates, method='hybrid', top_n=15)
+        
+        seen_ids = set(recipe_ids)
+        for recipe in recommended:
+            if recipe['_id'] not in seen_ids:
+                seen_ids.add(recipe['_id'])
+                similar_recipes.append(recipe)
+    
+    return similar_recipes[:limit]
 
 @image_bp.route('/recognize-dish', methods=['POST'])
+@admission_limited('vision')
 def recognize_dish():
     """
     Recognize a dish from an image and find similar recipes
@@ -161,6 +584,7 @@ def recognize_dish():
         {
             "dish_name": "pasta carbonara",
             "confidence": 0.85,
+            "detected_ingredients": [{"name": "egg", "confidence": 0.7}, ...],
             "similar_recipes": [...]
         }
     """
@@ -176,89 +600,45 @@ def recognize_dish():
         if not allowed_file(file.filename):
             return jsonify({'message': 'Invalid file type'}), 400
         
-        # Save the file temporarily
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(filepath)
+        from utils.dish_recognition import DISH_RECOGNITION_VERSION
+        context = ImageContext.from_upload(file)
         
         # Use dish recognition utility
         try:
-            from models.database import RecipeDB
-            from utils.dish_recognition import recognize_dish_from_image, get_dish_ingredients
+            from utils.dish_recognition import recognize_dish_from_image
             
-            # Recognize the dish from the image
-            dish_result = recognize_dish_from_image(filepath)
+            # Recognize the dish from the image (cached per image and model)
+            dish_version = f"{DISH_RECOGNITION_VERSION}|{get_model_version()}"
+            dish_result = get_cached_result('dish', context, dish_version)
+            if not dish_result:
+                dish_result = recognize_dish_from_image(context.model_input())
+                cache_result('dish', context, dish_version, dish_result)
             detected_dish = dish_result['dish_name']
             confidence = dish_result['confidence']
             common_ingredients = dish_result.get('common_ingredients', [])
+            detected_ingredients = dish_result.get('detected_ingredients', [])
             
-            # Search for similar recipes in our database
-            all_recipes = RecipeDB.get_all_recipes()
-            
-            # Filter recipes that match the detected dish
-            similar_recipes = []
-            search_terms = [detected_dish]
-            
-            # Add variations of the dish name
-            if ' ' in detected_dish:
-                search_terms.extend(detected_dish.split())
-            
-            for recipe in all_recipes:
-                recipe_name = recipe.get('name', '').lower()
-                recipe_category = recipe.get('category', '').lower()
-                
-                # Check if any search term matches recipe name or category
-                for term in search_terms:
-                    if term.lower() in recipe_name or term.lower() in recipe_category:
-                        recipe['_id'] = str(recipe['_id'])
-                        if recipe not in similar_recipes:
-                            similar_recipes.append(recipe)
-                        break
-            
-            # If no exact matches, search by common ingredients
-            if len(similar_recipes) < 5:
-                # Use recommendation engine with common ingredients
-                from utils.recommendation_engine import get_recommendations
-                recommended = get_recommendations(
-                    common_ingredients,
-                    all_recipes,
-                    method='hybrid',
-                    top_n=15
-                )
-                
-                for recipe in recommended:
-                    recipe['_id'] = str(recipe['_id'])
-                    if recipe not in similar_recipes:
-                        similar_recipes.append(recipe)
-            
-            # Clean up uploaded file
-            if os.path.exists(filepath):
-                os.remove(filepath)
+            similar_recipes = find_similar_recipes(
+                detected_dish,
+                common_ingredients + [ing['name'] for ing in detected_ingredients]
+            )
             
             return jsonify({
                 'dish_name': detected_dish,
                 'confidence': confidence,
                 'category': dish_result.get('category', 'Unknown'),
-                'similar_recipes': similar_recipes[:12],
-                'count': len(similar_recipes[:12]),
+                'detected_ingredients': detected_ingredients,
+                'similar_recipes': similar_recipes,
+                'count': len(similar_recipes),
                 'message': f'Found recipes similar to {detected_dish}'
             }), 200
             
         except Exception as model_error:
             print(f"Dish recognition error: {model_error}")
-            # Clean up uploaded file
-            if os.path.exists(filepath):
-                os.remove(filepath)
             
-            # Fallback to general recommendations
+            # Fallback to a random selection of recipes
             from models.database import RecipeDB
-            all_recipes = RecipeDB.get_all_recipes()
-            
-            # Return random selection
-            import random
-            random_recipes = random.sample(all_recipes, min(10, len(all_recipes)))
-            for recipe in random_recipes:
-                recipe['_id'] = str(recipe['_id'])
+            random_recipes = RecipeDB.sample_recipes(10)
             
             return jsonify({
                 'dish_name': 'various dishes',
@@ -272,6 +652,7 @@ def recognize_dish():
         return jsonify({'message': f'Error recognizing dish: {str(e)}'}), 500
 
 @image_bp.route('/ocr', methods=['POST'])
+@admission_limited('vision')
 def ocr_extract():
     """
     Extract ingredients from packaged food label using OCR
@@ -298,18 +679,26 @@ def ocr_extract():
         if not allowed_file(file.filename):
             return jsonify({'message': 'Invalid file type'}), 400
         
+        context = ImageContext.from_upload(file)
+        
+        cached = get_cached_result('ocr', context, OCR_PIPELINE_VERSION, near_duplicates=False)
+        if cached:
+            return jsonify(dict(cached, cached=True)), 200
+        
         # Process with OCR
-        result = process_packaged_food_image(file)
+        result = process_packaged_food_image(context.ocr_image)
         
         # Convert ingredient names to simple list
         ingredients = [{'name': ing} for ing in result['ingredients']]
         
-        return jsonify({
+        response = {
             'ingredients': ingredients,
             'raw_text': result['raw_text'],
             'cleaned_text': result['cleaned_text'],
             'message': 'OCR processing complete'
-        }), 200
+        }
+        cache_result('ocr', context, OCR_PIPELINE_VERSION, response, near_duplicates=False)
+        return jsonify(response), 200
         
     except Exception as e:
         return jsonify({'message': f'Error processing OCR: {str(e)}'}), 500
@@ -3,6 +3,8 @@ from bson import ObjectId
 from models.database import RecipeDB
 from utils.recommendation_engine import get_recommendations
 from utils.auth import optional_token
+from utils.json_response import stream_json_list
+from utils.admission import admission, AdmissionRejected, rejection_response
 
 recipe_bp = Blueprint('recipe', __name__)
 
@@ -35,20 +37,8 @@ def list_recipes(current_user):
         if request.args.get('max_time'):
             filters['max_cooking_time'] = int(request.args.get('max_time'))
         
-        # Get recipes
-        if filters:
-            recipes = RecipeDB.search_recipes(filters)
-        else:
-            recipes = RecipeDB.get_all_recipes()
-        
-        # Convert ObjectId to string
-        for recipe in recipes:
-            recipe['_id'] = str(recipe['_id'])
-        
-        return jsonify({
-            'recipes': recipes,
-            'count': len(recipes)
-        }), 200
+        # Stream recipes straight from the cursor
+        return stream_json_list(RecipeDB.iter_recipes(filters)), 200
         
     except Exception as e:
         return jsonify({'message': f'Error fetching recipes: {str(e)}'}), 500
@@ -84,16 +74,7 @@ def search_recipes(current_user):
             filters['max_cooking_time'] = request.args.get('max_cooking_time')
         
         # Search recipes
-        recipes = RecipeDB.search_recipes(filters)
-        
-        # Convert ObjectId to string
-        for recipe in recipes:
-            recipe['_id'] = str(recipe['_id'])
-        
-        return jsonify({
-            'recipes': recipes,
-            'count': len(recipes)
-        }), 200
+        return stream_json_list(RecipeDB.iter_recipes(filters)), 200
         
     except Exception as e:
         return jsonify({'message': f'Error searching recipes: {str(e)}'}), 500
@@ -107,7 +88,7 @@ def recommend_recipes(current_user):
     Request body:
         {
             "ingredients": ["tomato", "onion", ...],
-            "method": "hybrid" | "content" | "ingredient" (optional)
+            "method": "hybrid" | "content" | "ingredient" | "db" (optional)
         }
     
     Returns:
@@ -135,8 +116,8 @@ def recommend_recipes(current_user):
         # Get recommendation method
         method = data.get('method', 'hybrid')
         
-        # Get all recipes
-        all_recipes = RecipeDB.get_all_recipes()
+        # Get all recipes (the db method scores inside MongoDB instead)
+        all_recipes = None if method == 'db' else RecipeDB.get_all_recipes()
         
         # Get recommendations
         recommended_recipes = get_recommendations(
@@ -146,10 +127,6 @@ def recommend_recipes(current_user):
             top_n=20
         )
         
-        # Convert ObjectId to string
-        for recipe in recommended_recipes:
-            recipe['_id'] = str(recipe['_id'])
-        
         return jsonify({
             'recipes': recommended_recipes,
             'count': len(recommended_recipes),
@@ -184,19 +161,19 @@ def get_recipe_details(current_user, recipe_id):
         if not recipe:
             return jsonify({'message': 'Recipe not found'}), 404
         
-        # Convert ObjectId to string
-        recipe['_id'] = str(recipe['_id'])
-        
         # Optionally enhance with generated instructions
         from utils.instruction_generator import enhance_recipe_with_instructions
         
         if not recipe.get('instructions') or len(recipe.get('instructions', [])) == 0:
-            recipe = enhance_recipe_with_instructions(recipe)
+            with admission('llm'):
+                recipe = enhance_recipe_with_instructions(recipe)
         
         return jsonify({
             'recipe': recipe
         }), 200
         
+    except AdmissionRejected as e:
+        return rejection_response(e)
     except Exception as e:
         return jsonify({'message': f'Error fetching recipe: {str(e)}'}), 500
 
@@ -209,7 +186,7 @@ def search_by_ingredients(current_user):
     Request body:
         {
             "ingredients": ["tomato", "onion", "garlic"],
-            "method": "hybrid" | "content" | "ingredient" (optional)
+            "method": "hybrid" | "content" | "ingredient" | "db" (optional)
         }
     
     Returns:
@@ -245,8 +222,8 @@ def search_by_ingredients(current_user):
         # Get recommendation method
         method = data.get('method', 'hybrid')
         
-        # Get all recipes
-        all_recipes = RecipeDB.get_all_recipes()
+        # Get all recipes (the db method scores inside MongoDB instead)
+        all_recipes = None if method == 'db' else RecipeDB.get_all_recipes()
         
         # Get recommendations
         recommended_recipes = get_recommendations(
@@ -256,10 +233,6 @@ def search_by_ingredients(current_user):
             top_n=20
         )
         
-        # Convert ObjectId to string
-        for recipe in recommended_recipes:
-            recipe['_id'] = str(recipe['_id'])
-        
         return jsonify({
             'recipes': recommended_recipes,
             'count': len(recommended_recipes),
@@ -282,16 +255,7 @@ def get_all_recipes(current_user):
         }
     """
     try:
-        recipes = RecipeDB.get_all_recipes()
-        
-        # Convert ObjectId to string
-        for recipe in recipes:
-            recipe['_id'] = str(recipe['_id'])
-        
-        return jsonify({
-            'recipes': recipes,
-            'count': len(recipes)
-        }), 200
+        return stream_json_list(RecipeDB.iter_recipes()), 200
         
     except Exception as e:
         return jsonify({'message': f'Error fetching recipes: {str(e)}'}), 500
@@ -333,11 +297,17 @@ def get_filter_options():
 @optional_token
 def calculate_nutrition(current_user, recipe_id):
     """
-    Calculate nutrition for a recipe using USDA API
+    Get nutrition for a recipe, calculating it with the USDA API if needed
+    
+    Stored nutrition is served as-is while the recipe's ingredient list and
+    the calculator version are unchanged.
     
     Path parameters:
         recipe_id: MongoDB ObjectId
     
+    Query parameters:
+        refresh: "true" to force recalculation (optional)
+    
     Returns:
         {
             "nutrition": {
@@ -352,8 +322,7 @@ def calculate_nutrition(current_user, recipe_id):
         }
     """
     try:
-        from utils.nutrition_api import calculate_recipe_nutrition
-        from models.database import get_db
+        from utils.nutrition_api import calculate_recipe_nutrition, is_nutrition_current
         
         # Validate ObjectId
         if not ObjectId.is_valid(recipe_id):
@@ -371,21 +340,34 @@ def calculate_nutrition(current_user, recipe_id):
         if not ingredients:
             return jsonify({'message': 'Recipe has no ingredients'}), 400
         
-        # Calculate nutrition
-        nutrition = calculate_recipe_nutrition(ingredients)
+        refresh = request.args.get('refresh', 'false').lower() == 'true'
         
-        # Update recipe in database with calculated nutrition
-        db = get_db()
-        db.recipes.update_one(
-            {'_id': ObjectId(recipe_id)},
-            {'$set': {'nutrition': nutrition}}
-        )
+        # Serve stored nutrition if it was calculated from the same ingredients
+        stored_nutrition = recipe.get('nutrition')
+        if not refresh and is_nutrition_current(stored_nutrition, ingredients):
+            return jsonify({
+                'nutrition': stored_nutrition,
+                'cached': True,
+                'message': f'Nutrition loaded ({stored_nutrition.get("ingredients_matched", 0)}/{stored_nutrition.get("total_ingredients", 0)} ingredients matched)'
+            }), 200
+        
+        # Calculate nutrition (USDA API calls are admission-limited)
+        with admission('nutrition'):
+            nutrition = calculate_recipe_nutrition(ingredients)
+        
+        # Update recipe in database with calculated nutrition, unless a USDA
+        # lookup failed and the totals are incomplete
+        if not nutrition.get('lookup_errors'):
+            RecipeDB.update_recipe_nutrition(recipe_id, nutrition)
         
         return jsonify({
             'nutrition': nutrition,
+            'cached': False,
             'message': f'Nutrition calculated successfully ({nutrition["ingredients_matched"]}/{nutrition["total_ingredients"]} ingredients matched)'
         }), 200
         
+    except AdmissionRejected as e:
+        return rejection_response(e)
     except Exception as e:
         import traceback
         print(f"Error calculating nutrition: {e}")
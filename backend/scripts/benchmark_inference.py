@@ -0,0 +1,361 @@
+"""
+Benchmark where /recognize time goes
+
+Generates synthetic images at several resolutions and formats and times each
+preprocessing stage (decode, RGB convert, resize, normalize) separately, in
+both standard and fast mode. Then measures model inference throughput for
+each available backend (Keras predict, compiled tf.function, TFLite) across
+batch sizes. Each backend runs in a fresh subprocess, so its reported memory
+does not include the models and TensorFlow state of the backends before it.
+
+Output is JSON with sorted keys and rounded numbers so runs can be diffed
+across commits:
+
+    python scripts/benchmark_inference.py --output bench_before.json
+    ... change code ...
+    python scripts/benchmark_inference.py --output bench_after.json
+    diff bench_before.json bench_after.json
+
+Usage:
+    python scripts/benchmark_inference.py
+    python scripts/benchmark_inference.py --backends compiled,tflite --batch-sizes 1,8,32
+    python scripts/benchmark_inference.py --skip-model
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+from PIL import Image, ImageOps
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.image_preprocessing import convert_to_rgb, resize_image, image_to_tensor
+
+DEFAULT_RESOLUTIONS = '640x480,1920x1080,4032x3024'
+DEFAULT_FORMATS = 'JPEG,PNG'
+DEFAULT_BATCH_SIZES = '1,2,4,8,16,32,64'
+DEFAULT_BACKENDS = 'keras,compiled,tflite'
+TARGET_SIZE = (224, 224)
+
+def synthetic_image(width, height, image_format, seed=0):
+    """
+    Encode a deterministic synthetic photo-like image
+
+    Smooth gradients plus noise, so JPEG/PNG sizes resemble real photos
+    rather than flat colour.
+
+    Args:
+        width: Image width
+        height: Image height
+        image_format: PIL format name, e.g. 'JPEG' or 'PNG'
+        seed: Random seed
+
+    Returns:
+        Encoded image bytes
+    """
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    pixels = np.empty((height, width, 3), dtype=np.float32)
+    pixels[..., 0] = x
+    pixels[..., 1] = y
+    pixels[..., 2] = (x + y) / 2
+    pixels += rng.normal(0, 20, size=pixels.shape)
+
+    image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), 'RGB')
+    buffer = io.BytesIO()
+    save_kwargs = {'quality': 90} if image_format == 'JPEG' else {}
+    image.save(buffer, format=image_format, **save_kwargs)
+    return buffer.getvalue()
+
+def percentiles(values_ms):
+    values = np.asarray(values_ms)
+    return {
+        'mean_ms': round(float(values.mean()), 3),
+        'p50_ms': round(float(np.percentile(values, 50)), 3),
+        'p99_ms': round(float(np.percentile(values, 99)), 3)
+    }
+
+def rss_mb():
+    """
+    Current and peak resident set size of this process
+
+    Returns:
+        Dictionary with 'rss_mb' and 'peak_rss_mb'
+    """
+    result = {}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    result['rss_mb'] = round(int(line.split()[1]) / 1024.0, 1)
+                elif line.startswith('VmHWM:'):
+                    result['peak_rss_mb'] = round(int(line.split()[1]) / 1024.0, 1)
+    except OSError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is kilobytes on Linux and bytes on macOS
+        divisor = 1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0
+        result['peak_rss_mb'] = round(peak / divisor, 1)
+    return result
+
+def time_preprocessing(data, fast, repeats):
+    """
+    Time each preprocessing stage for one encoded image
+
+    Mirrors prepare_image_tensor: fast mode uses JPEG draft decoding and a
+    reducing bilinear resize, standard mode a full decode and LANCZOS.
+
+    Args:
+        data: Encoded image bytes
+        fast: Benchmark the fast path
+        repeats: Number of timed repetitions
+
+    Returns:
+        Dictionary of per-stage latency statistics
+    """
+    stages = {'decode': [], 'rgb': [], 'resize': [], 'normalize': [], 'total': []}
+
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        image = Image.open(io.BytesIO(data))
+        if fast and image.format == 'JPEG':
+            image.draft('RGB', (TARGET_SIZE[0] * 2, TARGET_SIZE[1] * 2))
+        image.load()
+        image = ImageOps.exif_transpose(image)
+        t1 = time.perf_counter()
+
+        image = convert_to_rgb(image)
+        t2 = time.perf_counter()
+
+        if fast:
+            image = image.resize(TARGET_SIZE, Image.Resampling.BILINEAR, reducing_gap=2.0)
+        else:
+            image = resize_image(image, TARGET_SIZE)
+        t3 = time.perf_counter()
+
+        image_to_tensor(image)
+        t4 = time.perf_counter()
+
+        stages['decode'].append((t1 - t0) * 1000.0)
+        stages['rgb'].append((t2 - t1) * 1000.0)
+        stages['resize'].append((t3 - t2) * 1000.0)
+        stages['normalize'].append((t4 - t3) * 1000.0)
+        stages['total'].append((t4 - t0) * 1000.0)
+
+    return {stage: percentiles(values) for stage, values in stages.items()}
+
+def benchmark_preprocessing(resolutions, formats, repeats):
+    """
+    Benchmark preprocessing for every resolution/format/mode combination
+
+    Returns:
+        Nested dictionary keyed by "<format>_<W>x<H>" then mode
+    """
+    results = {}
+    for width, height in resolutions:
+        for image_format in formats:
+            data = synthetic_image(width, height, image_format)
+            key = f'{image_format.lower()}_{width}x{height}'
+            results[key] = {
+                'encoded_kb': round(len(data) / 1024.0, 1),
+                'standard': time_preprocessing(data, fast=False, repeats=repeats),
+                'fast': time_preprocessing(data, fast=True, repeats=repeats)
+            }
+            print(f"  preprocessing {key}: fast p50 {results[key]['fast']['total']['p50_ms']} ms, "
+                  f"standard p50 {results[key]['standard']['total']['p50_ms']} ms", file=sys.stderr)
+    return results
+
+def load_backend(backend, model_path, tflite_path):
+    """
+    Load a model for one serving backend
+
+    Args:
+        backend: 'keras', 'compiled' or 'tflite'
+        model_path: Keras model path (an untrained model is built if missing)
+        tflite_path: TFLite model path
+
+    Returns:
+        (model, reason) where model is None and reason explains why the
+        backend is unavailable
+    """
+    try:
+        from models.ingredient_recognition import (
+            IngredientRecognitionModel,
+            TFLiteIngredientModel,
+            configure_tf_threads
+        )
+
+        if backend == 'tflite':
+            if not os.path.exists(tflite_path):
+                return None, f'{tflite_path} not found (run models/export_tflite.py)'
+            return TFLiteIngredientModel(tflite_path), None
+
+        configure_tf_threads()
+        return IngredientRecognitionModel(model_path=model_path, compiled=backend == 'compiled'), None
+    except ImportError as e:
+        return None, f'missing dependency: {e}'
+
+def benchmark_backend(model, batch_sizes, iterations, warmup):
+    """
+    Measure inference latency and throughput across batch sizes
+
+    Args:
+        model: Loaded recognition model
+        batch_sizes: Batch sizes to test
+        iterations: Timed runs per batch size
+        warmup: Untimed runs per batch size (tracing, allocation)
+
+    Returns:
+        Dictionary keyed by "batch_<N>"
+    """
+    rng = np.random.default_rng(0)
+    results = {}
+
+    for batch_size in batch_sizes:
+        batch = rng.uniform(-1, 1, size=(batch_size, TARGET_SIZE[1], TARGET_SIZE[0], 3)).astype(np.float32)
+
+        for _ in range(warmup):
+            model.predict_probabilities(batch)
+
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            model.predict_probabilities(batch)
+            timings.append((time.perf_counter() - start) * 1000.0)
+
+        stats = percentiles(timings)
+        stats['images_per_sec'] = round(batch_size * 1000.0 / stats['mean_ms'], 1)
+        stats['per_image_ms'] = round(stats['mean_ms'] / batch_size, 3)
+        results[f'batch_{batch_size:02d}'] = stats
+        print(f"  batch {batch_size}: {stats['images_per_sec']} images/sec", file=sys.stderr)
+
+    return results
+
+def run_backend(backend, args):
+    """
+    Load and benchmark one backend in this process
+
+    Args:
+        backend: Backend name
+        args: Parsed command line arguments
+
+    Returns:
+        Report dictionary for the backend
+    """
+    batch_sizes = [int(b) for b in args.batch_sizes.split(',') if b]
+    baseline = rss_mb()
+
+    load_start = time.perf_counter()
+    model, reason = load_backend(backend, args.model, args.tflite_model)
+    if model is None:
+        print(f"  skipped: {reason}", file=sys.stderr)
+        return {'available': False, 'reason': reason}
+
+    return {
+        'available': True,
+        'load_seconds': round(time.perf_counter() - load_start, 3),
+        'batches': benchmark_backend(model, batch_sizes, args.iterations, args.warmup),
+        'memory': dict(rss_mb(), baseline_rss_mb=baseline.get('rss_mb'))
+    }
+
+def run_backend_isolated(backend, args):
+    """
+    Benchmark one backend in a fresh Python process
+
+    Args:
+        backend: Backend name
+        args: Parsed command line arguments
+
+    Returns:
+        Report dictionary for the backend
+    """
+    command = [
+        sys.executable, os.path.abspath(__file__),
+        '--backend-worker', backend,
+        '--batch-sizes', args.batch_sizes,
+        '--iterations', str(args.iterations),
+        '--warmup', str(args.warmup),
+        '--model', args.model,
+        '--tflite-model', args.tflite_model
+    ]
+    # Progress goes to our stderr; the backend report comes back on stdout
+    result = subprocess.run(command, stdout=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        return {'available': False, 'reason': f'benchmark process exited with {result.returncode}'}
+    return json.loads(result.stdout)
+
+def environment_info():
+    info = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pillow': Image.__version__
+    }
+    try:
+        info['git_commit'] = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        info['git_commit'] = None
+    return info
+
+def parse_resolutions(value):
+    return [tuple(int(part) for part in item.lower().split('x')) for item in value.split(',') if item]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark preprocessing stages and model backends')
+    parser.add_argument('--resolutions', default=DEFAULT_RESOLUTIONS, help='Comma-separated WxH list')
+    parser.add_argument('--formats', default=DEFAULT_FORMATS, help='Comma-separated PIL formats')
+    parser.add_argument('--repeats', type=int, default=20, help='Timed runs per preprocessing case')
+    parser.add_argument('--backends', default=DEFAULT_BACKENDS)
+    parser.add_argument('--batch-sizes', default=DEFAULT_BATCH_SIZES)
+    parser.add_argument('--iterations', type=int, default=10, help='Timed runs per batch size')
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--model', default=os.getenv('MODEL_PATH', 'models/ingredient_model.h5'))
+    parser.add_argument('--tflite-model', default=os.getenv('TFLITE_MODEL_PATH', 'models/ingredient_model_int8.tflite'))
+    parser.add_argument('--skip-model', action='store_true', help='Only benchmark preprocessing')
+    parser.add_argument('--output', default=None, help='Write JSON here instead of stdout')
+    parser.add_argument('--backend-worker', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.backend_worker:
+        # Model loading logs with print; keep stdout for the JSON report
+        with contextlib.redirect_stdout(sys.stderr):
+            backend_report = run_backend(args.backend_worker, args)
+        print(json.dumps(backend_report))
+        sys.exit(0)
+
+    report = {'environment': environment_info()}
+
+    print("Benchmarking preprocessing...", file=sys.stderr)
+    report['preprocessing'] = benchmark_preprocessing(
+        parse_resolutions(args.resolutions),
+        [f.strip().upper() for f in args.formats.split(',') if f.strip()],
+        args.repeats
+    )
+    report['memory_after_preprocessing'] = rss_mb()
+
+    if not args.skip_model:
+        report['inference'] = {}
+
+        for backend in [b.strip() for b in args.backends.split(',') if b.strip()]:
+            print(f"Benchmarking {backend} backend...", file=sys.stderr)
+            report['inference'][backend] = run_backend_isolated(backend, args)
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
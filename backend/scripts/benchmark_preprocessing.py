@@ -0,0 +1,122 @@
+"""
+Compare standard and fast (draft-mode) image preprocessing
+
+Measures per-image preprocessing latency for both modes on the validation
+split of the training directory and, when a trained model is available,
+the top-1 accuracy each mode achieves.
+
+Usage:
+    python scripts/benchmark_preprocessing.py --data-dir data/ingredients
+    python scripts/benchmark_preprocessing.py --data-dir data/ingredients --model models/ingredient_model.h5
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.image_preprocessing import prepare_image_tensor
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+def validation_images(data_dir, validation_split=0.2, limit=None):
+    """
+    List (path, label) pairs for the validation split
+
+    Mirrors ImageDataGenerator's split, which reserves the first
+    validation_split fraction of each class folder for validation.
+
+    Args:
+        data_dir: Directory with one folder per class
+        validation_split: Fraction of each class used for validation
+        limit: Optional maximum number of images
+
+    Returns:
+        List of (path, class_name) tuples
+    """
+    samples = []
+    for class_name in sorted(os.listdir(data_dir)):
+        class_dir = os.path.join(data_dir, class_name)
+        if not os.path.isdir(class_dir):
+            continue
+        files = sorted(f for f in os.listdir(class_dir) if f.lower().endswith(IMAGE_EXTENSIONS))
+        count = int(len(files) * validation_split)
+        samples.extend((os.path.join(class_dir, f), class_name) for f in files[:count])
+
+    return samples[:limit] if limit else samples
+
+def percentile(values, q):
+    return round(float(np.percentile(values, q)), 3) if values else None
+
+def benchmark(samples, model=None):
+    """
+    Time both preprocessing modes and optionally score them
+
+    Args:
+        samples: List of (path, class_name) tuples
+        model: Optional loaded recognition model
+
+    Returns:
+        Dictionary of results per mode
+    """
+    results = {}
+    predictions = {}
+
+    for mode, fast in (('standard', False), ('fast', True)):
+        timings = []
+        correct = 0
+        predicted = []
+
+        for path, label in samples:
+            start = time.perf_counter()
+            tensor = prepare_image_tensor(path, fast=fast)
+            timings.append((time.perf_counter() - start) * 1000.0)
+
+            if model is not None:
+                top = model.predict(tensor, top_k=1)[0]['name']
+                predicted.append(top)
+                correct += int(top == label)
+
+        results[mode] = {
+            'images': len(samples),
+            'mean_ms': round(float(np.mean(timings)), 3) if timings else None,
+            'p50_ms': percentile(timings, 50),
+            'p99_ms': percentile(timings, 99)
+        }
+        if model is not None:
+            results[mode]['top1_accuracy'] = round(correct / max(len(samples), 1), 4)
+            predictions[mode] = predicted
+
+    if model is not None and samples:
+        agree = sum(a == b for a, b in zip(predictions['standard'], predictions['fast']))
+        results['top1_agreement'] = round(agree / len(samples), 4)
+
+    if results['standard']['mean_ms']:
+        results['speedup'] = round(results['standard']['mean_ms'] / results['fast']['mean_ms'], 2)
+
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark standard vs fast image preprocessing')
+    parser.add_argument('--data-dir', default='data/ingredients')
+    parser.add_argument('--model', default=None, help='Trained model to measure accuracy impact')
+    parser.add_argument('--validation-split', type=float, default=0.2)
+    parser.add_argument('--limit', type=int, default=None)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.data_dir):
+        print(f"Error: Data directory '{args.data_dir}' not found!")
+        sys.exit(1)
+
+    model = None
+    if args.model:
+        from models.ingredient_recognition import IngredientRecognitionModel
+        model = IngredientRecognitionModel(model_path=args.model)
+
+    samples = validation_images(args.data_dir, args.validation_split, args.limit)
+    print(f"Benchmarking {len(samples)} validation images...")
+    print(json.dumps(benchmark(samples, model), indent=2, sort_keys=True))
@@ -0,0 +1,161 @@
+"""
+Per-process memory report for the API and inference server
+
+Reads /proc/<pid>/smaps_rollup (Linux) for each matching process and reports
+RSS, PSS (shared pages split between the processes sharing them) and USS
+(pages private to the process). PSS sums to the real memory used by the
+group, so it is the number to compare between deployment modes.
+
+When a shared inference server is running, the report also estimates how
+much memory the web workers would use if each loaded its own model.
+
+Usage:
+    python scripts/memory_report.py
+    python scripts/memory_report.py --match gunicorn,inference_server --json
+    python scripts/memory_report.py --pids 1234,1235
+"""
+import argparse
+import json
+import os
+import sys
+
+DEFAULT_MATCH = 'gunicorn,app.py,inference_server'
+
+def read_cmdline(pid):
+    try:
+        with open(f'/proc/{pid}/cmdline', 'rb') as f:
+            return f.read().replace(b'\0', b' ').decode(errors='replace').strip()
+    except OSError:
+        return ''
+
+def read_memory(pid):
+    """
+    Read RSS, PSS and USS for a process
+
+    Args:
+        pid: Process ID
+
+    Returns:
+        Dictionary of values in MB, or None if the process is gone
+    """
+    fields = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                    fields[parts[0][:-1]] = int(parts[1])
+    except OSError:
+        # Kernels without smaps_rollup: fall back to RSS only
+        try:
+            with open(f'/proc/{pid}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        fields['Rss'] = int(line.split()[1])
+        except OSError:
+            return None
+
+    to_mb = lambda kb: round(kb / 1024.0, 1) if kb is not None else None
+    uss = None
+    if 'Private_Clean' in fields:
+        uss = fields['Private_Clean'] + fields.get('Private_Dirty', 0)
+
+    return {
+        'rss_mb': to_mb(fields.get('Rss')),
+        'pss_mb': to_mb(fields.get('Pss')),
+        'uss_mb': to_mb(uss)
+    }
+
+def find_processes(patterns, pids=None):
+    """
+    List processes whose command line contains any of the patterns
+
+    Args:
+        patterns: Substrings to match against the command line
+        pids: Explicit PIDs (overrides pattern matching)
+
+    Returns:
+        List of dicts with pid, role, cmdline and memory
+    """
+    if pids:
+        candidates = pids
+    else:
+        candidates = [int(p) for p in os.listdir('/proc') if p.isdigit()]
+
+    own_pid = os.getpid()
+    processes = []
+    for pid in candidates:
+        if pid == own_pid:
+            continue
+        cmdline = read_cmdline(pid)
+        if not pids and not any(pattern in cmdline for pattern in patterns):
+            continue
+
+        memory = read_memory(pid)
+        if memory is None:
+            continue
+
+        processes.append({
+            'pid': pid,
+            'role': 'inference_server' if 'inference_server' in cmdline else 'web_worker',
+            'cmdline': cmdline[:120],
+            **memory
+        })
+
+    return sorted(processes, key=lambda p: (p['role'], p['pid']))
+
+def summarize(processes):
+    """
+    Total memory per role and estimate the saving from the shared server
+
+    Returns:
+        Summary dictionary
+    """
+    def total(role, key):
+        return round(sum(p[key] or 0 for p in processes if p['role'] == role), 1)
+
+    web_workers = sum(1 for p in processes if p['role'] == 'web_worker')
+    summary = {
+        'web_workers': web_workers,
+        'web_pss_mb': total('web_worker', 'pss_mb'),
+        'web_rss_per_worker_mb': round(total('web_worker', 'rss_mb') / web_workers, 1) if web_workers else None,
+        'inference_server_pss_mb': total('inference_server', 'pss_mb'),
+        'total_pss_mb': round(sum(p['pss_mb'] or 0 for p in processes), 1)
+    }
+
+    servers = [p for p in processes if p['role'] == 'inference_server']
+    if servers and web_workers:
+        # Private memory of the server is roughly what TensorFlow and the
+        # model add to every worker that loads them itself
+        model_mb = servers[0]['uss_mb'] or servers[0]['rss_mb']
+        summary['model_private_mb'] = model_mb
+        summary['estimated_per_worker_model_total_mb'] = round(summary['web_pss_mb'] + web_workers * model_mb, 1)
+        summary['estimated_saving_mb'] = round(summary['estimated_per_worker_model_total_mb'] - summary['total_pss_mb'], 1)
+
+    return summary
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Report per-process memory for API workers')
+    parser.add_argument('--match', default=DEFAULT_MATCH, help='Comma-separated command line substrings')
+    parser.add_argument('--pids', default=None, help='Comma-separated PIDs to report instead of matching')
+    parser.add_argument('--json', action='store_true', help='Print JSON instead of a table')
+    args = parser.parse_args()
+
+    if not os.path.isdir('/proc'):
+        print("Error: /proc not available (Linux only)")
+        sys.exit(1)
+
+    pids = [int(p) for p in args.pids.split(',') if p] if args.pids else None
+    processes = find_processes([m for m in args.match.split(',') if m], pids)
+    summary = summarize(processes)
+
+    if args.json:
+        print(json.dumps({'processes': processes, 'summary': summary}, indent=2, sort_keys=True))
+    else:
+        print(f"{'PID':>7}  {'ROLE':<17} {'RSS MB':>8} {'PSS MB':>8} {'USS MB':>8}  COMMAND")
+        for p in processes:
+            print(f"{p['pid']:>7}  {p['role']:<17} {p['rss_mb'] or '-':>8} {p['pss_mb'] or '-':>8} "
+                  f"{p['uss_mb'] or '-':>8}  {p['cmdline']}")
+        print()
+        for key, value in summary.items():
+            print(f"{key}: {value}")
@@ -0,0 +1,74 @@
+"""
+Tests for admission control
+"""
+import pytest
+import sys
+import os
+import threading
+import time
+from flask import Flask
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.admission as admission_module
+from utils.admission import AdmissionLimiter, AdmissionRejected, admission_limited
+
+def test_waiting_request_gets_released_slot():
+    """A queued request is admitted as soon as a slot frees up"""
+    limiter = AdmissionLimiter('test', max_concurrent=1, max_queue=1, max_wait=5.0)
+    limiter.acquire()
+
+    admitted = threading.Event()
+    def waiter():
+        limiter.acquire()
+        admitted.set()
+    thread = threading.Thread(target=waiter)
+    thread.start()
+
+    while limiter.stats()['queue_depth'] == 0:
+        time.sleep(0.005)
+    assert not admitted.is_set()
+    limiter.release()
+    thread.join(timeout=5.0)
+    assert admitted.is_set()
+    assert limiter.stats()['in_flight'] == 1
+
+def test_rejections():
+    """Full queue answers 429 at once; an expired wait answers 503"""
+    limiter = AdmissionLimiter('test', max_concurrent=1, max_queue=0, max_wait=0.05)
+    limiter.acquire()
+    with pytest.raises(AdmissionRejected) as rejected:
+        limiter.acquire()
+    assert rejected.value.status_code == 429
+    assert rejected.value.retry_after >= 1
+
+    limiter.max_queue = 1
+    start = time.perf_counter()
+    with pytest.raises(AdmissionRejected) as rejected:
+        limiter.acquire()
+    assert rejected.value.status_code == 503
+    assert time.perf_counter() - start < 1.0
+
+    stats = limiter.stats()
+    assert (stats['rejected_queue_full'], stats['rejected_timeout'], stats['queue_depth']) == (1, 1, 0)
+
+def test_decorator_returns_retry_after(monkeypatch):
+    """Rejected routes answer with a Retry-After header"""
+    monkeypatch.setattr(admission_module, 'ADMISSION_ENABLED', True)
+    monkeypatch.setitem(admission_module.limiters, 'vision',
+                        AdmissionLimiter('vision', max_concurrent=0, max_queue=0))
+
+    app = Flask(__name__)
+
+    @app.route('/heavy')
+    @admission_limited('vision')
+    def heavy():
+        return 'ok'
+
+    response = app.test_client().get('/heavy')
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == str(response.get_json()['retry_after'])
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -2,10 +2,14 @@ import pytest
 import sys
 import os
 import json
+import threading
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Don't load the recognition model in the background during tests
+os.environ.setdefault('MODEL_EAGER_LOAD', 'False')
+
 from app import app
 
 @pytest.fixture
@@ -30,6 +34,31 @@ def test_health_check(client):
     data = json.loads(response.data)
     assert data['status'] == 'healthy'
 
+def test_ready_endpoint(client):
+    """Test readiness endpoint with eager loading disabled (the test setting)"""
+    response = client.get('/ready')
+    
+    # The model loads on the first request, so the worker is ready at once
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['ready'] is True
+
+def test_ready_endpoint_waits_for_eager_load(client, monkeypatch):
+    """Test readiness endpoint while an eagerly loaded model is still warming up"""
+    import models.ingredient_recognition as recognition
+    monkeypatch.setattr(sys.modules['app'], 'MODEL_EAGER_LOAD', True)
+    monkeypatch.setattr(recognition, '_model_ready', threading.Event())
+    monkeypatch.setattr(recognition, '_model_status', dict(recognition._model_status, state='warming_up'))
+    
+    response = client.get('/ready')
+    assert response.status_code == 503
+    assert json.loads(response.data)['ready'] is False
+    
+    recognition._model_ready.set()
+    response = client.get('/ready')
+    assert response.status_code == 200
+    assert json.loads(response.data)['ready'] is True
+
 def test_register_user(client):
     """Test user registration"""
     user_data = {
@@ -71,6 +100,32 @@ def test_upload_no_file(client):
     data = json.loads(response.data)
     assert 'message' in data
 
+def test_recognize_without_model_falls_back(client, monkeypatch):
+    """Test that a missing model file does not turn /recognize into a 500"""
+    import io
+    from PIL import Image
+    import routes.image_routes as image_routes
+    
+    def missing_model():
+        raise FileNotFoundError("Model file 'models/ingredient_model.h5' not found")
+    
+    monkeypatch.setattr(image_routes, 'get_model_version', missing_model)
+    monkeypatch.setattr(image_routes, 'recognize_image', lambda context, mode, multi_crop=False: {
+        'ingredients': [], 'method': 'placeholder', 'message': 'Could not recognize ingredients'
+    })
+    
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), color='red').save(buffer, format='JPEG')
+    buffer.seek(0)
+    response = client.post(
+        '/api/image/recognize',
+        data={'image': (buffer, 'shelf.jpg')},
+        content_type='multipart/form-data'
+    )
+    
+    assert response.status_code == 200
+    assert json.loads(response.data)['method'] == 'placeholder'
+
 def test_recipe_search(client):
     """Test recipe search endpoint"""
     response = client.get('/api/recipes/search')
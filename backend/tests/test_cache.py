@@ -0,0 +1,53 @@
+import pytest
+import sys
+import os
+import time
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.cache import TTLLRUCache
+
+def test_cache_hit_and_miss():
+    """Test basic read-through behaviour and counters"""
+    cache = TTLLRUCache(max_size=2, ttl=60)
+
+    assert cache.get('a') is None
+    cache.set('a', {'name': 'pasta'})
+    assert cache.get('a') == {'name': 'pasta'}
+
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['hit_rate'] == 0.5
+
+def test_cache_evicts_least_recently_used():
+    """Test LRU eviction order"""
+    cache = TTLLRUCache(max_size=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+
+    # Touch 'a' so 'b' becomes least recently used
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+def test_cache_ttl_and_invalidation():
+    """Test entry expiry and explicit invalidation"""
+    cache = TTLLRUCache(max_size=10, ttl=0.05)
+    cache.set('a', 1)
+    cache.set('b', 2)
+
+    cache.invalidate('b')
+    assert cache.get('b') is None
+
+    time.sleep(0.06)
+    assert cache.get('a') is None
+    assert cache.stats()['expirations'] == 1
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
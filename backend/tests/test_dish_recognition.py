@@ -0,0 +1,46 @@
+"""
+Tests for dish recognition
+"""
+import pytest
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import models.ingredient_recognition as recognition
+from utils.dish_recognition import recognize_dish_from_image, normalize_dish_name
+
+def test_normalize_dish_name():
+    """Test that class folder names become display names"""
+    assert normalize_dish_name('Fried_Rice') == 'fried rice'
+
+def test_recognize_dish_uses_shared_prediction(monkeypatch):
+    """Test that the dish and ingredient results come from one joint prediction"""
+    calls = []
+
+    def fake_predict(image, top_k=3):
+        calls.append(image)
+        dishes = [{'name': 'fried_rice', 'confidence': 0.8}, {'name': 'biryani', 'confidence': 0.1}]
+        ingredients = [{'name': 'egg', 'confidence': 0.6}]
+        return dishes, ingredients
+
+    monkeypatch.setattr(recognition, 'predict_dish_and_ingredients', fake_predict)
+    result = recognize_dish_from_image('image')
+
+    assert len(calls) == 1
+    assert result['dish_name'] == 'fried rice'
+    assert result['category'] == 'Asian'
+    assert 'soy sauce' in result['common_ingredients']
+    assert result['alternatives'] == [{'name': 'biryani', 'confidence': 0.1}]
+    assert result['detected_ingredients'] == [{'name': 'egg', 'confidence': 0.6}]
+
+def test_backend_without_dish_head():
+    """Test that backends without a dish head say so"""
+    model = recognition.BaseRecognitionModel()
+    assert not model.has_dish_head
+    with pytest.raises(NotImplementedError):
+        model.predict_joint(None)
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,111 @@
+"""
+Tests for the few-shot embedding index
+"""
+import pytest
+import sys
+import os
+import threading
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.embedding_index import EmbeddingIndex, merge_predictions, normalize_rows
+
+def test_classify_finds_nearest_class():
+    """Queries are labeled by their most similar stored examples"""
+    index = EmbeddingIndex()
+    index.add('dragon fruit', [[1.0, 0.0, 0.0], [0.9, 0.1, 0.0]])
+    index.add('okra', [[0.0, 1.0, 0.0]])
+
+    results = index.classify(np.array([[2.0, 0.1, 0.0], [0.0, 0.0, 1.0]]), k=3, min_similarity=0.5)
+    assert results[0][0]['name'] == 'dragon fruit'
+    assert results[0][0]['confidence'] > 0.99
+    assert [p['name'] for p in results[0]] == ['dragon fruit']
+    assert results[1] == []
+
+def test_unrelated_images_do_not_match():
+    """Non-negative features share a common component that centering removes"""
+    rng = np.random.default_rng(0)
+    common = rng.random(64) * 4
+
+    def images(signal, count):
+        return common + signal + rng.random((count, 64))
+
+    okra, kale, unrelated = (rng.random(64) * 3 for _ in range(3))
+    index = EmbeddingIndex()
+    index.add('okra', images(okra, 3))
+    index.add('kale', images(kale, 3))
+
+    query = images(unrelated, 1)
+    raw = normalize_rows(query) @ normalize_rows(index.vectors).T
+    assert raw.min() > 0.8
+    assert index.classify(query) == [[]]
+    assert index.classify(images(okra, 1))[0][0]['name'] == 'okra'
+
+def test_remove_and_dimension_check():
+    """Classes can be removed and embeddings must match the index size"""
+    index = EmbeddingIndex()
+    assert index.add('okra', np.ones((3, 4))) == 3
+    with pytest.raises(ValueError):
+        index.add('okra', np.ones((1, 5)))
+    assert index.remove('okra') == 3
+    assert len(index) == 0
+    assert index.classify(np.ones((2, 4))) == [[], []]
+
+def test_save_and_reload(tmp_path):
+    """Another process sees saved examples; a different model ignores them"""
+    path = str(tmp_path / 'few_shot.npz')
+    index = EmbeddingIndex(path, model_version='v1')
+    index.add('okra', np.eye(4)[:2])
+    index.save()
+
+    reloaded = EmbeddingIndex(path, model_version='v1')
+    assert reloaded.class_counts() == {'okra': 2}
+    assert reloaded.revision == index.revision
+    assert reloaded.mean_count == 2
+    assert len(EmbeddingIndex(path, model_version='v2')) == 0
+
+def test_concurrent_updates_are_not_lost(tmp_path):
+    """Edits through separate index instances (one per worker) all reach the file"""
+    path = str(tmp_path / 'few_shot.npz')
+    workers = [EmbeddingIndex(path, model_version='v1') for _ in range(4)]
+
+    def add_examples(index, worker):
+        for i in range(5):
+            with index.update():
+                index.add(f'class-{worker}-{i}', np.eye(4)[:1])
+
+    threads = [threading.Thread(target=add_examples, args=(index, worker)) for worker, index in enumerate(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(EmbeddingIndex(path, model_version='v1').class_counts()) == 20
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+def test_weights_digest_ignores_touch(tmp_path):
+    """Redeploying identical weights keeps the backbone tag; new weights change it"""
+    from models.ingredient_recognition import weights_digest
+
+    path = tmp_path / 'model.h5'
+    path.write_bytes(b'weights v1')
+    digest = weights_digest(str(path))
+
+    os.utime(path, (1, 1))
+    assert weights_digest(str(path)) == digest
+    path.write_bytes(b'weights v2')
+    assert weights_digest(str(path)) != digest
+    assert weights_digest(str(tmp_path / 'missing.h5')) == 'missing'
+
+def test_merge_keeps_highest_confidence():
+    """Softmax and few-shot predictions merge by name, best first"""
+    softmax = [{'name': 'tomato', 'confidence': 0.4}, {'name': 'okra', 'confidence': 0.2}]
+    few_shot = [{'name': 'okra', 'confidence': 0.8, 'source': 'few_shot'}]
+    merged = merge_predictions(softmax, few_shot, top_k=2)
+    assert [p['name'] for p in merged] == ['okra', 'tomato']
+    assert merged[0]['confidence'] == 0.8
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,52 @@
+import pytest
+import sys
+import os
+import io
+from PIL import Image
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.image_context import ImageContext
+
+def make_jpeg(size=(640, 480), color='orange'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color=color).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+def test_image_context_decodes_once():
+    """Test that OCR and display access share one decoded image"""
+    context = ImageContext(make_jpeg())
+
+    first = context.image
+    assert context.image is first
+    assert context.ocr_image.mode == 'L'
+    assert context.ocr_image.size == first.size
+
+def test_image_context_from_upload_rewinds():
+    """Test reading an upload that was already partially consumed"""
+    data = make_jpeg()
+    upload = io.BytesIO(data)
+    upload.filename = 'shelf.jpg'
+    upload.read(10)
+
+    context = ImageContext.from_upload(upload)
+
+    assert context.data == data
+    assert context.filename == 'shelf.jpg'
+    assert context.image.size == (640, 480)
+
+def test_fast_model_input_decodes_at_reduced_size():
+    """Test that the fast path draft-decodes a JPEG instead of decoding it in full"""
+    context = ImageContext(make_jpeg(size=(1600, 1200)))
+
+    resized = context.model_input((224, 224), fast=True)
+
+    assert resized.size == (224, 224)
+    assert context._image is None
+    reduced = context.reduced_image((224, 224))
+    assert reduced.size[0] < 1600
+    assert reduced.size[0] >= 448
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,54 @@
+"""
+Import-time budget for the API process
+
+Fails when importing the app starts pulling heavy ML/OCR dependencies back
+in at module level or when startup gets slower than the budget.
+"""
+import pytest
+import sys
+import os
+import json
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Generous enough for slow CI machines; importing TensorFlow alone exceeds it
+IMPORT_TIME_BUDGET = float(os.getenv('IMPORT_TIME_BUDGET', 2.0))
+
+HEAVY_MODULES = ('tensorflow', 'keras', 'sklearn', 'pytesseract', 'cv2')
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    'elapsed': elapsed,
+    'loaded': [m for m in %r if m in sys.modules]
+}))
+""" % (HEAVY_MODULES,)
+
+def import_app():
+    env = dict(os.environ, MODEL_EAGER_LOAD='False', MONGO_ENSURE_INDEXES='False')
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60,
+        check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def test_app_import_skips_heavy_dependencies():
+    """Importing the app does not import ML or OCR libraries"""
+    assert import_app()['loaded'] == []
+
+def test_app_import_time_budget():
+    """Importing the app stays within the startup budget"""
+    elapsed = import_app()['elapsed']
+    assert elapsed < IMPORT_TIME_BUDGET, f'app import took {elapsed:.2f}s (budget {IMPORT_TIME_BUDGET}s)'
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
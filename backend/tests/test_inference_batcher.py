@@ -0,0 +1,72 @@
+import pytest
+import sys
+import os
+import numpy as np
+from PIL import Image
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.inference_batcher import InferenceBatcher
+
+def fake_model(batch):
+    """Return each image's mean pixel value as its output row"""
+    return batch.reshape(len(batch), -1).mean(axis=1, keepdims=True)
+
+def test_concurrent_requests_share_a_batch():
+    """Test that concurrent submissions are served by one forward pass"""
+    calls = []
+
+    def batch_fn(batch):
+        calls.append(len(batch))
+        return fake_model(batch)
+
+    batcher = InferenceBatcher(batch_fn, max_batch_size=8, max_wait_ms=200)
+    try:
+        futures = [batcher.submit(np.full((1, 4, 4, 3), i, dtype=np.float32)) for i in range(8)]
+        results = [future.result(timeout=5) for future in futures]
+    finally:
+        batcher.stop()
+
+    assert calls == [8]
+    assert [float(r[0]) for r in results] == [float(i) for i in range(8)]
+    assert batcher.stats()['batch_size']['count'] == 1
+
+def test_partial_batch_flushes_after_max_wait():
+    """Test that a lone request is not held longer than max_wait_ms"""
+    batcher = InferenceBatcher(fake_model, max_batch_size=16, max_wait_ms=5)
+    try:
+        result = batcher.predict(np.ones((1, 4, 4, 3), dtype=np.float32), timeout=5)
+    finally:
+        batcher.stop()
+
+    assert float(result[0]) == 1.0
+
+def test_batch_errors_reach_every_caller():
+    """Test that a failing forward pass fails all requests in the batch"""
+    def broken(batch):
+        raise RuntimeError('model failed')
+
+    batcher = InferenceBatcher(broken, max_batch_size=4, max_wait_ms=50)
+    try:
+        futures = [batcher.submit(np.zeros((4, 4, 3), dtype=np.float32)) for _ in range(2)]
+        for future in futures:
+            with pytest.raises(RuntimeError):
+                future.result(timeout=5)
+    finally:
+        batcher.stop()
+
+def test_pil_images_are_scaled_into_the_batch():
+    """Test that resized PIL images are written into the batch buffer"""
+    batcher = InferenceBatcher(fake_model, max_batch_size=4, max_wait_ms=5)
+    try:
+        white = batcher.predict(Image.new('RGB', (4, 4), color='white'), timeout=5)
+        black = batcher.predict(Image.new('RGB', (4, 4), color='black'), timeout=5)
+    finally:
+        batcher.stop()
+
+    assert float(white[0]) == pytest.approx(1.0)
+    assert float(black[0]) == pytest.approx(-1.0)
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
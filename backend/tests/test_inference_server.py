@@ -0,0 +1,120 @@
+"""
+Tests for the shared inference server protocol
+"""
+import pytest
+import sys
+import os
+import threading
+import numpy as np
+from multiprocessing.connection import Listener
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.inference_server import RemoteRecognitionModel, bind_listener, serve_forever, to_model_batch
+from models.ingredient_recognition import BaseRecognitionModel
+
+AUTHKEY = b'test-key'
+
+class FakeModel(BaseRecognitionModel):
+    class_names = ['tomato', 'onion']
+
+    def predict_probabilities(self, batch):
+        """Probability of 'tomato' is the mean scaled pixel mapped to [0, 1]"""
+        tomato = (batch.reshape(len(batch), -1).mean(axis=1) + 1) / 2
+        return np.stack([tomato, 1 - tomato], axis=1)
+
+@pytest.fixture
+def serving():
+    return {'model': FakeModel(), 'version': 'test:1'}
+
+@pytest.fixture
+def server(tmp_path, serving):
+    address = str(tmp_path / 'inference.sock')
+    listener = Listener(address, family='AF_UNIX', authkey=AUTHKEY)
+    info = lambda: {'class_names': serving['model'].class_names, 'version': serving['version'], 'status': {'ready': True}}
+    thread = threading.Thread(
+        target=serve_forever,
+        args=(listener, lambda: serving['model'], info, None, lambda: serving['version']),
+        daemon=True
+    )
+    thread.start()
+    yield address
+    listener.close()
+
+def test_remote_prediction_round_trip(server):
+    """Predictions and class names come from the server process"""
+    model = RemoteRecognitionModel(server, authkey=AUTHKEY)
+    model.wait_until_ready(timeout=5)
+
+    pixels = np.full((1, 4, 4, 3), 255, dtype=np.uint8)
+    predictions = model.predict(pixels, top_k=2)
+
+    assert predictions[0]['name'] == 'tomato'
+    assert predictions[0]['confidence'] == pytest.approx(1.0)
+    assert model.version == 'remote:test:1'
+
+def test_replies_carry_the_labels_of_the_serving_model(server, serving):
+    """After a server-side swap, predictions decode with the new class names at once"""
+    model = RemoteRecognitionModel(server, authkey=AUTHKEY, info_ttl=3600)
+    model.wait_until_ready(timeout=5)
+    assert model.version == 'remote:test:1'
+
+    swapped = FakeModel()
+    swapped.class_names = ['basil', 'garlic']
+    serving.update(model=swapped, version='test:2')
+
+    pixels = np.full((1, 4, 4, 3), 255, dtype=np.uint8)
+    assert model.predict(pixels, top_k=1)[0]['name'] == 'basil'
+    assert model.version == 'remote:test:2'
+    assert model.class_names == ['basil', 'garlic']
+
+def test_uint8_batches_are_scaled():
+    """uint8 pixels sent by clients are scaled to [-1, 1]"""
+    batch = to_model_batch(np.array([[[[0, 255, 0]]]], dtype=np.uint8))
+    assert batch.dtype == np.float32
+    assert np.allclose(batch, [[[[-1.0, 1.0, -1.0]]]])
+
+def test_unavailable_server(tmp_path):
+    """A missing server raises ConnectionError"""
+    model = RemoteRecognitionModel(str(tmp_path / 'missing.sock'), authkey=AUTHKEY)
+    with pytest.raises(ConnectionError):
+        model.predict_probabilities(np.zeros((1, 4, 4, 3), dtype=np.uint8))
+
+def test_missing_authkey_is_refused(tmp_path):
+    """Clients refuse to talk to the server without a shared secret"""
+    with pytest.raises(ValueError):
+        RemoteRecognitionModel(str(tmp_path / 'inference.sock'), authkey=b'')
+
+def test_socket_is_private(tmp_path):
+    """The socket and a newly created directory are only accessible to this user"""
+    address = str(tmp_path / 'private' / 'inference.sock')
+    listener = bind_listener(address, AUTHKEY)
+    try:
+        assert os.stat(address).st_mode & 0o777 == 0o600
+        assert os.stat(os.path.dirname(address)).st_mode & 0o777 == 0o700
+    finally:
+        listener.close()
+
+def test_hung_server_times_out(tmp_path):
+    """A server that never replies raises ConnectionError after the timeout"""
+    address = str(tmp_path / 'inference.sock')
+    listener = Listener(address, family='AF_UNIX', authkey=AUTHKEY)
+    done = threading.Event()
+    def accept_and_hang():
+        conn = listener.accept()
+        conn.recv()
+        done.wait()
+        conn.close()
+    threading.Thread(target=accept_and_hang, daemon=True).start()
+
+    model = RemoteRecognitionModel(address, authkey=AUTHKEY, timeout=0.2)
+    try:
+        with pytest.raises(ConnectionError):
+            model.predict_probabilities(np.zeros((1, 4, 4, 3), dtype=np.uint8))
+    finally:
+        done.set()
+        listener.close()
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
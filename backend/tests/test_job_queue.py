@@ -0,0 +1,219 @@
+"""
+Tests for the background job queue
+"""
+import pytest
+import sys
+import os
+import queue
+import threading
+import time
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.job_queue import JobQueue, MemoryJobStore, MongoJobStore
+
+def wait_for(job_queue, job_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = job_queue.get(job_id)
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.01)
+    raise AssertionError('job did not finish')
+
+class FakeCollection:
+    """Just enough of a pymongo collection for MongoJobStore"""
+    
+    def __init__(self):
+        self.documents = {}
+        self.lock = threading.Lock()
+        self.claim_queries = 0
+    
+    @staticmethod
+    def _matches(document, query):
+        for field, condition in query.items():
+            if field == '$or':
+                if not any(FakeCollection._matches(document, option) for option in condition):
+                    return False
+                continue
+            value = document.get(field)
+            if isinstance(condition, dict):
+                if '$lt' in condition and not (value is not None and value < condition['$lt']):
+                    return False
+                if '$gte' in condition and not (value is not None and value >= condition['$gte']):
+                    return False
+            elif value != condition:
+                return False
+        return True
+    
+    @staticmethod
+    def _apply(document, update):
+        document.update(update.get('$set', {}))
+        for field in update.get('$unset', {}):
+            document.pop(field, None)
+        for field, amount in update.get('$inc', {}).items():
+            document[field] = document.get(field, 0) + amount
+    
+    def count_documents(self, query):
+        with self.lock:
+            return sum(1 for document in self.documents.values() if self._matches(document, query))
+    
+    def estimated_document_count(self):
+        return len(self.documents)
+    
+    def insert_one(self, document):
+        with self.lock:
+            self.documents[document['_id']] = dict(document)
+    
+    def find_one_and_update(self, query, update, sort=None, return_document=None):
+        with self.lock:
+            self.claim_queries += 1
+            matches = [document for document in self.documents.values() if self._matches(document, query)]
+            if not matches:
+                return None
+            document = min(matches, key=lambda document: document[sort[0][0]])
+            self._apply(document, update)
+            return dict(document)
+    
+    def update_one(self, query, update):
+        with self.lock:
+            for document in self.documents.values():
+                if self._matches(document, query):
+                    self._apply(document, update)
+                    return
+    
+    def update_many(self, query, update):
+        with self.lock:
+            for document in self.documents.values():
+                if self._matches(document, query):
+                    self._apply(document, update)
+    
+    def find_one(self, query, projection=None):
+        with self.lock:
+            for document in self.documents.values():
+                if self._matches(document, query):
+                    return {field: value for field, value in document.items() if field not in (projection or {})}
+        return None
+
+def test_job_completes_with_result():
+    """A submitted job runs on a worker and stores its result"""
+    jobs = JobQueue(lambda payload: payload * 2, num_workers=1)
+    job_id = jobs.submit(21)
+    job = wait_for(jobs, job_id)
+    assert job['status'] == 'done'
+    assert job['result'] == 42
+    assert jobs.stats()['completed'] == 1
+
+def test_failed_job_records_error():
+    """Handler exceptions mark the job failed"""
+    def handler(payload):
+        raise ValueError('bad image')
+    
+    jobs = JobQueue(handler, num_workers=1)
+    job = wait_for(jobs, jobs.submit(None))
+    assert job['status'] == 'failed'
+    assert job['error'] == 'bad image'
+
+def test_full_queue_rejects():
+    """Submitting to a full queue raises queue.Full"""
+    release = threading.Event()
+    jobs = JobQueue(lambda payload: release.wait(5), num_workers=1, max_queue_size=1)
+    
+    first = jobs.submit(1)
+    # Wait until the worker has taken the first job off the queue
+    while jobs.get(first)['status'] != 'running':
+        time.sleep(0.01)
+    jobs.submit(2)
+    
+    with pytest.raises(queue.Full):
+        jobs.submit(3)
+    assert jobs.stats()['rejected'] == 1
+    assert jobs.retry_after() >= 1
+    release.set()
+
+def test_unknown_and_expired_jobs():
+    """Unknown IDs and expired results return None"""
+    jobs = JobQueue(lambda payload: payload, num_workers=1, result_ttl=0)
+    assert jobs.get('missing') is None
+    
+    job_id = jobs.submit('x')
+    deadline = time.time() + 5
+    while jobs.stats()['completed'] == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.01)
+    assert jobs.get(job_id) is None
+
+def test_job_polled_through_another_queue():
+    """A job submitted through one worker's queue is run and polled through another's"""
+    store = MemoryJobStore(max_queue_size=4)
+    submitting = JobQueue(lambda payload: payload, num_workers=0, store=store)
+    polling = JobQueue(lambda payload: payload.upper(), num_workers=1, store=store)
+    
+    job_id = submitting.submit('tomato')
+    job = wait_for(polling, job_id)
+    assert job['status'] == 'done'
+    assert job['result'] == 'TOMATO'
+    assert submitting.get(job_id)['result'] == 'TOMATO'
+    assert submitting.stats()['queue_depth'] == 0
+
+def test_mongo_job_round_trip():
+    """A job stored in the Mongo store is run and its payload dropped"""
+    collection = FakeCollection()
+    store = MongoJobStore(collection, poll_interval=0.01, max_poll_interval=0.05)
+    jobs = JobQueue(lambda payload: payload.upper(), num_workers=1, store=store)
+    
+    job_id = jobs.submit('tomato')
+    job = wait_for(jobs, job_id)
+    assert job['status'] == 'done'
+    assert job['result'] == 'TOMATO'
+    assert 'payload' not in collection.documents[job_id]
+    assert 'claimed_at' not in job
+
+def test_mongo_job_expires_at_insert():
+    """Queued jobs get an expiry so the TTL index removes them if never run"""
+    collection = FakeCollection()
+    store = MongoJobStore(collection, max_queue_size=1)
+    jobs = JobQueue(lambda payload: payload, num_workers=0, store=store)
+    
+    job_id = jobs.submit('x')
+    assert collection.documents[job_id]['expires_at'] is not None
+    with pytest.raises(queue.Full):
+        jobs.submit('y')
+
+def test_mongo_expired_lease_requeues_then_fails():
+    """A job whose worker died is claimed again, then failed after max_attempts"""
+    collection = FakeCollection()
+    store = MongoJobStore(collection, lease_timeout=0, max_attempts=2)
+    jobs = JobQueue(lambda payload: payload, num_workers=0, store=store)
+    job_id = jobs.submit('x')
+    
+    # First worker claims the job and dies
+    job, payload = store.claim(timeout=0)
+    assert job['job_id'] == job_id and payload == 'x'
+    time.sleep(0.01)
+    
+    # Its lease has expired, so another worker gets the job again
+    job, payload = store.claim(timeout=0)
+    assert job['job_id'] == job_id and payload == 'x'
+    assert collection.documents[job_id]['attempts'] == 2
+    time.sleep(0.01)
+    
+    # Out of attempts: the job is failed instead of claimed a third time
+    assert store.claim(timeout=0) is None
+    job = jobs.get(job_id)
+    assert job['status'] == 'failed'
+    assert 'abandoned' in job['error']
+    assert 'payload' not in collection.documents[job_id]
+
+def test_mongo_idle_polling_backs_off():
+    """An empty queue is polled less and less often"""
+    collection = FakeCollection()
+    store = MongoJobStore(collection, poll_interval=0.01, max_poll_interval=0.16)
+    
+    assert store.claim(timeout=0.5) is None
+    # Doubling from 0.01s up to 0.16s takes far fewer than 0.5 / 0.01 queries
+    assert collection.claim_queries < 10
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
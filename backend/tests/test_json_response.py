@@ -0,0 +1,81 @@
+import pytest
+import sys
+import os
+import json
+from datetime import datetime
+from bson import ObjectId
+from flask import Flask, jsonify
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.json_response import MongoJSONProvider, dumps, stream_json_list, STREAM_CHUNK_SIZE
+
+@pytest.fixture
+def app():
+    """Create a minimal app using the BSON-aware JSON provider"""
+    app = Flask(__name__)
+    app.json = MongoJSONProvider(app)
+    return app
+
+def test_dumps_handles_bson_types():
+    """Test ObjectId and datetime serialization"""
+    oid = ObjectId()
+    data = json.loads(dumps({'_id': oid, 'created_at': datetime(2024, 1, 2, 3, 4, 5)}))
+
+    assert data['_id'] == str(oid)
+    assert data['created_at'] == 'Tue, 02 Jan 2024 03:04:05 GMT'
+
+@pytest.mark.parametrize('debug', [False, True])
+def test_jsonify_matches_default_provider(app, debug):
+    """Output matches Flask's provider: sorted keys, HTTP dates, debug indent"""
+    data = {'name': 'pasta', 'created_at': datetime(2024, 1, 2, 3, 4, 5), 'calories': 450, 'tags': ['quick']}
+    app.debug = debug
+    with app.app_context():
+        response = jsonify(data)
+
+    default_app = Flask(__name__)
+    default_app.debug = debug
+    with default_app.app_context():
+        expected = jsonify(data)
+
+    assert response.get_data() == expected.get_data()
+
+def test_jsonify_with_object_id(app):
+    """Test that jsonify accepts raw Mongo documents"""
+    oid = ObjectId()
+    with app.app_context():
+        response = jsonify({'recipe': {'_id': oid, 'name': 'pasta'}})
+
+    assert json.loads(response.data)['recipe']['_id'] == str(oid)
+
+@pytest.mark.parametrize('size', [0, 1, STREAM_CHUNK_SIZE, STREAM_CHUNK_SIZE * 2 + 3])
+def test_stream_json_list(app, size):
+    """Test streamed output matches the regular response shape"""
+    documents = [{'_id': ObjectId(), 'name': f'recipe {i}'} for i in range(size)]
+
+    with app.app_context():
+        response = stream_json_list(iter(documents), extra={'method': 'all'})
+
+    data = json.loads(response.get_data())
+    assert data['count'] == size
+    assert data['method'] == 'all'
+    assert [r['name'] for r in data['recipes']] == [d['name'] for d in documents]
+
+def test_stream_error_is_flagged(app):
+    """A cursor failing mid-stream still yields valid JSON marked with an error"""
+    def documents():
+        for i in range(STREAM_CHUNK_SIZE + 1):
+            yield {'name': f'recipe {i}'}
+        raise RuntimeError('cursor killed')
+
+    with app.app_context():
+        response = stream_json_list(documents())
+
+    data = json.loads(response.get_data())
+    assert data['count'] == STREAM_CHUNK_SIZE + 1
+    assert len(data['recipes']) == STREAM_CHUNK_SIZE + 1
+    assert 'error' in data
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,38 @@
+import pytest
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.metrics import Histogram, register_metrics, collect_metrics
+
+def test_histogram_snapshot():
+    """Test histogram counters and percentiles"""
+    histogram = Histogram(buckets=(1, 10, 100))
+    for value in [0.5, 5, 5, 50, 500]:
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+    assert snapshot['count'] == 5
+    assert snapshot['min'] == 0.5
+    assert snapshot['max'] == 500
+    assert snapshot['p50'] == 10
+    assert snapshot['p99'] == 500
+    assert snapshot['buckets'] == {'le_1': 1, 'le_10': 2, 'le_100': 1, 'le_inf': 1}
+
+def test_empty_histogram():
+    """Test snapshot of a histogram without observations"""
+    assert Histogram().snapshot() == {'count': 0}
+
+def test_collect_metrics_isolates_failures():
+    """Test that a failing source does not break the metrics endpoint"""
+    register_metrics('test_ok', lambda: {'value': 1})
+    register_metrics('test_broken', lambda: 1 / 0)
+
+    snapshot = collect_metrics()
+    assert snapshot['test_ok'] == {'value': 1}
+    assert 'error' in snapshot['test_broken']
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,114 @@
+"""
+Tests for the versioned model registry and model hot-swapping
+"""
+import pytest
+import sys
+import os
+import threading
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import models.ingredient_recognition as recognition
+from models.model_registry import list_versions, get_active_version, set_active_version, version_source
+
+def make_version(registry, version):
+    version_dir = registry / version
+    version_dir.mkdir()
+    (version_dir / 'ingredient_model.h5').write_bytes(b'')
+    (version_dir / 'class_names.txt').write_text('tomato\n')
+
+def test_active_version_defaults_to_newest(tmp_path):
+    """Without an ACTIVE file the newest version is served"""
+    make_version(tmp_path, '2024-05-12')
+    make_version(tmp_path, '2024-06-01')
+    (tmp_path / 'incomplete').mkdir()
+
+    assert list_versions(str(tmp_path)) == ['2024-05-12', '2024-06-01']
+    assert get_active_version(str(tmp_path)) == '2024-06-01'
+    assert get_active_version(str(tmp_path / 'missing')) is None
+
+def test_set_active_version(tmp_path):
+    """Activating a version writes ACTIVE; unknown versions are rejected"""
+    make_version(tmp_path, '2024-05-12')
+    make_version(tmp_path, '2024-06-01')
+
+    set_active_version('2024-05-12', str(tmp_path))
+    assert get_active_version(str(tmp_path)) == '2024-05-12'
+    assert version_source('2024-05-12', str(tmp_path))['model_path'] == str(tmp_path / '2024-05-12' / 'ingredient_model.h5')
+    with pytest.raises(ValueError):
+        set_active_version('2023-01-01', str(tmp_path))
+
+def test_swap_keeps_current_model_on_failure(monkeypatch):
+    """A version that fails to load never replaces the serving model"""
+    class FakeModel:
+        def __init__(self, source):
+            if source['version'] == 'broken':
+                raise OSError('corrupt model file')
+            self.source = source
+
+    monkeypatch.setattr(recognition, '_create_model', FakeModel)
+    monkeypatch.setattr(recognition, 'warmup_model', lambda model: None)
+    monkeypatch.setattr(recognition, 'model_source', lambda version: {'version': version})
+    monkeypatch.setattr(recognition, '_model_instance', None)
+    monkeypatch.setattr(recognition, '_model_status', dict(recognition._model_status))
+    monkeypatch.setattr(recognition, '_model_ready', threading.Event())
+
+    assert recognition.swap_model('v1')
+    serving = recognition._model_instance
+    assert serving.source['version'] == 'v1'
+
+    assert not recognition.swap_model('broken')
+    assert recognition._model_instance is serving
+    assert recognition._model_status['swap']['state'] == 'failed'
+    assert recognition._model_status['version'] == 'v1'
+
+def test_swap_to_serving_version_is_a_no_op(monkeypatch):
+    """A swap queued behind one to the same version does not reload the model"""
+    created = []
+    def create_model(source):
+        created.append(source['version'])
+        return type('FakeModel', (), {'source': source})()
+
+    monkeypatch.setattr(recognition, '_create_model', create_model)
+    monkeypatch.setattr(recognition, 'warmup_model', lambda model: None)
+    monkeypatch.setattr(recognition, 'model_source', lambda version: {'version': version})
+    monkeypatch.setattr(recognition, '_model_instance', None)
+    monkeypatch.setattr(recognition, '_model_status', dict(recognition._model_status))
+    monkeypatch.setattr(recognition, '_model_ready', threading.Event())
+
+    assert recognition.swap_model('v2')
+    serving = recognition._model_instance
+    assert recognition.swap_model('v2')
+    assert recognition._model_instance is serving
+    assert created == ['v2']
+
+def test_batched_rows_are_decoded_by_the_model_that_ran_them(monkeypatch):
+    """A swap between a request starting and its batch running never mislabels results"""
+    class FakeModel(recognition.BaseRecognitionModel):
+        def __init__(self, class_names):
+            self.class_names = class_names
+        
+        def predict_probabilities(self, batch):
+            return np.tile([0.9, 0.1], (len(batch), 1))
+    
+    old, new = FakeModel(['tomato', 'onion']), FakeModel(['basil', 'garlic'])
+    calls = []
+    def get_model():
+        calls.append(1)
+        return old if len(calls) == 1 else new
+    
+    monkeypatch.setattr(recognition, 'get_model', get_model)
+    monkeypatch.setattr(recognition, 'INFERENCE_BATCHING', True)
+    monkeypatch.setattr(recognition, 'INFERENCE_SOCKET', '')
+    monkeypatch.setattr(recognition, 'FEW_SHOT_ENABLED', False)
+    monkeypatch.setattr(recognition, '_batcher', None)
+    try:
+        predictions = recognition.predict_ingredients(np.zeros((1, 4, 4, 3), dtype=np.float32), top_k=1)
+    finally:
+        recognition._batcher.stop()
+    assert predictions[0]['name'] == 'basil'
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,91 @@
+import pytest
+import sys
+import os
+from types import SimpleNamespace
+from flask import Flask
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.mongo_metrics import CommandMetrics, PoolMetrics, measure_reply
+from utils.json_response import stream_json_list
+
+ADDRESS = ('localhost', 27017)
+
+@pytest.fixture
+def app():
+    """Create a minimal app with one route for request contexts"""
+    app = Flask(__name__)
+    app.add_url_rule('/api/recipes/<recipe_id>', 'recipe', lambda recipe_id: '')
+    return app
+
+def succeeded(command_name, reply, duration_ms=2):
+    return SimpleNamespace(command_name=command_name, reply=reply, duration_micros=duration_ms * 1000, address=ADDRESS)
+
+def test_command_latency_tagged_by_route(app):
+    """Commands are keyed by the route issuing them and by command name"""
+    metrics = CommandMetrics()
+    reply = {'cursor': {'firstBatch': [{'name': 'pasta'}, {'name': 'soup'}], 'id': 0}, 'ok': 1}
+    
+    with app.test_request_context('/api/recipes/1'):
+        metrics.started(SimpleNamespace(command_name='find', address=ADDRESS))
+        metrics.succeeded(succeeded('find', reply))
+    metrics.failed(succeeded('insert', None))
+    
+    snapshot = metrics.snapshot()
+    find = snapshot['GET /api/recipes/<recipe_id>']['find']
+    assert find['latency_ms']['count'] == 1
+    assert find['documents_returned'] == 2
+    assert find['bytes_returned'] > 0
+    assert snapshot['background']['insert']['failures'] == 1
+
+def test_reply_size_estimated_from_batch():
+    """Cursor batches are sized from their first document"""
+    batch = [{'name': 'tomato'}] * 10
+    documents, size = measure_reply({'cursor': {'nextBatch': batch, 'id': 0}, 'ok': 1})
+    single_documents, single_size = measure_reply({'cursor': {'nextBatch': batch[:1], 'id': 0}, 'ok': 1})
+    
+    assert documents == 10 and single_documents == 1
+    assert size == single_size * 10
+    assert measure_reply({'cursor': {'firstBatch': [], 'id': 0}, 'ok': 1}) == (0, 0)
+    assert measure_reply({'n': 1, 'ok': 1})[0] == 0
+
+def test_streamed_get_more_tagged_by_route(app):
+    """getMore commands issued while a response streams keep the route tag"""
+    metrics = CommandMetrics()
+    
+    def documents():
+        for i in range(3):
+            if i:
+                metrics.succeeded(succeeded('getMore', {'cursor': {'nextBatch': [{}], 'id': 0}, 'ok': 1}))
+            yield {'name': f'recipe {i}'}
+    
+    with app.test_request_context('/api/recipes/1'):
+        response = stream_json_list(documents())
+    response.get_data()
+    
+    assert metrics.snapshot()['GET /api/recipes/<recipe_id>']['getMore']['latency_ms']['count'] == 2
+
+def test_pool_checkout_wait_tagged_by_route(app):
+    """Checkout waits are recorded per route and pool occupancy is tracked"""
+    metrics = PoolMetrics()
+    event = SimpleNamespace(address=ADDRESS, options={'maxPoolSize': 4})
+    metrics.pool_created(event)
+    
+    with app.test_request_context('/api/recipes/1'):
+        metrics.connection_check_out_started(event)
+        metrics.connection_checked_out(event)
+    metrics.connection_check_out_started(event)
+    metrics.connection_checked_out(event)
+    metrics.connection_checked_in(event)
+    
+    snapshot = metrics.snapshot()
+    assert snapshot['checkout_wait_ms']['GET /api/recipes/<recipe_id>']['count'] == 1
+    assert snapshot['checkout_wait_ms']['background']['count'] == 1
+    pool = snapshot['pools']['localhost:27017']
+    assert pool['checked_out'] == 1
+    assert pool['peak_checked_out'] == 2
+    assert pool['saturation'] == 0.25
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
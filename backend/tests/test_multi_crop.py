@@ -0,0 +1,78 @@
+"""
+Tests for multi-region ingredient detection
+"""
+import pytest
+import sys
+import os
+import numpy as np
+from PIL import Image, ImageDraw
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.multi_crop import (
+    grid_boxes,
+    saliency_boxes,
+    generate_crop_boxes,
+    crops_to_batch,
+    aggregate_region_predictions
+)
+
+def test_grid_boxes_cover_image():
+    """Grid tiles overlap and together cover the whole image"""
+    boxes = grid_boxes(400, 300, rows=2, cols=2, overlap=0.25)
+    assert len(boxes) == 4
+    assert boxes[0][:2] == (0, 0)
+    assert max(box[2] for box in boxes) == 400
+    assert max(box[3] for box in boxes) == 300
+    # Neighbouring tiles overlap
+    assert boxes[1][0] < boxes[0][2]
+
+def test_saliency_boxes_find_detailed_region():
+    """The most detailed region is proposed first"""
+    image = Image.new('RGB', (320, 320), color='white')
+    draw = ImageDraw.Draw(image)
+    for i in range(0, 80, 8):
+        draw.line([(220 + i, 220), (220 + i, 300)], fill='black', width=3)
+
+    left, top, right, bottom = saliency_boxes(image, num_boxes=1)[0]
+    assert left <= 260 <= right
+    assert top <= 260 <= bottom
+
+def test_saliency_boxes_flat_image():
+    """A flat image has no salient regions"""
+    image = Image.new('RGB', (100, 100), color='gray')
+    assert saliency_boxes(image, num_boxes=3) == []
+
+def test_crops_to_batch_shape():
+    """All crops end up in one batch"""
+    image = Image.new('RGB', (640, 480), color='red')
+    boxes = generate_crop_boxes(image, grid=2, num_saliency=0)
+    batch = crops_to_batch(image, boxes)
+    assert batch.shape == (5, 224, 224, 3)
+    assert batch.dtype == np.float32
+    # Pure red scaled to [-1, 1]
+    assert np.allclose(batch[..., 0], 1.0)
+    assert np.allclose(batch[..., 1], -1.0)
+
+def test_aggregate_region_predictions():
+    """Labels are deduplicated and keep their best confidence"""
+    class_names = ['tomato', 'onion', 'garlic']
+    probabilities = np.array([
+        [0.6, 0.3, 0.1],
+        [0.2, 0.7, 0.1],
+        [0.1, 0.8, 0.1]
+    ])
+    results = aggregate_region_predictions(probabilities, class_names, threshold=0.5)
+    assert [r['name'] for r in results] == ['onion', 'tomato']
+    assert results[0]['confidence'] == pytest.approx(0.8)
+    assert results[0]['regions'] == 2
+
+def test_aggregate_keeps_full_image_top_prediction():
+    """The full image's top label is returned even below the threshold"""
+    probabilities = np.array([[0.2, 0.3, 0.5]])
+    results = aggregate_region_predictions(probabilities, ['a', 'b', 'c'], threshold=0.9)
+    assert [r['name'] for r in results] == ['c']
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
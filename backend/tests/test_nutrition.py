@@ -0,0 +1,84 @@
+import pytest
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.nutrition_api as nutrition_api
+from utils.nutrition_api import (
+    compute_ingredients_hash,
+    is_nutrition_current,
+    calculate_recipe_nutrition,
+    NutritionLookupError,
+    NUTRITION_CALCULATOR_VERSION
+)
+
+INGREDIENTS = [
+    {'name': 'Spaghetti', 'quantity': 400, 'unit': 'g'},
+    {'name': 'eggs', 'quantity': 4, 'unit': 'whole'}
+]
+
+def test_ingredients_hash_ignores_order_and_case():
+    """Test that hash is stable across ordering and casing"""
+    reordered = [
+        {'name': 'EGGS', 'quantity': 4, 'unit': 'Whole'},
+        {'name': 'spaghetti', 'quantity': 400, 'unit': 'g'}
+    ]
+
+    assert compute_ingredients_hash(INGREDIENTS) == compute_ingredients_hash(reordered)
+
+def test_ingredients_hash_changes_with_quantity():
+    """Test that changing a quantity changes the hash"""
+    changed = [
+        {'name': 'spaghetti', 'quantity': 500, 'unit': 'g'},
+        {'name': 'eggs', 'quantity': 4, 'unit': 'whole'}
+    ]
+
+    assert compute_ingredients_hash(INGREDIENTS) != compute_ingredients_hash(changed)
+
+def test_is_nutrition_current():
+    """Test stored nutrition validation"""
+    nutrition = {
+        'calories': 100,
+        'calculated': True,
+        'ingredients_hash': compute_ingredients_hash(INGREDIENTS),
+        'calculator_version': NUTRITION_CALCULATOR_VERSION
+    }
+
+    assert is_nutrition_current(nutrition, INGREDIENTS)
+    assert not is_nutrition_current(None, INGREDIENTS)
+    assert not is_nutrition_current(nutrition, INGREDIENTS[:1])
+
+    # Nutrition stored before hashing was introduced must be recomputed
+    legacy = {'calories': 100, 'calculated': True}
+    assert not is_nutrition_current(legacy, INGREDIENTS)
+
+def test_failed_lookup_is_never_current(monkeypatch):
+    """Test that nutrition with a failed USDA lookup is not stamped as current"""
+    def search_food(name):
+        if name == 'eggs':
+            raise NutritionLookupError('USDA API timed out')
+        return [{'fdc_id': 1}]
+
+    monkeypatch.setattr(nutrition_api, 'search_food', search_food)
+    monkeypatch.setattr(nutrition_api, 'get_nutrition', lambda fdc_id: {'calories': 100, 'protein': 1, 'carbs': 1, 'fat': 1})
+
+    nutrition = calculate_recipe_nutrition(INGREDIENTS)
+
+    assert nutrition['ingredients_matched'] == 1
+    assert nutrition['lookup_errors'] == 1
+    assert not is_nutrition_current(nutrition, INGREDIENTS)
+
+def test_unmatched_ingredient_is_still_current(monkeypatch):
+    """Test that an ingredient with no USDA match does not block storing the result"""
+    monkeypatch.setattr(nutrition_api, 'search_food', lambda name: [] if name == 'eggs' else [{'fdc_id': 1}])
+    monkeypatch.setattr(nutrition_api, 'get_nutrition', lambda fdc_id: {'calories': 100, 'protein': 1, 'carbs': 1, 'fat': 1})
+
+    nutrition = calculate_recipe_nutrition(INGREDIENTS)
+
+    assert 'lookup_errors' not in nutrition
+    assert is_nutrition_current(nutrition, INGREDIENTS)
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -1,6 +1,7 @@
 import pytest
 import sys
 import os
+import io
 import numpy as np
 from PIL import Image
 
@@ -11,7 +12,10 @@ from utils.image_preprocessing import (
     resize_image,
     convert_to_rgb,
     normalize_for_mobilenet,
-    prepare_image_tensor
+    prepare_image_tensor,
+    load_image_fast,
+    images_to_batch,
+    BatchBuffer
 )
 
 def test_resize_image():
@@ -67,5 +71,64 @@ def test_prepare_image_tensor_shape():
         if os.path.exists(temp_path):
             os.remove(temp_path)
 
+def test_load_image_fast_jpeg():
+    """Test draft-mode decoding of a large JPEG"""
+    img = Image.new('RGB', (4000, 3000), color='green')
+    buffer = io.BytesIO()
+    img.save(buffer, format='JPEG')
+    buffer.seek(0)
+    
+    resized = load_image_fast(Image.open(buffer), target_size=(224, 224))
+    
+    assert resized.size == (224, 224)
+    assert resized.mode == 'RGB'
+
+def test_load_image_fast_applies_exif_orientation():
+    """Test that EXIF orientation is applied before resizing"""
+    # Left half red, right half blue; orientation 6 rotates 90 degrees clockwise
+    img = Image.new('RGB', (400, 200), color='red')
+    img.paste((0, 0, 255), (200, 0, 400, 200))
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    buffer = io.BytesIO()
+    img.save(buffer, format='JPEG', exif=exif.tobytes())
+    buffer.seek(0)
+    
+    resized = load_image_fast(Image.open(buffer), target_size=(100, 100))
+    
+    # After rotation red is on top and blue at the bottom
+    top = resized.getpixel((50, 5))
+    bottom = resized.getpixel((50, 95))
+    assert top[0] > top[2]
+    assert bottom[2] > bottom[0]
+
+def test_images_to_batch_matches_normalize():
+    """Test that in-place slot filling matches normalize_for_mobilenet"""
+    pixels = np.random.randint(0, 256, (32, 32, 3), dtype=np.uint8)
+    images = [Image.fromarray(pixels), Image.fromarray(255 - pixels)]
+    
+    batch = images_to_batch(images)
+    
+    assert batch.shape == (2, 32, 32, 3)
+    assert batch.dtype == np.float32
+    assert np.allclose(batch[0], normalize_for_mobilenet(pixels), atol=1e-6)
+    assert np.allclose(batch[1], normalize_for_mobilenet(255 - pixels), atol=1e-6)
+
+def test_batch_buffer_reuses_memory():
+    """Test that a batch buffer is filled in place and reused"""
+    buffer = BatchBuffer(4, item_shape=(8, 8, 3))
+    image = Image.new('RGB', (8, 8), color=(255, 0, 0))
+    
+    first = buffer.fill([image])
+    second = buffer.fill([image, np.zeros((8, 8, 3), dtype=np.float32)])
+    
+    assert np.shares_memory(first, second)
+    assert second.shape == (2, 8, 8, 3)
+    assert np.allclose(second[0, ..., 0], 1.0)
+    assert np.allclose(second[1], 0.0)
+    
+    with pytest.raises(ValueError):
+        buffer.fill([image] * 5)
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
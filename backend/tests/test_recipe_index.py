@@ -0,0 +1,88 @@
+"""
+Tests for the recipe name/category token index
+"""
+import pytest
+import sys
+import os
+import threading
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.recipe_index import RecipeIndex, tokenize, get_recipe_index, invalidate_recipe_index
+
+RECIPES = [
+    {'_id': 1, 'name': 'Spaghetti Carbonara', 'category': 'Pasta'},
+    {'_id': 2, 'name': 'Chicken Tacos', 'category': 'Mexican'},
+    {'_id': 3, 'name': 'Pasta Primavera', 'category': 'Pasta'},
+    {'_id': 4, 'name': 'Fish Taco Bowl', 'category': None},
+]
+
+def test_tokenize_folds_case_and_plurals():
+    """Tokens are lowercase words with simple plurals folded"""
+    assert tokenize('Chicken Tacos!') == {'chicken', 'taco'}
+    assert tokenize(None) == set()
+
+def test_search_ranks_name_matches_first():
+    """Name matches outrank category matches and each recipe appears once"""
+    index = RecipeIndex(RECIPES)
+    assert index.search('pasta carbonara') == [1, 3]
+    assert index.search('taco') == [2, 4]
+    assert index.search('pasta', limit=1) == [3]
+    assert index.search('sushi') == []
+
+def test_search_matches_substrings_and_partial_names():
+    """Query words inside longer words still match, below whole-word matches"""
+    index = RecipeIndex(RECIPES + [
+        {'_id': 5, 'name': 'Chicken Pizzaiola', 'category': 'Italian'},
+        {'_id': 6, 'name': 'Pizza Bianca', 'category': 'Italian'},
+        {'_id': 7, 'name': 'Club Sandwich', 'category': 'Shellfish'},
+    ])
+    assert index.search('carbon') == [1]
+    assert index.search('pizza') == [6, 5]
+    assert index.search('fish') == [4, 7]
+    # Short words only match whole words
+    assert index.search('ch') == []
+
+def test_shared_index_is_rebuilt_after_invalidation():
+    """The shared index is built once and rebuilt only after invalidation"""
+    calls = []
+    def loader():
+        calls.append(1)
+        return RECIPES
+
+    invalidate_recipe_index()
+    first = get_recipe_index(loader=loader)
+    assert get_recipe_index(loader=loader) is first
+    invalidate_recipe_index()
+    assert get_recipe_index(loader=loader) is not first
+    assert len(calls) == 2
+    invalidate_recipe_index()
+
+def test_rebuild_does_not_block_readers():
+    """While one thread rebuilds, others keep getting the previous index"""
+    release = threading.Event()
+    building = threading.Event()
+    def slow_loader():
+        building.set()
+        release.wait(5)
+        return RECIPES[:1]
+
+    invalidate_recipe_index()
+    first = get_recipe_index(loader=lambda: RECIPES)
+    invalidate_recipe_index()
+
+    rebuilt = []
+    builder = threading.Thread(target=lambda: rebuilt.append(get_recipe_index(loader=slow_loader)))
+    builder.start()
+    assert building.wait(5)
+    assert get_recipe_index(loader=slow_loader) is first
+
+    release.set()
+    builder.join(5)
+    assert rebuilt[0].size == 1
+    assert get_recipe_index(loader=slow_loader) is rebuilt[0]
+    invalidate_recipe_index()
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,93 @@
+import pytest
+import sys
+import os
+import io
+from PIL import Image, ImageDraw
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.image_context import ImageContext
+from utils.recognition_cache import RecognitionCache, hamming_distance
+
+RESULT = {'ingredients': [{'name': 'banana', 'confidence': 0.9}], 'method': 'ml_model'}
+
+def make_shelf(quality=90, shift=0):
+    """Create a JPEG with some structure so the perceptual hash is meaningful"""
+    img = Image.new('RGB', (320, 240), color='white')
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((40 + shift, 40, 140 + shift, 200), fill='yellow')
+    draw.ellipse((180, 60, 290, 180), fill='red')
+    buffer = io.BytesIO()
+    img.save(buffer, format='JPEG', quality=quality)
+    return ImageContext(buffer.getvalue())
+
+def test_exact_hit_without_decoding():
+    """Test that identical bytes hit by SHA-256 alone"""
+    cache = RecognitionCache(max_entries=4)
+    first = make_shelf()
+    cache.put('recognize', first.sha256, 'v1', RESULT, phash=first.perceptual_hash)
+
+    again = make_shelf()
+    assert cache.get('recognize', again.sha256, 'v1') == RESULT
+    assert again._image is None
+    assert cache.stats()['exact_hits'] == 1
+
+def test_near_duplicate_hit():
+    """Test that a re-encoded, slightly shifted shot hits by perceptual hash"""
+    cache = RecognitionCache(max_entries=4, hamming_threshold=6)
+    first = make_shelf()
+    cache.put('recognize', first.sha256, 'v1', RESULT, phash=first.perceptual_hash)
+
+    similar = make_shelf(quality=60, shift=2)
+    assert similar.sha256 != first.sha256
+    assert hamming_distance(similar.perceptual_hash, first.perceptual_hash) <= 6
+    assert cache.get('recognize', similar.sha256, 'v1', phash_fn=lambda: similar.perceptual_hash) == RESULT
+    assert cache.stats()['near_hits'] == 1
+
+def test_exact_only_results_skip_near_duplicates():
+    """Test that OCR-derived results are only served for the same bytes"""
+    cache = RecognitionCache(max_entries=4, hamming_threshold=6)
+    first = make_shelf()
+    ocr_result = {'ingredients': [{'name': 'sugar', 'confidence': 0.9}], 'method': 'ocr'}
+    cache.put('recognize', first.sha256, 'v1', ocr_result, phash=first.perceptual_hash, near_duplicates=False)
+
+    similar = make_shelf(quality=60, shift=2)
+    assert cache.get('recognize', similar.sha256, 'v1', phash_fn=lambda: similar.perceptual_hash) is None
+    assert cache.get('recognize', first.sha256, 'v1') == ocr_result
+
+def test_version_and_kind_isolation():
+    """Test that results from another model version or endpoint are ignored"""
+    cache = RecognitionCache(max_entries=4)
+    context = make_shelf()
+    cache.put('recognize', context.sha256, 'v1', RESULT, phash=context.perceptual_hash)
+
+    assert cache.get('recognize', context.sha256, 'v2') is None
+    assert cache.get('ocr', context.sha256, 'v1') is None
+
+def test_eviction_spills_to_disk(tmp_path):
+    """Test that evicted entries are served from disk"""
+    cache = RecognitionCache(max_entries=1, disk_dir=str(tmp_path))
+    first = make_shelf()
+    second = make_shelf(shift=40)
+    cache.put('recognize', first.sha256, 'v1', RESULT)
+    cache.put('recognize', second.sha256, 'v1', {'method': 'ocr'})
+
+    assert cache.stats()['evictions'] == 1
+    assert cache.get('recognize', first.sha256, 'v1') == RESULT
+    assert cache.stats()['disk_hits'] == 1
+
+def test_disk_is_pruned_periodically(tmp_path):
+    """Test that spilled entries are pruned every few spills, not on every eviction"""
+    cache = RecognitionCache(max_entries=1, disk_dir=str(tmp_path), max_disk_entries=2, prune_every=3)
+    for i in range(6):
+        cache.put('recognize', f'{i:064x}', 'v1', RESULT)
+
+    # 5 spills: pruned to 2 after the third, then 2 more written
+    spilled = sorted(os.listdir(tmp_path))
+    assert len(spilled) == 4
+    assert all(name.endswith('.json') for name in spilled)
+    assert cache.get('recognize', f'{4:064x}', 'v1') == RESULT
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,36 @@
+import pytest
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.recommendation_engine import build_ingredient_match_pipeline, get_recommendations
+
+def test_match_pipeline_normalizes_ingredients():
+    """Test that user ingredients are lowercased and deduplicated"""
+    pipeline = build_ingredient_match_pipeline(['Tomato', 'onion ', 'tomato', ''], top_n=5)
+
+    assert pipeline[0] == {'$match': {'ingredients.name': {'$in': ['onion', 'tomato']}}}
+
+def test_match_pipeline_trims_stored_names():
+    """Test that stored names are trimmed and lowercased before intersecting"""
+    pipeline = build_ingredient_match_pipeline(['tomato'])
+    name = pipeline[1]['$addFields']['_recipe_ingredient_names']['$map']['in']
+
+    assert name == {'$trim': {'input': {'$toLower': {'$ifNull': ['$$ing.name', '']}}}}
+
+def test_match_pipeline_sorts_and_limits_server_side():
+    """Test that ranking and top-N happen inside the pipeline"""
+    pipeline = build_ingredient_match_pipeline(['tomato'], top_n=7)
+    stages = [list(stage.keys())[0] for stage in pipeline]
+
+    assert stages.index('$sort') < stages.index('$limit')
+    assert {'$limit': 7} in pipeline
+
+def test_db_method_without_ingredients_skips_query():
+    """Test that an empty ingredient list does not hit the database"""
+    assert get_recommendations(['  '], None, method='db') == []
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,231 @@
+"""
+Admission control for heavy endpoints
+
+Each class of expensive work (vision: OCR and model inference, nutrition:
+USDA API calls, llm: instruction generation) gets its own concurrency limit.
+A request over the limit waits in a short bounded queue; if the queue is
+full it is rejected at once with 429, and if no slot frees up within the
+maximum wait it is rejected with 503. Both carry a Retry-After header, so
+a burst of uploads is shed instead of pushing the node into swap and
+stalling cheap recipe reads.
+"""
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from flask import jsonify
+from utils.metrics import Histogram, register_metrics
+
+ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'True') == 'True'
+ADMISSION_MAX_WAIT = float(os.getenv('ADMISSION_MAX_WAIT', 2.0))
+
+# (max concurrent requests, max waiting requests) per endpoint class
+ADMISSION_LIMITS = {
+    'vision': (
+        int(os.getenv('ADMISSION_VISION_CONCURRENCY', 4)),
+        int(os.getenv('ADMISSION_VISION_QUEUE', 8))
+    ),
+    'nutrition': (
+        int(os.getenv('ADMISSION_NUTRITION_CONCURRENCY', 8)),
+        int(os.getenv('ADMISSION_NUTRITION_QUEUE', 16))
+    ),
+    'llm': (
+        int(os.getenv('ADMISSION_LLM_CONCURRENCY', 4)),
+        int(os.getenv('ADMISSION_LLM_QUEUE', 8))
+    )
+}
+
+class AdmissionRejected(Exception):
+    def __init__(self, limiter_name, status_code, retry_after, reason):
+        """
+        Raised when a request is not admitted
+
+        Args:
+            limiter_name: Endpoint class that rejected the request
+            status_code: 429 (queue full) or 503 (wait timed out)
+            retry_after: Suggested seconds before retrying
+            reason: Human-readable reason
+        """
+        super().__init__(reason)
+        self.limiter_name = limiter_name
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+class AdmissionLimiter:
+    def __init__(self, name, max_concurrent, max_queue, max_wait=ADMISSION_MAX_WAIT):
+        """
+        Initialize the limiter
+
+        Args:
+            name: Endpoint class name
+            max_concurrent: Maximum requests running at once
+            max_queue: Maximum requests waiting for a slot
+            max_wait: Maximum seconds a request waits for a slot
+        """
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+
+        self._condition = threading.Condition()
+        self.in_flight = 0
+        self.waiting = 0
+
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.wait_ms = Histogram()
+        self.run_ms = Histogram()
+
+    def retry_after(self):
+        """
+        Suggested seconds to wait before retrying after a rejection
+
+        Estimated from the queue depth and the mean time a request holds a slot.
+
+        Returns:
+            Integer number of seconds (at least 1)
+        """
+        mean_ms = self.run_ms.snapshot().get('mean') or 1000.0
+        return max(1, int(math.ceil((self.waiting + 1) * mean_ms / 1000.0 / max(self.max_concurrent, 1))))
+
+    def _reject(self, status_code, reason):
+        return AdmissionRejected(self.name, status_code, self.retry_after(), reason)
+
+    def acquire(self):
+        """
+        Take a slot, waiting up to max_wait if all slots are busy
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            AdmissionRejected: If the wait queue is full or the wait timed out
+        """
+        start = time.perf_counter()
+        with self._condition:
+            if self.in_flight >= self.max_concurrent or self.waiting:
+                if self.waiting >= self.max_queue:
+                    self.rejected_queue_full += 1
+                    raise self._reject(429, f'Too many {self.name} requests in progress')
+
+                self.waiting += 1
+                deadline = start + self.max_wait
+                try:
+                    while self.in_flight >= self.max_concurrent:
+                        remaining = deadline - time.perf_counter()
+                        if remaining <= 0:
+                            self.rejected_timeout += 1
+                            raise self._reject(503, f'Server busy, no {self.name} capacity available')
+                        self._condition.wait(remaining)
+                finally:
+                    self.waiting -= 1
+
+            self.in_flight += 1
+            self.admitted += 1
+
+        waited = time.perf_counter() - start
+        self.wait_ms.observe(waited * 1000.0)
+        return waited
+
+    def release(self, run_seconds=None):
+        """
+        Free a slot
+
+        Args:
+            run_seconds: How long the slot was held (for Retry-After estimates)
+        """
+        if run_seconds is not None:
+            self.run_ms.observe(run_seconds * 1000.0)
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    @contextmanager
+    def admit(self):
+        """Hold a slot for the duration of a with block"""
+        self.acquire()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - start)
+
+    def stats(self):
+        with self._condition:
+            return {
+                'in_flight': self.in_flight,
+                'queue_depth': self.waiting,
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'admitted': self.admitted,
+                'rejected_queue_full': self.rejected_queue_full,
+                'rejected_timeout': self.rejected_timeout,
+                'wait_ms': self.wait_ms.snapshot(),
+                'run_ms': self.run_ms.snapshot()
+            }
+
+limiters = {
+    name: AdmissionLimiter(name, max_concurrent, max_queue)
+    for name, (max_concurrent, max_queue) in ADMISSION_LIMITS.items()
+}
+register_metrics('admission', lambda: {name: limiter.stats() for name, limiter in limiters.items()})
+
+@contextmanager
+def admission(name):
+    """
+    Hold a slot of an endpoint class for the duration of a with block
+
+    Args:
+        name: 'vision', 'nutrition' or 'llm'
+
+    Raises:
+        AdmissionRejected: If the request is not admitted
+    """
+    if not ADMISSION_ENABLED:
+        yield
+        return
+
+    with limiters[name].admit():
+        yield
+
+def rejection_response(error):
+    """
+    Build the HTTP response for a rejected request
+
+    Args:
+        error: AdmissionRejected
+
+    Returns:
+        (response, status, headers) tuple for Flask
+    """
+    return jsonify({
+        'message': error.reason,
+        'retry_after': error.retry_after
+    }), error.status_code, {'Retry-After': str(error.retry_after)}
+
+def admission_limited(name):
+    """
+    Decorator limiting how many requests run a route at once
+
+    Usage:
+        @image_bp.route('/recognize', methods=['POST'])
+        @admission_limited('vision')
+        def recognize_ingredients():
+            ...
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            try:
+                with admission(name):
+                    return f(*args, **kwargs)
+            except AdmissionRejected as e:
+                return rejection_response(e)
+
+        return decorated
+
+    return decorator
@@ -10,6 +10,9 @@ load_dotenv()
 
 SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'default-secret-key-change-in-production')
 
+# Usernames allowed to call admin endpoints (comma-separated)
+ADMIN_USERNAMES = {name.strip() for name in os.getenv('ADMIN_USERNAMES', '').split(',') if name.strip()}
+
 def hash_password(password):
     """
     Hash a password using bcrypt
@@ -149,3 +152,23 @@ def optional_token(f):
         return f(current_user, *args, **kwargs)
     
     return decorated
+
+def admin_required(f):
+    """
+    Decorator to protect admin routes (JWT user listed in ADMIN_USERNAMES)
+    
+    Usage:
+        @app.route('/admin')
+        @admin_required
+        def admin_route(current_user):
+            return jsonify({'message': 'Success'})
+    """
+    @wraps(f)
+    @token_required
+    def decorated(current_user, *args, **kwargs):
+        if current_user['username'] not in ADMIN_USERNAMES:
+            return jsonify({'message': 'Admin access required'}), 403
+        
+        return f(current_user, *args, **kwargs)
+    
+    return decorated
@@ -0,0 +1,103 @@
+"""
+Bounded in-memory LRU cache with per-entry TTL
+"""
+import threading
+import time
+from collections import OrderedDict
+
+class TTLLRUCache:
+    def __init__(self, max_size=256, ttl=300):
+        """
+        Initialize the cache
+
+        Args:
+            max_size: Maximum number of entries kept in memory
+            ttl: Seconds an entry stays valid (None or 0 disables expiry)
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """
+        Get a cached value
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value or None on miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """
+        Store a value, evicting the least recently used entry if full
+
+        Args:
+            key: Cache key
+            value: Value to cache
+        """
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """Remove a single entry"""
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Get cache statistics
+
+        Returns:
+            Dictionary with size and hit-rate counters
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
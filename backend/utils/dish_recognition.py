@@ -1,60 +1,79 @@
 """
-Dish recognition utility using various approaches
+Dish recognition utility
+
+Dishes are classified by a dish head that shares the ingredient model's
+MobileNetV2 backbone (see models/train_dish_head.py), so one backbone pass
+yields both the dish and the ingredients visible in the photo.
 """
-import os
-import requests
-from PIL import Image
-import io
 
-def recognize_dish_from_image(image_path):
+# Bump when the dish recognition approach changes so cached results are ignored
+DISH_RECOGNITION_VERSION = '1'
+
+# Known dishes with their cuisine category and common ingredients
+DISH_CATALOG = {
+    'pasta': {'category': 'Italian', 'ingredients': ['pasta', 'tomato', 'cheese', 'garlic', 'olive oil', 'basil']},
+    'pizza': {'category': 'Italian', 'ingredients': ['dough', 'cheese', 'tomato sauce', 'mozzarella', 'oregano']},
+    'burger': {'category': 'American', 'ingredients': ['bun', 'beef', 'lettuce', 'tomato', 'cheese', 'onion']},
+    'salad': {'category': 'Healthy', 'ingredients': ['lettuce', 'tomato', 'cucumber', 'olive oil', 'lemon']},
+    'curry': {'category': 'Indian', 'ingredients': ['curry powder', 'coconut milk', 'onion', 'garlic', 'ginger']},
+    'soup': {'category': 'Comfort', 'ingredients': ['broth', 'vegetables', 'onion', 'garlic', 'herbs']},
+    'stir fry': {'category': 'Asian', 'ingredients': ['vegetables', 'soy sauce', 'garlic', 'ginger', 'oil']},
+    'tacos': {'category': 'Mexican', 'ingredients': ['tortilla', 'meat', 'salsa', 'cheese', 'lettuce']},
+    'sandwich': {'category': 'Quick', 'ingredients': ['bread', 'meat', 'cheese', 'lettuce', 'tomato']},
+    'rice bowl': {'category': 'Asian', 'ingredients': ['rice', 'vegetables', 'protein', 'soy sauce']},
+    'sushi': {'category': 'Japanese', 'ingredients': ['rice', 'fish', 'seaweed', 'wasabi', 'soy sauce']},
+    'ramen': {'category': 'Japanese', 'ingredients': ['noodles', 'broth', 'egg', 'pork', 'green onion']},
+    'biryani': {'category': 'Indian', 'ingredients': ['rice', 'meat', 'spices', 'onion', 'yogurt']},
+    'fried rice': {'category': 'Asian', 'ingredients': ['rice', 'egg', 'vegetables', 'soy sauce', 'garlic']},
+    'noodles': {'category': 'Asian', 'ingredients': ['noodles', 'vegetables', 'sauce', 'garlic', 'oil']}
+}
+
+# Ingredients suggested for dishes missing from the catalog
+DEFAULT_DISH_INGREDIENTS = ['tomato', 'onion', 'garlic']
+
+def normalize_dish_name(class_name):
+    """Turn a dish class folder name (e.g. 'fried_rice') into a display name"""
+    return class_name.replace('_', ' ').strip().lower()
+
+def recognize_dish_from_image(image, top_k=3):
     """
-    Recognize a dish from an image using multiple approaches
+    Recognize a dish from an image
     
     Args:
-        image_path: Path to the image file
+        image: RGB PIL Image resized to the model input size, or a
+               preprocessed image tensor
+        top_k: Number of dish candidates to consider
         
     Returns:
         dict: {
             'dish_name': str,
             'confidence': float,
-            'category': str
+            'category': str,
+            'common_ingredients': list,
+            'alternatives': list,
+            'detected_ingredients': list
         }
-    """
     
-    # Common dishes database
-    common_dishes = [
-        {'name': 'pasta', 'category': 'Italian', 'ingredients': ['pasta', 'tomato', 'cheese', 'garlic']},
-        {'name': 'pizza', 'category': 'Italian', 'ingredients': ['dough', 'cheese', 'tomato sauce', 'mozzarella']},
-        {'name': 'burger', 'category': 'American', 'ingredients': ['bun', 'beef', 'lettuce', 'tomato', 'cheese']},
-        {'name': 'salad', 'category': 'Healthy', 'ingredients': ['lettuce', 'tomato', 'cucumber', 'olive oil']},
-        {'name': 'curry', 'category': 'Indian', 'ingredients': ['curry', 'coconut milk', 'spices', 'onion']},
-        {'name': 'soup', 'category': 'Comfort', 'ingredients': ['broth', 'vegetables', 'onion', 'garlic']},
-        {'name': 'stir fry', 'category': 'Asian', 'ingredients': ['vegetables', 'soy sauce', 'garlic', 'ginger']},
-        {'name': 'tacos', 'category': 'Mexican', 'ingredients': ['tortilla', 'meat', 'salsa', 'cheese']},
-        {'name': 'sandwich', 'category': 'Quick', 'ingredients': ['bread', 'meat', 'cheese', 'vegetables']},
-        {'name': 'rice bowl', 'category': 'Asian', 'ingredients': ['rice', 'vegetables', 'protein', 'sauce']},
-        {'name': 'sushi', 'category': 'Japanese', 'ingredients': ['rice', 'fish', 'seaweed', 'wasabi']},
-        {'name': 'ramen', 'category': 'Japanese', 'ingredients': ['noodles', 'broth', 'egg', 'pork']},
-        {'name': 'biryani', 'category': 'Indian', 'ingredients': ['rice', 'meat', 'spices', 'onion']},
-        {'name': 'fried rice', 'category': 'Asian', 'ingredients': ['rice', 'egg', 'vegetables', 'soy sauce']},
-        {'name': 'noodles', 'category': 'Asian', 'ingredients': ['noodles', 'vegetables', 'sauce', 'garlic']}
-    ]
+    Raises:
+        RuntimeError: If no dish head is available
+    """
+    from models.ingredient_recognition import predict_dish_and_ingredients
     
-    # For demo: randomly select a dish
-    # In production, replace with actual ML model prediction
-    # You could use:
-    # 1. TensorFlow/PyTorch with Food-101 dataset
-    # 2. Clarifai Food Model API
-    # 3. Google Cloud Vision API
-    # 4. Custom trained model
+    dishes, ingredients = predict_dish_and_ingredients(image, top_k=top_k)
     
-    detected = random.choice(common_dishes)
+    top = dishes[0]
+    dish_name = normalize_dish_name(top['name'])
     
     return {
-        'dish_name': detected['name'],
-        'confidence': round(random.uniform(0.72, 0.94), 2),
-        'category': detected['category'],
-        'common_ingredients': detected['ingredients']
+        'dish_name': dish_name,
+        'confidence': round(top['confidence'], 4),
+        'category': DISH_CATALOG.get(dish_name, {}).get('category', 'Unknown'),
+        'common_ingredients': get_dish_ingredients(dish_name),
+        'alternatives': [
+            {'name': normalize_dish_name(d['name']), 'confidence': round(d['confidence'], 4)}
+            for d in dishes[1:]
+        ],
+        'detected_ingredients': ingredients
     }
 
 
@@ -68,23 +87,5 @@ def get_dish_ingredients(dish_name):
     Returns:
         list: Common ingredients for the dish
     """
-    dish_ingredients_map = {
-        'pasta': ['pasta', 'tomato', 'cheese', 'garlic', 'olive oil', 'basil'],
-        'pizza': ['dough', 'cheese', 'tomato sauce', 'mozzarella', 'oregano'],
-        'burger': ['bun', 'beef', 'lettuce', 'tomato', 'cheese', 'onion'],
-        'salad': ['lettuce', 'tomato', 'cucumber', 'olive oil', 'lemon'],
-        'curry': ['curry powder', 'coconut milk', 'onion', 'garlic', 'ginger'],
-        'soup': ['broth', 'vegetables', 'onion', 'garlic', 'herbs'],
-        'stir fry': ['vegetables', 'soy sauce', 'garlic', 'ginger', 'oil'],
-        'tacos': ['tortilla', 'meat', 'salsa', 'cheese', 'lettuce'],
-        'sandwich': ['bread', 'meat', 'cheese', 'lettuce', 'tomato'],
-        'rice bowl': ['rice', 'vegetables', 'protein', 'soy sauce'],
-        'sushi': ['rice', 'fish', 'seaweed', 'wasabi', 'soy sauce'],
-        'ramen': ['noodles', 'broth', 'egg', 'pork', 'green onion'],
-        'biryani': ['rice', 'meat', 'spices', 'onion', 'yogurt'],
-        'fried rice': ['rice', 'egg', 'vegetables', 'soy sauce', 'garlic'],
-        'noodles': ['noodles', 'vegetables', 'sauce', 'garlic', 'oil']
-    }
-    
-    # Return ingredients for the dish, or default ingredients
-    return dish_ingredients_map.get(dish_name.lower(), ['tomato', 'onion', 'garlic'])
+    dish = DISH_CATALOG.get(dish_name.lower())
+    return list(dish['ingredients']) if dish else list(DEFAULT_DISH_INGREDIENTS)
@@ -0,0 +1,351 @@
+"""
+Few-shot ingredient classes from backbone embeddings
+
+Stores pooled MobileNetV2 embeddings of a few labeled example images per
+class and recognizes those classes by cosine nearest-neighbour search, next
+to the softmax head. Adding a class only appends vectors to the index file,
+so it goes live without retraining or redeploying the model.
+
+Pooled post-ReLU features are all non-negative, so the raw cosine similarity
+of almost any two images is high. Examples and queries are therefore
+centered on a running mean of every embedding the index has seen before
+they are compared; a centered similarity near 0 means "no more alike than
+two typical images".
+
+The index is a single .npz file (float16 vectors plus labels) written
+atomically; every process reloads it when the file changes on disk, so an
+example added through one worker reaches all workers within
+FEW_SHOT_RELOAD_INTERVAL seconds. Changes go through EmbeddingIndex.update,
+which holds an exclusive lock on a sidecar .lock file from reload to save so
+concurrent edits from different workers are never lost.
+"""
+import fcntl
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+
+FEW_SHOT_INDEX_PATH = os.getenv('FEW_SHOT_INDEX_PATH', 'models/few_shot_index.npz')
+FEW_SHOT_NEIGHBORS = int(os.getenv('FEW_SHOT_NEIGHBORS', 5))
+FEW_SHOT_MIN_SIMILARITY = float(os.getenv('FEW_SHOT_MIN_SIMILARITY', 0.6))
+FEW_SHOT_RELOAD_INTERVAL = float(os.getenv('FEW_SHOT_RELOAD_INTERVAL', 5))
+
+def normalize_rows(vectors):
+    """
+    Scale each row to unit length so dot products are cosine similarities
+
+    Args:
+        vectors: Array of shape (N, D)
+
+    Returns:
+        float32 array of shape (N, D)
+    """
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+class EmbeddingIndex:
+    def __init__(self, path=None, model_version=None):
+        """
+        Initialize the index, loading it from path if the file exists
+
+        Args:
+            path: .npz file the index is stored in (None keeps it in memory)
+            model_version: Tag of the model producing the embeddings; stored
+                           examples from a different model are ignored
+        """
+        self.path = path
+        self.model_version = model_version
+        self.labels = []
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.revision = 0
+        self.mean = None
+        self.mean_count = 0
+
+        self._lock = threading.Lock()
+        self._loaded_mtime = None
+        self._last_check = 0.0
+
+        if path and os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        return len(self.labels)
+
+    def load(self):
+        """Load the index from its file"""
+        with np.load(self.path, allow_pickle=False) as data:
+            labels = [str(label) for label in data['labels']]
+            vectors = data['vectors'].astype(np.float32)
+            revision = int(data['revision'])
+            stored_version = str(data['model_version'])
+            if 'mean' in data.files and int(data['mean_count']):
+                mean, mean_count = data['mean'].astype(np.float32), int(data['mean_count'])
+            else:
+                # Files written before centering: start from the examples
+                mean = vectors.mean(axis=0) if len(labels) else None
+                mean_count = len(labels)
+
+        if self.model_version and stored_version and stored_version != self.model_version:
+            print(f"Few-shot index {self.path} was built for model {stored_version}, "
+                  f"serving {self.model_version}; ignoring its {len(labels)} examples")
+            labels, vectors = [], np.zeros((0, 0), dtype=np.float32)
+            mean, mean_count = None, 0
+
+        with self._lock:
+            self.labels = labels
+            self.vectors = vectors
+            self.revision = revision
+            # Keep this process's mean if it has seen more embeddings than the file's
+            if mean is not None and mean_count >= self.mean_count:
+                self.mean, self.mean_count = mean, mean_count
+            self._loaded_mtime = os.path.getmtime(self.path)
+        print(f"Loaded few-shot index with {len(labels)} examples of {len(set(labels))} classes")
+
+    def reload_if_changed(self, interval=FEW_SHOT_RELOAD_INTERVAL):
+        """
+        Reload the index if another process updated its file
+
+        The file's modification time is checked at most once per interval.
+
+        Args:
+            interval: Minimum seconds between checks
+        """
+        now = time.time()
+        if not self.path or now - self._last_check < interval:
+            return
+        self._last_check = now
+
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime != self._loaded_mtime:
+            self.load()
+
+    def save(self):
+        """Write the index to its file atomically"""
+        if not self.path:
+            return
+
+        with self._lock:
+            labels = np.array(self.labels, dtype=str)
+            vectors = self.vectors.astype(np.float16)
+            revision = self.revision
+            mean = self.mean if self.mean is not None else np.zeros(0, dtype=np.float32)
+            mean_count = self.mean_count
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with tempfile.NamedTemporaryFile(dir=directory or '.', suffix='.tmp', delete=False) as f:
+            temp_path = f.name
+            np.savez(f, labels=labels, vectors=vectors, revision=revision,
+                     model_version=self.model_version or '', mean=mean, mean_count=mean_count)
+        try:
+            os.replace(temp_path, self.path)
+        except OSError:
+            os.remove(temp_path)
+            raise
+        self._loaded_mtime = os.path.getmtime(self.path)
+
+    @contextmanager
+    def update(self):
+        """
+        Reload, modify and save the index under an exclusive file lock
+
+        Other processes (and threads) updating the same file wait until the
+        block finishes, so each edit starts from the latest saved examples.
+        The index is saved on exit if the block changed it.
+
+        Usage:
+            with index.update():
+                index.add(label, embeddings)
+        """
+        if not self.path:
+            yield self
+            return
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(f"{self.path}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self.reload_if_changed(interval=0)
+                revision = self.revision
+                yield self
+                if self.revision != revision:
+                    self.save()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def add(self, label, embeddings):
+        """
+        Add example embeddings for a class
+
+        Args:
+            label: Class name
+            embeddings: Array of shape (N, D) or (D,)
+
+        Returns:
+            Number of stored examples for the class
+
+        Raises:
+            ValueError: If the embedding size differs from the stored examples
+        """
+        vectors = normalize_rows(embeddings)
+        with self._lock:
+            if len(self.labels) and vectors.shape[1] != self.vectors.shape[1]:
+                raise ValueError(f"Embedding size {vectors.shape[1]} does not match index size {self.vectors.shape[1]}")
+
+            self.vectors = np.concatenate([self.vectors, vectors]) if len(self.labels) else vectors
+            self.labels.extend([label] * len(vectors))
+            self._observe(vectors)
+            self.revision += 1
+            return self.labels.count(label)
+
+    def remove(self, label):
+        """
+        Remove all examples of a class
+
+        Args:
+            label: Class name
+
+        Returns:
+            Number of examples removed
+        """
+        with self._lock:
+            keep = [i for i, existing in enumerate(self.labels) if existing != label]
+            removed = len(self.labels) - len(keep)
+            if removed:
+                self.labels = [self.labels[i] for i in keep]
+                self.vectors = self.vectors[keep]
+                self.revision += 1
+            return removed
+
+    def _observe(self, vectors):
+        """Fold unit-length embeddings into the running mean (call with the lock held)"""
+        if self.mean is None or self.mean.shape[0] != vectors.shape[1]:
+            self.mean = vectors.mean(axis=0)
+            self.mean_count = len(vectors)
+            return
+        total = self.mean_count + len(vectors)
+        self.mean = self.mean + (vectors.sum(axis=0) - len(vectors) * self.mean) / total
+        self.mean_count = total
+
+    def class_counts(self):
+        """Number of stored examples per class"""
+        with self._lock:
+            counts = {}
+            for label in self.labels:
+                counts[label] = counts.get(label, 0) + 1
+            return counts
+
+    def classify(self, embeddings, k=FEW_SHOT_NEIGHBORS, min_similarity=FEW_SHOT_MIN_SIMILARITY):
+        """
+        Recognize few-shot classes by nearest-neighbour search
+
+        Each class among an image's k nearest examples is scored with its
+        highest centered cosine similarity; classes below min_similarity are
+        dropped. The queries are then folded into the running mean.
+
+        Args:
+            embeddings: Array of shape (N, D)
+            k: Number of nearest examples to consider
+            min_similarity: Minimum centered cosine similarity to report a class
+
+        Returns:
+            List of N prediction lists of dicts with 'name' and 'confidence'
+        """
+        queries = normalize_rows(embeddings)
+        with self._lock:
+            labels, vectors, mean = self.labels, self.vectors, self.mean
+
+        if not labels:
+            return [[] for _ in range(len(queries))]
+
+        similarities = normalize_rows(queries - mean) @ normalize_rows(vectors - mean).T
+        with self._lock:
+            if self.mean is not None and self.mean.shape[0] == queries.shape[1]:
+                self._observe(queries)
+
+        k = min(k, len(labels))
+        results = []
+        for row in similarities:
+            nearest = np.argpartition(row, -k)[-k:]
+            scores = {}
+            for idx in nearest:
+                similarity = float(row[idx])
+                if similarity >= min_similarity and similarity > scores.get(labels[idx], -1.0):
+                    scores[labels[idx]] = similarity
+            results.append([
+                {'name': name, 'confidence': score, 'source': 'few_shot'}
+                for name, score in sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            ])
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {
+                'examples': len(self.labels),
+                'classes': len(set(self.labels)),
+                'dimensions': int(self.vectors.shape[1]) if len(self.labels) else 0,
+                'revision': self.revision,
+                'mean_samples': self.mean_count
+            }
+
+def merge_predictions(softmax_predictions, few_shot_predictions, top_k=3):
+    """
+    Merge softmax head and nearest-neighbour predictions for one image
+
+    A class predicted by both keeps its higher confidence. Few-shot
+    confidences are centered similarities, which stay near 0 for unrelated
+    images, so they only outrank the softmax head on close matches.
+
+    Args:
+        softmax_predictions: List of dicts with 'name' and 'confidence'
+        few_shot_predictions: List of dicts with 'name' and 'confidence'
+        top_k: Number of predictions to return
+
+    Returns:
+        List of at most top_k predictions, highest confidence first
+    """
+    merged = {}
+    for prediction in softmax_predictions + few_shot_predictions:
+        current = merged.get(prediction['name'])
+        if current is None or prediction['confidence'] > current['confidence']:
+            merged[prediction['name']] = prediction
+    return sorted(merged.values(), key=lambda p: p['confidence'], reverse=True)[:top_k]
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_embedding_index(model_version=None):
+    """
+    Get the shared few-shot index, picking up changes made by other processes
+
+    The index is reopened when the serving model changes (e.g. a new registry
+    version was swapped in), since embeddings from another backbone are not
+    comparable.
+
+    Args:
+        model_version: Tag of the serving model
+
+    Returns:
+        EmbeddingIndex
+    """
+    global _index
+    if _index is None or _index.model_version != model_version:
+        with _index_lock:
+            if _index is None or _index.model_version != model_version:
+                from utils.metrics import register_metrics
+                _index = EmbeddingIndex(FEW_SHOT_INDEX_PATH, model_version=model_version)
+                register_metrics('few_shot_index', _index.stats)
+    index = _index
+    index.reload_if_changed()
+    return index
@@ -0,0 +1,180 @@
+"""
+Per-request image context shared by OCR and the recognition model
+
+The upload is read once and decoded once; the grayscale OCR input and the
+model tensor are both derived from the same decoded pixel buffer. With
+FAST_PREPROCESSING, the model input and perceptual hash come from a separate
+reduced-scale JPEG decode instead, so requests that never need the full
+image (no OCR) never decode it at full resolution.
+"""
+import hashlib
+import io
+import threading
+import numpy as np
+from PIL import Image, ImageOps
+from utils.image_preprocessing import (
+    FAST_PREPROCESSING,
+    convert_to_rgb,
+    resize_image,
+    image_to_tensor
+)
+
+def difference_hash(image, hash_size=8):
+    """
+    Compute a 64-bit perceptual difference hash (dHash)
+
+    Near-identical photos (re-encodes, slight crops or exposure changes)
+    produce hashes a small Hamming distance apart.
+
+    Args:
+        image: PIL Image
+        hash_size: Hash grid size (hash has hash_size ** 2 bits)
+
+    Returns:
+        Integer hash
+    """
+    thumbnail = image.convert('L').resize((hash_size + 1, hash_size), Image.Resampling.BOX)
+    pixels = np.asarray(thumbnail, dtype=np.int16)
+    bits = (pixels[:, :-1] > pixels[:, 1:]).flatten()
+
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+class ImageContext:
+    def __init__(self, data, filename=None):
+        """
+        Initialize the context
+
+        Args:
+            data: Raw image bytes
+            filename: Original filename (optional)
+        """
+        self.data = data
+        self.filename = filename
+        self._image = None
+        self._gray = None
+        self._reduced = {}
+        self._resized = {}
+        self._sha256 = None
+        self._phash = None
+        # OCR and inference may run on different threads
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_upload(cls, file):
+        """
+        Create a context from an uploaded werkzeug FileStorage
+
+        Args:
+            file: Uploaded file object
+
+        Returns:
+            ImageContext
+        """
+        file.seek(0)
+        return cls(file.read(), filename=file.filename)
+
+    @property
+    def sha256(self):
+        """SHA-256 of the raw bytes (no decode needed)"""
+        if self._sha256 is None:
+            self._sha256 = hashlib.sha256(self.data).hexdigest()
+        return self._sha256
+
+    @property
+    def perceptual_hash(self):
+        """Difference hash of the decoded image (reduced-scale with FAST_PREPROCESSING)"""
+        if self._phash is None:
+            self._phash = difference_hash(self.reduced_image() if FAST_PREPROCESSING else self.image)
+        return self._phash
+
+    @property
+    def image(self):
+        """Decoded, upright RGB image (decoded on first access)"""
+        if self._image is None:
+            with self._lock:
+                if self._image is None:
+                    image = Image.open(io.BytesIO(self.data))
+                    image = ImageOps.exif_transpose(image)
+                    self._image = convert_to_rgb(image)
+        return self._image
+
+    def reduced_image(self, target_size=(224, 224)):
+        """
+        Upright RGB image decoded at reduced scale for a model input size
+
+        For JPEGs, draft() lets the decoder produce a 1/2, 1/4 or 1/8 scale
+        image directly, keeping at least twice the target size. This is a
+        separate decode from the full-resolution image used for OCR.
+
+        Args:
+            target_size: Model input size
+
+        Returns:
+            RGB PIL Image
+        """
+        reduced = self._reduced.get(target_size)
+        if reduced is None:
+            with self._lock:
+                reduced = self._reduced.get(target_size)
+                if reduced is None:
+                    image = Image.open(io.BytesIO(self.data))
+                    if image.format == 'JPEG':
+                        image.draft('RGB', (target_size[0] * 2, target_size[1] * 2))
+                    image = ImageOps.exif_transpose(image)
+                    reduced = convert_to_rgb(image)
+                    self._reduced[target_size] = reduced
+        return reduced
+
+    @property
+    def ocr_image(self):
+        """Grayscale image for OCR, derived from the shared decode"""
+        if self._gray is None:
+            image = self.image
+            with self._lock:
+                if self._gray is None:
+                    self._gray = image.convert('L')
+        return self._gray
+
+    def model_input(self, target_size=(224, 224), fast=None):
+        """
+        RGB image resized to the model input size, derived from the shared decode
+
+        Batched paths write this straight into a float32 batch buffer slot.
+
+        Args:
+            target_size: Model input size
+            fast: Decode at reduced scale and use a reducing bilinear resize
+                  (defaults to FAST_PREPROCESSING)
+
+        Returns:
+            Resized RGB PIL Image
+        """
+        if fast is None:
+            fast = FAST_PREPROCESSING
+
+        key = (target_size, fast)
+        resized = self._resized.get(key)
+        if resized is None:
+            if fast:
+                image = self.reduced_image(target_size)
+                resized = image.resize(target_size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+            else:
+                resized = resize_image(self.image, target_size)
+            self._resized[key] = resized
+        return resized
+
+    def model_tensor(self, target_size=(224, 224), fast=None):
+        """
+        Model-ready tensor derived from the shared decode
+
+        Args:
+            target_size: Model input size
+            fast: Use a reducing bilinear resize (defaults to FAST_PREPROCESSING)
+
+        Returns:
+            numpy array of shape (1, H, W, 3)
+        """
+        return image_to_tensor(self.model_input(target_size, fast))
@@ -1,6 +1,51 @@
 import numpy as np
-from PIL import Image
+from PIL import Image, ImageOps
 import io
+import os
+
+# Decode JPEGs at reduced scale and use a cheaper resampling filter
+FAST_PREPROCESSING = os.getenv('FAST_PREPROCESSING', 'False') == 'True'
+
+def open_image(image_file):
+    """
+    Open an image from a path or file object without decoding pixels
+    
+    Args:
+        image_file: File object or path to image
+    
+    Returns:
+        PIL Image object (lazily decoded)
+    """
+    if isinstance(image_file, str):
+        return Image.open(image_file)
+    if hasattr(image_file, 'seek'):
+        # Decode straight from the stream instead of copying it into BytesIO
+        image_file.seek(0)
+        return Image.open(image_file)
+    return Image.open(io.BytesIO(image_file.read()))
+
+def load_image_fast(image, target_size=(224, 224)):
+    """
+    Decode and resize an image with minimal work
+    
+    For JPEGs, draft() lets the decoder produce a 1/2, 1/4 or 1/8 scale
+    image directly, keeping at least twice the target size so the final
+    resize still has detail to work with. EXIF orientation is applied, and
+    the final step uses a reducing bilinear resize instead of LANCZOS.
+    
+    Args:
+        image: PIL Image object that has not been loaded yet
+        target_size: Tuple of (width, height)
+    
+    Returns:
+        Resized RGB PIL Image
+    """
+    if image.format == 'JPEG':
+        image.draft('RGB', (target_size[0] * 2, target_size[1] * 2))
+    
+    image = ImageOps.exif_transpose(image)
+    image = convert_to_rgb(image)
+    return image.resize(target_size, Image.Resampling.BILINEAR, reducing_gap=2.0)
 
 def resize_image(image, target_size=(224, 224)):
     """
@@ -34,46 +79,135 @@ def normalize_for_mobilenet(image_array):
     Normalize image array for MobileNet preprocessing
     Uses MobileNetV2 preprocessing: scale to [-1, 1]
     
+    Same arithmetic as tensorflow.keras.applications.mobilenet_v2.preprocess_input,
+    done in numpy so preprocessing does not import TensorFlow.
+    
     Args:
         image_array: numpy array of image
     
     Returns:
-        Normalized numpy array
+        Normalized float32 numpy array
     """
-    from tensorflow.keras.applications.mobilenet_v2 import preprocess_input
-    return preprocess_input(image_array)
+    image_array = np.asarray(image_array, dtype=np.float32)
+    return image_array / 127.5 - 1.0
 
-def prepare_image_tensor(image_file, target_size=(224, 224)):
+def prepare_image_tensor(image_file, target_size=(224, 224), fast=None):
     """
     Complete preprocessing pipeline: resize, convert to RGB, normalize
     
     Args:
         image_file: File object or path to image
         target_size: Target size for resizing
+        fast: Use reduced-scale decoding (defaults to FAST_PREPROCESSING)
     
     Returns:
         Model-ready numpy array tensor
     """
+    if fast is None:
+        fast = FAST_PREPROCESSING
+    
     # Load image
-    if isinstance(image_file, str):
-        image = Image.open(image_file)
-    else:
-        image = Image.open(io.BytesIO(image_file.read()))
+    image = open_image(image_file)
     
     # Preprocessing steps
-    image = convert_to_rgb(image)
-    image = resize_image(image, target_size)
+    if fast:
+        image = load_image_fast(image, target_size)
+    else:
+        image = convert_to_rgb(image)
+        image = resize_image(image, target_size)
+    
+    return image_to_tensor(image)
+
+def image_to_tensor(image):
+    """
+    Convert an already resized RGB image into a model-ready tensor
+    
+    Args:
+        image: RGB PIL Image at the model input size
+    
+    Returns:
+        Model-ready numpy array tensor of shape (1, H, W, 3)
+    """
+    return images_to_batch([image])
+
+def fill_tensor_slot(image, out):
+    """
+    Write a resized RGB image into one float32 batch slot, scaled to [-1, 1]
+    
+    The uint8 pixels are scaled straight into the slot, so no intermediate
+    float array is created.
+    
+    Args:
+        image: RGB PIL Image at the model input size
+        out: float32 array of shape (H, W, 3)
     
-    # Convert to array
-    image_array = np.array(image)
+    Returns:
+        out
+    """
+    pixels = np.asarray(image)
+    np.multiply(pixels, np.float32(1 / 127.5), out=out)
+    np.subtract(out, np.float32(1.0), out=out)
+    return out
+
+def images_to_batch(images, out=None):
+    """
+    Fill a float32 batch tensor from resized RGB images
     
-    # Add batch dimension
-    image_array = np.expand_dims(image_array, axis=0)
+    Args:
+        images: List of RGB PIL Images at the model input size
+        out: Optional preallocated float32 array of shape (>=N, H, W, 3)
     
-    # Normalize
-    image_array = normalize_for_mobilenet(image_array)
+    Returns:
+        Model-ready tensor of shape (N, H, W, 3), a view of out if given
+    """
+    if out is None:
+        width, height = images[0].size
+        out = np.empty((len(images), height, width, 3), dtype=np.float32)
+    
+    for i, image in enumerate(images):
+        fill_tensor_slot(image, out[i])
     
-    return image_array
+    return out[:len(images)]
+
+class BatchBuffer:
+    def __init__(self, max_batch_size, item_shape=(224, 224, 3)):
+        """
+        Reusable float32 batch buffer
+        
+        Allocated once and refilled for every batch. Not thread-safe: each
+        buffer should be owned by a single thread (e.g. a batcher's scheduler).
+        
+        Args:
+            max_batch_size: Number of slots
+            item_shape: Shape of one image tensor (H, W, C)
+        """
+        self.array = np.empty((max_batch_size,) + tuple(item_shape), dtype=np.float32)
+    
+    @property
+    def item_shape(self):
+        return self.array.shape[1:]
+    
+    def fill(self, items):
+        """
+        Write images into consecutive slots
+        
+        Args:
+            items: Resized RGB PIL Images (scaled in place) or already
+                   normalized arrays of shape (H, W, C)
+        
+        Returns:
+            View of the filled slots with shape (N, H, W, C)
+        """
+        if len(items) > len(self.array):
+            raise ValueError(f'Batch of {len(items)} exceeds buffer size {len(self.array)}')
+        
+        for i, item in enumerate(items):
+            if isinstance(item, Image.Image):
+                fill_tensor_slot(item, self.array[i])
+            else:
+                self.array[i] = item
+        
+        return self.array[:len(items)]
 
 def preprocess_image_for_display(image_file):
     """
@@ -85,10 +219,6 @@ def preprocess_image_for_display(image_file):
     Returns:
         PIL Image object
     """
-    if isinstance(image_file, str):
-        image = Image.open(image_file)
-    else:
-        image = Image.open(io.BytesIO(image_file.read()))
-    
+    image = open_image(image_file)
     image = convert_to_rgb(image)
     return image
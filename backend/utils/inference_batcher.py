@@ -0,0 +1,181 @@
+"""
+Dynamic micro-batching for model inference
+
+Concurrent requests submit single images; a scheduler thread gathers them
+until the batch is full or the oldest request has waited max_wait_ms, writes
+them into a preallocated float32 batch buffer, runs one forward pass, and
+hands each row of the output back to its caller.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from PIL import Image
+from utils.image_preprocessing import BatchBuffer
+from utils.metrics import Histogram
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+class InferenceBatcher:
+    def __init__(self, batch_fn, max_batch_size=16, max_wait_ms=10, max_queue_size=256, name='inference'):
+        """
+        Initialize the batcher
+
+        Args:
+            batch_fn: Callable taking a (N, H, W, C) float32 array and returning
+                      N output rows; the array is reused after it returns
+            max_batch_size: Maximum number of requests per forward pass
+            max_wait_ms: Maximum time the oldest request waits for a batch to fill
+            max_queue_size: Maximum number of pending requests
+            name: Thread name suffix
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stopped = threading.Event()
+        # Allocated on the first batch, once the item shape is known
+        self._buffer = None
+
+        self.batch_size = Histogram(buckets=BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram()
+        self.inference_ms = Histogram()
+        self.batches = 0
+        self.failed_batches = 0
+
+        self._thread = threading.Thread(target=self._run, name=f'{name}-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, image_tensor):
+        """
+        Queue a single image for the next batch
+
+        Args:
+            image_tensor: Normalized array of shape (1, H, W, C) or (H, W, C),
+                          or a resized RGB PIL Image, which is scaled straight
+                          into the batch buffer
+
+        Returns:
+            Future resolving to the output row for this image
+
+        Raises:
+            queue.Full: If too many requests are already pending
+        """
+        if not isinstance(image_tensor, Image.Image) and image_tensor.ndim == 4:
+            if image_tensor.shape[0] != 1:
+                raise ValueError('InferenceBatcher.submit expects a single image')
+            image_tensor = image_tensor[0]
+
+        future = Future()
+        self._queue.put_nowait((image_tensor, future, time.perf_counter()))
+        return future
+
+    def predict(self, image_tensor, timeout=None):
+        """
+        Run a single image through the batcher and wait for its output
+
+        Args:
+            image_tensor: Array of shape (1, H, W, C) or resized PIL Image
+            timeout: Seconds to wait for the result (None waits forever)
+
+        Returns:
+            Output row for this image
+        """
+        return self.submit(image_tensor).result(timeout=timeout)
+
+    def _collect_batch(self):
+        """Block for the first request, then gather more until full or deadline"""
+        first = self._queue.get()
+        if first is None:
+            return None
+
+        batch = [first]
+        deadline = first[2] + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._stopped.set()
+                break
+            batch.append(item)
+
+        return batch
+
+    def _get_buffer(self, item):
+        """Get the batch buffer, sized from the first item seen"""
+        if isinstance(item, Image.Image):
+            shape = (item.size[1], item.size[0], 3)
+        else:
+            shape = item.shape
+
+        if self._buffer is None or self._buffer.item_shape != tuple(shape):
+            self._buffer = BatchBuffer(self.max_batch_size, shape)
+        return self._buffer
+
+    def _run(self):
+        while not self._stopped.is_set():
+            batch = self._collect_batch()
+            if batch is None:
+                break
+
+            started = time.perf_counter()
+            for _, _, enqueued in batch:
+                self.queue_wait_ms.observe((started - enqueued) * 1000.0)
+            self.batch_size.observe(len(batch))
+
+            try:
+                inputs = self._get_buffer(batch[0][0]).fill([item[0] for item in batch])
+                outputs = self.batch_fn(inputs)
+            except Exception as e:
+                self.failed_batches += 1
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            self.inference_ms.observe((time.perf_counter() - started) * 1000.0)
+            self.batches += 1
+
+            for i, (_, future, _) in enumerate(batch):
+                future.set_result(outputs[i])
+
+        # Fail anything still waiting once stopped
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[1].set_exception(RuntimeError('Inference batcher stopped'))
+
+    def stop(self):
+        """Stop the scheduler thread after the current batch"""
+        self._stopped.set()
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        self._thread.join(timeout=5)
+
+    def stats(self):
+        """
+        Get batching statistics
+
+        Returns:
+            Dictionary with batch size, queue wait and inference time histograms
+        """
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'queue_depth': self._queue.qsize(),
+            'batches': self.batches,
+            'failed_batches': self.failed_batches,
+            'batch_size': self.batch_size.snapshot(),
+            'queue_wait_ms': self.queue_wait_ms.snapshot(),
+            'inference_ms': self.inference_ms.snapshot()
+        }
@@ -0,0 +1,448 @@
+"""
+Bounded background job queue
+
+Slow work (OCR plus model inference) is handed to a dedicated pool of worker
+threads so web workers only enqueue and poll. The queue is bounded; when it
+is full, submit raises queue.Full and the caller should answer 429 with the
+suggested retry delay. Finished jobs are kept for a limited time so clients
+can poll for the result.
+
+Jobs, payloads and results live in a job store. MemoryJobStore keeps them in
+this process and only works when every request reaches the same process;
+MongoJobStore keeps them in a collection, so a job submitted through one
+gunicorn worker can be run by any worker and polled through any other, and
+the queue limit applies to the whole deployment.
+"""
+import collections
+import math
+import queue
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime, timedelta
+from utils.metrics import Histogram
+
+class MemoryJobStore:
+    def __init__(self, max_queue_size=32):
+        """
+        In-process job store (single worker deployments and tests)
+
+        Args:
+            max_queue_size: Maximum number of jobs waiting to run
+        """
+        self.max_queue_size = max_queue_size
+        self._jobs = {}
+        self._payloads = {}
+        self._pending = collections.deque()
+        self._condition = threading.Condition()
+
+    def insert(self, job, payload):
+        """
+        Store a new job and queue it
+
+        Raises:
+            queue.Full: If max_queue_size jobs are already waiting
+        """
+        with self._condition:
+            if len(self._pending) >= self.max_queue_size:
+                raise queue.Full
+            self._jobs[job['job_id']] = dict(job)
+            self._payloads[job['job_id']] = payload
+            self._pending.append(job['job_id'])
+            self._condition.notify()
+
+    def claim(self, timeout=1.0):
+        """
+        Take the oldest queued job and mark it running
+
+        Args:
+            timeout: Seconds to wait for a job
+
+        Returns:
+            (job, payload) tuple, or None if no job arrived in time
+        """
+        with self._condition:
+            if not self._pending:
+                self._condition.wait(timeout)
+            if not self._pending:
+                return None
+
+            job_id = self._pending.popleft()
+            job = self._jobs[job_id]
+            job.update(status='running', started_at=time.time())
+            return dict(job), self._payloads.pop(job_id)
+
+    def finish(self, job_id, status, result, error):
+        """Record a job's outcome"""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(status=status, result=result, error=error, finished_at=time.time())
+
+    def get(self, job_id, cutoff):
+        """
+        Get a copy of a job
+
+        Args:
+            job_id: Job ID
+            cutoff: Jobs finished before this time are treated as expired
+
+        Returns:
+            Job dictionary, or None if unknown or expired
+        """
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or (job['finished_at'] is not None and job['finished_at'] < cutoff):
+                return None
+            return dict(job)
+
+    def purge_expired(self, cutoff):
+        """Drop jobs finished before cutoff"""
+        with self._condition:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job['finished_at'] is not None and job['finished_at'] < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def counts(self):
+        """Number of queued, running and tracked jobs"""
+        with self._condition:
+            running = sum(1 for job in self._jobs.values() if job['status'] == 'running')
+            return {'queued': len(self._pending), 'running': running, 'tracked': len(self._jobs)}
+
+class MongoJobStore:
+    def __init__(self, collection, max_queue_size=32, result_ttl=600, lease_timeout=300,
+                 max_attempts=2, max_age=3600, poll_interval=0.2, max_poll_interval=5.0):
+        """
+        Job store in a MongoDB collection shared by all workers
+
+        A claimed job holds a lease from 'claimed_at'. If its worker dies and
+        the lease runs out, the job is claimed again by another worker, or
+        marked failed once it has been attempted max_attempts times. Every
+        job gets an 'expires_at' when it is inserted, so a TTL index on it
+        (created in models.database.ensure_indexes) also removes jobs and
+        payloads that never finish.
+
+        Args:
+            collection: pymongo collection
+            max_queue_size: Maximum number of jobs waiting to run (approximate:
+                            the check and the insert are separate operations,
+                            so concurrent submissions can overshoot it by a few)
+            result_ttl: Seconds a finished job is kept before the TTL index removes it
+            lease_timeout: Seconds a worker may run a job before it is
+                           considered dead and the job is requeued
+            max_attempts: Number of times a job is claimed before giving up
+            max_age: Seconds an unfinished job is kept before the TTL index removes it
+            poll_interval: Seconds between claim attempts while jobs are arriving
+            max_poll_interval: Longest interval between claim attempts; the
+                               interval doubles up to this while the queue is empty
+        """
+        self.collection = collection
+        self.max_queue_size = max_queue_size
+        self.result_ttl = result_ttl
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        self.max_age = max_age
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self._local = threading.local()
+        self._last_lease_check = 0.0
+
+    def insert(self, job, payload):
+        """
+        Store a new job and queue it
+
+        Raises:
+            queue.Full: If max_queue_size jobs are already waiting
+        """
+        if self.collection.count_documents({'status': 'queued'}) >= self.max_queue_size:
+            raise queue.Full
+        self.collection.insert_one(dict(
+            job,
+            _id=job['job_id'],
+            payload=payload,
+            attempts=0,
+            claimed_at=None,
+            expires_at=datetime.utcnow() + timedelta(seconds=self.max_age)
+        ))
+
+    def claim(self, timeout=None):
+        """
+        Take the oldest queued job (or one whose lease expired) and mark it running
+
+        While the queue stays empty, the interval between attempts doubles
+        up to max_poll_interval; it resets once a job is claimed.
+
+        Args:
+            timeout: Seconds to wait for a job (defaults to the current poll interval)
+
+        Returns:
+            (job, payload) tuple, or None if no job arrived in time
+        """
+        interval = getattr(self._local, 'interval', self.poll_interval)
+        deadline = time.time() + (timeout if timeout is not None else interval)
+        while True:
+            claimed = self._claim_once()
+            if claimed is not None:
+                self._local.interval = self.poll_interval
+                return claimed
+
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 2, self.max_poll_interval)
+            self._local.interval = interval
+
+    def _claim_once(self):
+        from pymongo import ReturnDocument
+
+        now = time.time()
+        lease_cutoff = now - self.lease_timeout
+        self._fail_abandoned(now)
+
+        document = self.collection.find_one_and_update(
+            {'$or': [
+                {'status': 'queued'},
+                {'status': 'running', 'claimed_at': {'$lt': lease_cutoff}, 'attempts': {'$lt': self.max_attempts}}
+            ]},
+            {'$set': {'status': 'running', 'started_at': now, 'claimed_at': now}, '$inc': {'attempts': 1}},
+            sort=[('created_at', 1)],
+            return_document=ReturnDocument.AFTER
+        )
+        if document is None:
+            return None
+        if document['attempts'] > 1:
+            print(f"Requeued job {document['_id']} after its worker's lease expired (attempt {document['attempts']})")
+        payload = document.pop('payload', None)
+        return self._to_job(document), payload
+
+    def _fail_abandoned(self, now):
+        """Fail jobs whose last allowed attempt lost its worker (checked at most once a minute)"""
+        if now - self._last_lease_check < min(self.lease_timeout, 60):
+            return
+        self._last_lease_check = now
+
+        self.collection.update_many(
+            {'status': 'running', 'claimed_at': {'$lt': now - self.lease_timeout}, 'attempts': {'$gte': self.max_attempts}},
+            {
+                '$set': {
+                    'status': 'failed',
+                    'error': f'Job abandoned by its worker after {self.max_attempts} attempts',
+                    'finished_at': now,
+                    'expires_at': datetime.utcnow() + timedelta(seconds=self.result_ttl)
+                },
+                '$unset': {'payload': ''}
+            }
+        )
+
+    def finish(self, job_id, status, result, error):
+        """Record a job's outcome and drop its payload"""
+        # A job already failed as abandoned keeps that outcome
+        self.collection.update_one(
+            {'_id': job_id, 'status': 'running'},
+            {
+                '$set': {
+                    'status': status,
+                    'result': result,
+                    'error': error,
+                    'finished_at': time.time(),
+                    'expires_at': datetime.utcnow() + timedelta(seconds=self.result_ttl)
+                },
+                '$unset': {'payload': ''}
+            }
+        )
+
+    def get(self, job_id, cutoff):
+        """
+        Get a job
+
+        Args:
+            job_id: Job ID
+            cutoff: Jobs finished before this time are treated as expired
+                    (the TTL monitor only runs once a minute)
+
+        Returns:
+            Job dictionary, or None if unknown or expired
+        """
+        document = self.collection.find_one({'_id': job_id}, {'payload': 0})
+        if document is None or (document.get('finished_at') is not None and document['finished_at'] < cutoff):
+            return None
+        return self._to_job(document)
+
+    def purge_expired(self, cutoff):
+        """Expired jobs are removed by the TTL index"""
+
+    def counts(self):
+        """Number of queued, running and tracked jobs across all workers"""
+        queued = self.collection.count_documents({'status': 'queued'})
+        running = self.collection.count_documents({'status': 'running'})
+        return {'queued': queued, 'running': running, 'tracked': self.collection.estimated_document_count()}
+
+    @staticmethod
+    def _to_job(document):
+        for field in ('_id', 'expires_at', 'claimed_at', 'attempts'):
+            document.pop(field, None)
+        return document
+
+class JobQueue:
+    def __init__(self, handler, num_workers=2, max_queue_size=32, result_ttl=600, name='jobs', store=None):
+        """
+        Initialize the queue and start its workers
+
+        Args:
+            handler: Callable run by a worker for each job payload; its return
+                     value becomes the job result
+            num_workers: Number of worker threads in this process
+            max_queue_size: Maximum number of jobs waiting to run (used when
+                            no store is given)
+            result_ttl: Seconds a finished job is kept for polling
+            name: Name used for worker threads
+            store: Job store shared with other queues (defaults to a new
+                   MemoryJobStore)
+        """
+        self.handler = handler
+        self.num_workers = num_workers
+        self.result_ttl = result_ttl
+        self.name = name
+        self.store = store if store is not None else MemoryJobStore(max_queue_size)
+
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.queue_wait_ms = Histogram()
+        self.run_ms = Histogram()
+
+        self._workers = []
+        for i in range(num_workers):
+            worker = threading.Thread(target=self._run, name=f'{name}-worker-{i}', daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, payload):
+        """
+        Queue a job
+
+        Args:
+            payload: Object passed to the handler
+
+        Returns:
+            Job ID
+
+        Raises:
+            queue.Full: If the queue is full
+        """
+        self.store.purge_expired(time.time() - self.result_ttl)
+
+        job_id = uuid.uuid4().hex
+        job = {
+            'job_id': job_id,
+            'status': 'queued',
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'result': None,
+            'error': None
+        }
+
+        try:
+            self.store.insert(job, payload)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise
+
+        with self._lock:
+            self.submitted += 1
+        return job_id
+
+    def get(self, job_id):
+        """
+        Get a job's status and result
+
+        Args:
+            job_id: Job ID returned by submit
+
+        Returns:
+            Copy of the job dictionary, or None if unknown or expired
+        """
+        return self.store.get(job_id, time.time() - self.result_ttl)
+
+    def retry_after(self):
+        """
+        Suggested seconds to wait before resubmitting after a rejection
+
+        Estimated from the queue depth and the mean job run time.
+
+        Returns:
+            Integer number of seconds (at least 1)
+        """
+        mean_ms = self.run_ms.snapshot().get('mean') or 1000.0
+        waiting = self.store.counts()['queued']
+        return max(1, int(math.ceil(waiting * mean_ms / 1000.0 / max(self.num_workers, 1))))
+
+    def _run(self):
+        error_delay = 0.0
+        while True:
+            try:
+                claimed = self.store.claim()
+            except Exception as e:
+                # Back off while the store is unavailable, logging once per outage
+                if not error_delay:
+                    print(f"Could not claim a {self.name} job, retrying with backoff: {e}")
+                error_delay = min(error_delay * 2 or 1.0, 30.0)
+                time.sleep(error_delay)
+                continue
+            if error_delay:
+                print(f"Claiming {self.name} jobs again")
+                error_delay = 0.0
+            if claimed is None:
+                continue
+
+            job, payload = claimed
+            job_id = job['job_id']
+            self.queue_wait_ms.observe((job['started_at'] - job['created_at']) * 1000.0)
+            start = time.perf_counter()
+            try:
+                result = self.handler(payload)
+                status, error = 'done', None
+            except Exception as e:
+                print(f"Job {job_id} failed: {e}")
+                print(traceback.format_exc())
+                result, status, error = None, 'failed', str(e)
+            self.run_ms.observe((time.perf_counter() - start) * 1000.0)
+
+            self.store.finish(job_id, status, result, error)
+
+            with self._lock:
+                if status == 'done':
+                    self.completed += 1
+                else:
+                    self.failed += 1
+
+    def stats(self):
+        """
+        Get queue statistics
+
+        Returns:
+            Dictionary with queue depth (across all workers sharing the
+            store), this process's job counters and timing histograms
+        """
+        counts = self.store.counts()
+        with self._lock:
+            return {
+                'workers': self.num_workers,
+                'queue_depth': counts['queued'],
+                'max_queue_size': self.store.max_queue_size,
+                'running': counts['running'],
+                'tracked_jobs': counts['tracked'],
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'completed': self.completed,
+                'failed': self.failed,
+                'queue_wait_ms': self.queue_wait_ms.snapshot(),
+                'run_ms': self.run_ms.snapshot()
+            }
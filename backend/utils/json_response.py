@@ -0,0 +1,151 @@
+"""
+BSON-aware JSON serialization and streaming JSON responses
+"""
+import itertools
+import json
+from bson import ObjectId
+from flask import Response, has_request_context, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+# Number of documents serialized per chunk when streaming a list
+STREAM_CHUNK_SIZE = 50
+
+def _default(obj):
+    """Serialize types the JSON encoder does not handle natively"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if hasattr(obj, 'tolist'):  # numpy scalars and arrays
+        return obj.tolist()
+    # Dates, UUIDs, decimals and dataclasses as Flask serializes them
+    return DefaultJSONProvider.default(obj)
+
+def dumps(obj, sort_keys=False, indent=None, ensure_ascii=False, **kwargs):
+    """
+    Serialize an object to a JSON string
+
+    ObjectId values become their hex string and everything else is
+    serialized as Flask's default provider would (datetimes as HTTP dates),
+    so Mongo documents can be serialized without converting them first.
+    orjson is used when it can honor the arguments; anything else is passed
+    to json.dumps.
+
+    Args:
+        obj: Object to serialize
+        sort_keys: Sort the keys of dicts
+        indent: Indentation (None for compact output)
+        ensure_ascii: Escape non-ASCII characters
+        **kwargs: Further json.dumps arguments
+
+    Returns:
+        JSON string
+    """
+    separators = kwargs.pop('separators', None)
+    if indent is None:
+        orjson_layout = separators in (None, (',', ':'))
+    else:
+        orjson_layout = indent == 2 and separators in (None, (',', ': '))
+
+    if orjson is not None and orjson_layout and not ensure_ascii and not kwargs:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option).decode('utf-8')
+
+    kwargs.setdefault('default', _default)
+    if separators is None and indent is None:
+        separators = (',', ':')
+    return json.dumps(obj, sort_keys=sort_keys, indent=indent, ensure_ascii=ensure_ascii,
+                      separators=separators, **kwargs)
+
+class MongoJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider used by jsonify that understands BSON types
+
+    Output matches the default provider (sorted keys, HTTP-date datetimes,
+    compact or indented per the app's settings), except that non-ASCII
+    characters are written as UTF-8 instead of escape sequences so orjson
+    can be used. Set ensure_ascii = True on the provider to restore escaping.
+    """
+
+    ensure_ascii = False
+
+    def dumps(self, obj, **kwargs):
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        return dumps(obj, **kwargs)
+
+def stream_json_list(documents, key='recipes', extra=None):
+    """
+    Stream an iterable of documents as a chunked JSON object
+
+    The output has the same shape as the non-streamed responses:
+    {"recipes": [...], "count": N, ...extra}. Documents are pulled from the
+    iterable (typically a pymongo cursor) one batch at a time, so memory use
+    does not grow with the size of the result set. The first document is
+    fetched before the response starts so that query errors still surface
+    as a normal exception in the route. The request context is kept for the
+    rest of the stream so the cursor's getMore commands are still attributed
+    to the route in the Mongo metrics.
+
+    If the cursor fails once the response has started, the array is closed
+    and the object gets an "error" field, so clients can tell a failed
+    stream from a complete one.
+
+    Args:
+        documents: Iterable of documents
+        key: Name of the list field
+        extra: Optional dict of additional top-level fields
+
+    Returns:
+        Flask streaming Response
+    """
+    iterator = iter(documents)
+    first = next(iterator, None)
+
+    def generate():
+        yield '{' + dumps(key) + ':['
+        count = 0
+        chunk = []
+
+        if first is None:
+            remaining = ()
+        else:
+            remaining = itertools.chain([first], iterator)
+
+        error = None
+        try:
+            for document in remaining:
+                chunk.append(dumps(document))
+                count += 1
+
+                if len(chunk) >= STREAM_CHUNK_SIZE:
+                    prefix = ',' if count > len(chunk) else ''
+                    yield prefix + ','.join(chunk)
+                    chunk = []
+        except Exception as e:
+            # The 200 status is already sent; finish valid JSON and flag it
+            print(f"Streaming {key} failed after {count} documents: {e}")
+            error = 'Result stream interrupted; the list is incomplete'
+
+        if chunk:
+            prefix = ',' if count > len(chunk) else ''
+            yield prefix + ','.join(chunk)
+
+        tail = {'count': count}
+        if extra:
+            tail.update(extra)
+        if error:
+            tail['error'] = error
+        yield '],' + dumps(tail)[1:]
+
+    body = generate()
+    if has_request_context():
+        body = stream_with_context(body)
+    return Response(body, mimetype='application/json')
@@ -0,0 +1,109 @@
+"""
+In-process metrics registry
+
+Components register a snapshot function under a name, and the /metrics
+endpoint collects every registered snapshot into one JSON document.
+"""
+import threading
+
+_sources = {}
+_sources_lock = threading.Lock()
+
+def register_metrics(name, snapshot_fn):
+    """
+    Register a metrics source
+
+    Args:
+        name: Key under which the snapshot is reported
+        snapshot_fn: Callable returning a JSON-serializable dict
+    """
+    with _sources_lock:
+        _sources[name] = snapshot_fn
+
+def collect_metrics():
+    """
+    Collect snapshots from all registered metrics sources
+
+    Returns:
+        Dictionary mapping source name to its snapshot
+    """
+    with _sources_lock:
+        sources = dict(_sources)
+
+    snapshot = {}
+    for name, snapshot_fn in sources.items():
+        try:
+            snapshot[name] = snapshot_fn()
+        except Exception as e:
+            snapshot[name] = {'error': str(e)}
+
+    return snapshot
+
+# Default latency buckets in milliseconds
+DEFAULT_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS_MS):
+        """
+        Thread-safe bucketed histogram
+
+        Args:
+            buckets: Sorted upper bounds of the buckets
+        """
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        """Record a single observation"""
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total += value
+            self.min = value if self.min is None else min(self.min, value)
+            self.max = value if self.max is None else max(self.max, value)
+
+    def _percentile(self, counts, fraction):
+        """Approximate a percentile as the upper bound of its bucket"""
+        target = fraction * self.count
+        running = 0
+        for i, bucket_count in enumerate(counts):
+            running += bucket_count
+            if running >= target and bucket_count:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self):
+        """
+        Get histogram statistics
+
+        Returns:
+            Dictionary with count, mean, bounds, percentiles and buckets
+        """
+        with self._lock:
+            counts = list(self._counts)
+            if not self.count:
+                return {'count': 0}
+
+            bucket_labels = [f'le_{b}' for b in self.buckets] + ['le_inf']
+            return {
+                'count': self.count,
+                'sum': round(self.total, 3),
+                'mean': round(self.total / self.count, 3),
+                'min': round(self.min, 3),
+                'max': round(self.max, 3),
+                'p50': self._percentile(counts, 0.50),
+                'p95': self._percentile(counts, 0.95),
+                'p99': self._percentile(counts, 0.99),
+                'buckets': dict(zip(bucket_labels, counts))
+            }
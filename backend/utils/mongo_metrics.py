@@ -0,0 +1,229 @@
+"""
+MongoDB command latency and connection pool instrumentation
+
+Listeners are passed to MongoClient(event_listeners=[...]) and record
+per-command latency, reply sizes and pool checkout waits, tagged with the
+Flask route that issued the command.
+"""
+import os
+import threading
+import time
+import bson
+from pymongo import monitoring
+from pymongo.common import MAX_POOL_SIZE
+from utils.metrics import Histogram, register_metrics
+
+# Sizing replies exactly means re-encoding every reply on the request thread,
+# which is as costly as the decode for large reads. By default the size of a
+# cursor batch is estimated from its first document; enable exact sizing
+# only while profiling
+RECORD_REPLY_BYTES = os.getenv('MONGO_METRICS_REPLY_BYTES', 'False') == 'True'
+
+def current_route():
+    """
+    Get the Flask route handling the current thread's request
+
+    Returns:
+        "METHOD /rule" string, or "background" outside a request
+    """
+    try:
+        from flask import has_request_context, request
+        if has_request_context():
+            rule = request.url_rule.rule if request.url_rule else request.path
+            return f"{request.method} {rule}"
+    except Exception:
+        pass
+    return 'background'
+
+def measure_reply(reply):
+    """
+    Count the documents in a command reply and estimate its size
+
+    Args:
+        reply: Decoded command reply
+
+    Returns:
+        (documents, bytes) tuple; bytes is exact when RECORD_REPLY_BYTES is set
+    """
+    cursor = reply.get('cursor')
+    batch = None
+    if isinstance(cursor, dict):
+        batch = cursor.get('firstBatch', cursor.get('nextBatch'))
+
+    if batch is None:
+        # Write and admin command replies are small; size them directly
+        return 0, len(bson.encode(reply))
+    if RECORD_REPLY_BYTES:
+        return len(batch), len(bson.encode(reply))
+    if not batch:
+        return 0, 0
+    return len(batch), len(bson.encode(batch[0])) * len(batch)
+
+class CommandMetrics(monitoring.CommandListener):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency = {}
+        self._reply_documents = {}
+        self._reply_bytes = {}
+        self._failures = {}
+
+    def _key(self, event):
+        # Sync pymongo publishes command events on the calling thread,
+        # so the Flask request context is still available here
+        return (current_route(), event.command_name)
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        key = self._key(event)
+        with self._lock:
+            latency = self._latency.setdefault(key, Histogram())
+
+        latency.observe(event.duration_micros / 1000.0)
+
+        if event.reply:
+            documents, size = measure_reply(event.reply)
+            with self._lock:
+                self._reply_documents[key] = self._reply_documents.get(key, 0) + documents
+                self._reply_bytes[key] = self._reply_bytes.get(key, 0) + size
+
+    def failed(self, event):
+        key = self._key(event)
+        with self._lock:
+            latency = self._latency.setdefault(key, Histogram())
+            self._failures[key] = self._failures.get(key, 0) + 1
+
+        latency.observe(event.duration_micros / 1000.0)
+
+    def snapshot(self):
+        """
+        Get per-route, per-command statistics
+
+        Returns:
+            Dictionary of {route: {command: stats}}
+        """
+        with self._lock:
+            keys = list(self._latency.keys())
+            reply_documents = dict(self._reply_documents)
+            reply_bytes = dict(self._reply_bytes)
+            failures = dict(self._failures)
+
+        by_route = {}
+        for route, command in sorted(keys):
+            stats = {
+                'latency_ms': self._latency[(route, command)].snapshot(),
+                'documents_returned': reply_documents.get((route, command), 0),
+                'bytes_returned': reply_bytes.get((route, command), 0),
+                'failures': failures.get((route, command), 0)
+            }
+            by_route.setdefault(route, {})[command] = stats
+
+        return by_route
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._checkout_wait = {}
+        self._pools = {}
+
+    def _pool(self, address):
+        key = f"{address[0]}:{address[1]}" if isinstance(address, tuple) else str(address)
+        with self._lock:
+            return self._pools.setdefault(key, {
+                'max_pool_size': None,
+                'checked_out': 0,
+                'peak_checked_out': 0,
+                'connections_open': 0,
+                'checkout_failures': 0,
+                'pool_cleared': 0
+            })
+
+    def _record_wait(self):
+        started = getattr(self._local, 'checkout_started', None)
+        self._local.checkout_started = None
+        if started is None:
+            return
+
+        # Checkout events are also published on the calling thread
+        route = current_route()
+        with self._lock:
+            wait = self._checkout_wait.setdefault(route, Histogram())
+        wait.observe((time.perf_counter() - started) * 1000.0)
+
+    def pool_created(self, event):
+        # Options only list non-default settings
+        self._pool(event.address)['max_pool_size'] = event.options.get('maxPoolSize', MAX_POOL_SIZE)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pool = self._pool(event.address)
+        with self._lock:
+            pool['pool_cleared'] += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pool = self._pool(event.address)
+        with self._lock:
+            pool['connections_open'] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pool = self._pool(event.address)
+        with self._lock:
+            pool['connections_open'] = max(pool['connections_open'] - 1, 0)
+
+    def connection_check_out_started(self, event):
+        self._local.checkout_started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        self._record_wait()
+        pool = self._pool(event.address)
+        with self._lock:
+            pool['checkout_failures'] += 1
+
+    def connection_checked_out(self, event):
+        self._record_wait()
+        pool = self._pool(event.address)
+        with self._lock:
+            pool['checked_out'] += 1
+            pool['peak_checked_out'] = max(pool['peak_checked_out'], pool['checked_out'])
+
+    def connection_checked_in(self, event):
+        pool = self._pool(event.address)
+        with self._lock:
+            pool['checked_out'] = max(pool['checked_out'] - 1, 0)
+
+    def snapshot(self):
+        """
+        Get pool statistics
+
+        Returns:
+            Dictionary with per-route checkout wait histograms and per-server pool state
+        """
+        with self._lock:
+            pools = {address: dict(pool) for address, pool in self._pools.items()}
+            checkout_wait = dict(self._checkout_wait)
+
+        for pool in pools.values():
+            max_size = pool['max_pool_size']
+            pool['saturation'] = round(pool['checked_out'] / max_size, 4) if max_size else None
+            pool['peak_saturation'] = round(pool['peak_checked_out'] / max_size, 4) if max_size else None
+
+        return {
+            'checkout_wait_ms': {route: checkout_wait[route].snapshot() for route in sorted(checkout_wait)},
+            'pools': pools
+        }
+
+command_metrics = CommandMetrics()
+pool_metrics = PoolMetrics()
+
+register_metrics('mongo_commands', command_metrics.snapshot)
+register_metrics('mongo_pool', pool_metrics.snapshot)
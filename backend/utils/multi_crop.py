@@ -0,0 +1,188 @@
+"""
+Multi-region ingredient detection
+
+A photo of a fridge shelf holds many ingredients, but a single centered
+224x224 view only yields labels for whatever dominates the frame. Here the
+image is split into a grid of overlapping tiles plus a few high-detail
+(saliency) regions, all crops are stacked into one batch for a single
+forward pass, and the per-region predictions are merged into one
+deduplicated ingredient list.
+"""
+import os
+import numpy as np
+from PIL import Image
+from utils.image_preprocessing import images_to_batch
+
+MULTI_CROP_GRID = int(os.getenv('MULTI_CROP_GRID', 2))
+MULTI_CROP_SALIENCY = int(os.getenv('MULTI_CROP_SALIENCY', 3))
+MULTI_CROP_THRESHOLD = float(os.getenv('MULTI_CROP_THRESHOLD', 0.3))
+MULTI_CROP_MAX_RESULTS = int(os.getenv('MULTI_CROP_MAX_RESULTS', 10))
+
+SALIENCY_MAP_SIZE = 64
+
+def grid_boxes(width, height, rows=2, cols=2, overlap=0.25):
+    """
+    Split an image into a grid of overlapping tiles
+
+    Args:
+        width: Image width
+        height: Image height
+        rows: Number of tile rows
+        cols: Number of tile columns
+        overlap: Fraction by which neighbouring tiles overlap
+
+    Returns:
+        List of (left, top, right, bottom) boxes
+    """
+    tile_w = width / (cols - (cols - 1) * overlap)
+    tile_h = height / (rows - (rows - 1) * overlap)
+    step_w = tile_w * (1 - overlap)
+    step_h = tile_h * (1 - overlap)
+
+    boxes = []
+    for row in range(rows):
+        for col in range(cols):
+            left = int(round(col * step_w))
+            top = int(round(row * step_h))
+            boxes.append((left, top, min(int(round(left + tile_w)), width), min(int(round(top + tile_h)), height)))
+    return boxes
+
+def saliency_boxes(image, num_boxes=3, box_fraction=0.4):
+    """
+    Propose square regions with the most edge detail
+
+    Edge energy is computed on a small grayscale copy; window sums come
+    from an integral image, and windows are picked greedily while
+    suppressing heavily overlapping ones.
+
+    Args:
+        image: PIL Image
+        num_boxes: Number of regions to propose
+        box_fraction: Region side as a fraction of the image side
+
+    Returns:
+        List of (left, top, right, bottom) boxes in original coordinates
+    """
+    if num_boxes <= 0:
+        return []
+
+    size = SALIENCY_MAP_SIZE
+    small = np.asarray(image.convert('L').resize((size, size), Image.Resampling.BILINEAR), dtype=np.float32)
+
+    energy = np.zeros((size, size), dtype=np.float32)
+    energy[:, 1:] += np.abs(np.diff(small, axis=1))
+    energy[1:, :] += np.abs(np.diff(small, axis=0))
+
+    window = max(int(size * box_fraction), 1)
+    integral = np.zeros((size + 1, size + 1), dtype=np.float64)
+    integral[1:, 1:] = energy.cumsum(axis=0).cumsum(axis=1)
+    sums = (integral[window:, window:] - integral[:-window, window:]
+            - integral[window:, :-window] + integral[:-window, :-window])
+
+    scale_x = image.width / size
+    scale_y = image.height / size
+    suppress = max(window // 2, 1)
+
+    boxes = []
+    for _ in range(num_boxes):
+        y, x = np.unravel_index(np.argmax(sums), sums.shape)
+        if not np.isfinite(sums[y, x]) or sums[y, x] <= 0:
+            break
+
+        boxes.append((
+            int(x * scale_x),
+            int(y * scale_y),
+            min(int((x + window) * scale_x), image.width),
+            min(int((y + window) * scale_y), image.height)
+        ))
+        sums[max(y - suppress, 0):y + suppress + 1, max(x - suppress, 0):x + suppress + 1] = -np.inf
+
+    return boxes
+
+def generate_crop_boxes(image, grid=MULTI_CROP_GRID, num_saliency=MULTI_CROP_SALIENCY):
+    """
+    Build the list of regions to classify (full image first)
+
+    Args:
+        image: PIL Image
+        grid: Grid size (grid x grid tiles, 0 or 1 disables tiling)
+        num_saliency: Number of saliency regions
+
+    Returns:
+        List of (left, top, right, bottom) boxes
+    """
+    boxes = [(0, 0, image.width, image.height)]
+    if grid > 1:
+        boxes.extend(grid_boxes(image.width, image.height, rows=grid, cols=grid))
+    boxes.extend(saliency_boxes(image, num_boxes=num_saliency))
+    return boxes
+
+def crops_to_batch(image, boxes, target_size=(224, 224)):
+    """
+    Resize every region and write it into one model-ready float32 batch
+
+    Args:
+        image: RGB PIL Image
+        boxes: List of (left, top, right, bottom) boxes
+        target_size: Model input size
+
+    Returns:
+        numpy float32 array of shape (N, H, W, 3) scaled to [-1, 1]
+    """
+    crops = [image.resize(target_size, Image.Resampling.BILINEAR, box=box, reducing_gap=2.0) for box in boxes]
+    return images_to_batch(crops)
+
+def aggregate_region_predictions(probabilities, class_names, threshold=MULTI_CROP_THRESHOLD, max_results=MULTI_CROP_MAX_RESULTS):
+    """
+    Merge per-region class probabilities into one ingredient list
+
+    Each class keeps its highest confidence across regions. Classes below
+    the threshold are dropped, except the full image's top prediction so the
+    result is never empty.
+
+    Args:
+        probabilities: Array of shape (N, num_classes), row 0 is the full image
+        class_names: List of class names
+        threshold: Minimum confidence for region detections
+        max_results: Maximum number of ingredients returned
+
+    Returns:
+        List of dicts with 'name', 'confidence' and 'regions'
+    """
+    probabilities = np.asarray(probabilities)
+    best = probabilities.max(axis=0)
+    regions = (probabilities >= threshold).sum(axis=0)
+
+    keep = set(np.flatnonzero(best >= threshold).tolist())
+    keep.add(int(np.argmax(probabilities[0])))
+
+    results = []
+    for idx in sorted(keep, key=lambda i: best[i], reverse=True)[:max_results]:
+        results.append({
+            'name': class_names[idx] if idx < len(class_names) else f"class_{idx}",
+            'confidence': float(best[idx]),
+            'regions': int(regions[idx])
+        })
+    return results
+
+def predict_ingredients_multi_crop(image, model=None, target_size=(224, 224)):
+    """
+    Detect multiple ingredients in one batched forward pass
+
+    Args:
+        image: RGB PIL Image
+        model: Recognition model (defaults to the shared model)
+        target_size: Model input size
+
+    Returns:
+        Deduplicated list of ingredient predictions
+    """
+    if model is None:
+        from models.ingredient_recognition import get_model
+        model = get_model()
+
+    boxes = generate_crop_boxes(image)
+    batch = crops_to_batch(image, boxes, target_size)
+    probabilities, labels = model.predict_labeled('predict', batch)
+
+    return aggregate_region_predictions(probabilities, labels['class_names'])
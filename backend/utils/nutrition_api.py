@@ -1,5 +1,7 @@
 import requests
 import os
+import json
+import hashlib
 from dotenv import load_dotenv
 from functools import lru_cache
 
@@ -8,6 +10,60 @@ load_dotenv()
 USDA_API_KEY = os.getenv('USDA_API_KEY')
 USDA_BASE_URL = 'https://api.nal.usda.gov/fdc/v1'
 
+# Bump whenever the unit conversion or USDA matching logic changes so that
+# nutrition stored on recipes by an older calculator is recomputed.
+NUTRITION_CALCULATOR_VERSION = 1
+
+class NutritionLookupError(Exception):
+    """A USDA API request failed (as opposed to finding no match)"""
+
+def compute_ingredients_hash(ingredients):
+    """
+    Compute a stable hash of a recipe's ingredient list
+    
+    Only the fields that affect the nutrition result (name, quantity, unit)
+    are hashed, and ingredient order is ignored.
+    
+    Args:
+        ingredients: List of ingredient dicts with 'name', 'quantity', 'unit'
+    
+    Returns:
+        Hex digest string
+    """
+    normalized = []
+    for ingredient in ingredients:
+        if isinstance(ingredient, dict):
+            normalized.append([
+                str(ingredient.get('name', '')).strip().lower(),
+                str(ingredient.get('quantity', '')).strip().lower(),
+                str(ingredient.get('unit', '')).strip().lower()
+            ])
+        else:
+            normalized.append([str(ingredient).strip().lower(), '', ''])
+    
+    normalized.sort()
+    payload = json.dumps(normalized, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def is_nutrition_current(nutrition, ingredients):
+    """
+    Check whether stored nutrition still matches the recipe's ingredients
+    
+    Args:
+        nutrition: Nutrition dict stored on the recipe (may be None)
+        ingredients: Current ingredient list of the recipe
+    
+    Returns:
+        Boolean indicating if the stored value can be served as-is
+    """
+    if not nutrition or not nutrition.get('calculated'):
+        return False
+    
+    if nutrition.get('calculator_version') != NUTRITION_CALCULATOR_VERSION:
+        return False
+    
+    return nutrition.get('ingredients_hash') == compute_ingredients_hash(ingredients)
+
 @lru_cache(maxsize=1000)
 def search_food(query, page_size=10):
     """
@@ -19,6 +75,9 @@ def search_food(query, page_size=10):
     
     Returns:
         List of food items with FDC IDs
+    
+    Raises:
+        NutritionLookupError: If the request failed (failures are not cached)
     """
     try:
         url = f"{USDA_BASE_URL}/foods/search"
@@ -66,7 +125,7 @@ def search_food(query, page_size=10):
         
     except Exception as e:
         print(f"Error searching food '{query}': {e}")
-        return []
+        raise NutritionLookupError(f"Food search failed for '{query}': {e}")
 
 @lru_cache(maxsize=500)
 def get_nutrition(fdc_id):
@@ -78,6 +137,9 @@ def get_nutrition(fdc_id):
     
     Returns:
         Dictionary with nutrition per 100g
+    
+    Raises:
+        NutritionLookupError: If the request failed (failures are not cached)
     """
     try:
         url = f"{USDA_BASE_URL}/food/{fdc_id}"
@@ -118,7 +180,7 @@ def get_nutrition(fdc_id):
         
     except Exception as e:
         print(f"Error getting nutrition for FDC ID {fdc_id}: {e}")
-        return None
+        raise NutritionLookupError(f"Nutrition lookup failed for FDC ID {fdc_id}: {e}")
 
 def calculate_recipe_nutrition(ingredients):
     """
@@ -128,7 +190,9 @@ def calculate_recipe_nutrition(ingredients):
         ingredients: List of ingredient dicts with 'name', 'quantity', 'unit'
     
     Returns:
-        Dictionary with total nutrition values
+        Dictionary with total nutrition values. If any USDA lookup failed,
+        'lookup_errors' counts the failures and no 'ingredients_hash' is
+        set, so the partial result is never treated as current.
     """
     total_nutrition = {
         'calories': 0,
@@ -139,6 +203,7 @@ def calculate_recipe_nutrition(ingredients):
     }
     
     successful_matches = 0
+    lookup_errors = 0
     
     for ingredient in ingredients:
         try:
@@ -262,6 +327,9 @@ def calculate_recipe_nutrition(ingredients):
             
             successful_matches += 1
             
+        except NutritionLookupError:
+            lookup_errors += 1
+            continue
         except Exception as e:
             print(f"Error processing ingredient {ingredient.get('name')}: {e}")
             continue
@@ -273,5 +341,10 @@ def calculate_recipe_nutrition(ingredients):
     total_nutrition['fat'] = round(total_nutrition['fat'], 1)
     total_nutrition['ingredients_matched'] = successful_matches
     total_nutrition['total_ingredients'] = len(ingredients)
+    total_nutrition['calculator_version'] = NUTRITION_CALCULATOR_VERSION
+    if lookup_errors:
+        total_nutrition['lookup_errors'] = lookup_errors
+    else:
+        total_nutrition['ingredients_hash'] = compute_ingredients_hash(ingredients)
     
     return total_nutrition
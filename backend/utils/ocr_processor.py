@@ -1,30 +1,51 @@
-import pytesseract
 from PIL import Image
 import re
 import io
 
-# Configure Tesseract path (update based on installation)
-# Windows: pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+# Bump when OCR cleaning/parsing changes so cached OCR results are ignored
+OCR_PIPELINE_VERSION = 'tesseract-1'
+
+_pytesseract = None
+
+def get_pytesseract():
+    """
+    Import and configure pytesseract on first use
+    
+    Keeps the OCR dependency out of processes that never run OCR.
+    """
+    global _pytesseract
+    if _pytesseract is None:
+        import pytesseract
+        
+        # Configure Tesseract path (update based on installation)
+        # Windows: pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+        pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+        _pytesseract = pytesseract
+    return _pytesseract
+
 def extract_text_from_image(image_file):
     """
     Extract text from image using Tesseract OCR
     
     Args:
-        image_file: File object or path to image
+        image_file: File object, path to image, or decoded PIL Image
     
     Returns:
         Extracted text string
     """
+    pytesseract = get_pytesseract()
+    
     try:
         # Load image
-        if isinstance(image_file, str):
+        if isinstance(image_file, Image.Image):
+            image = image_file
+        elif isinstance(image_file, str):
             image = Image.open(image_file)
         else:
             image = Image.open(io.BytesIO(image_file.read()))
         
-        # Convert to RGB if necessary
-        if image.mode != 'RGB':
+        # Convert to RGB if necessary (grayscale is passed through as-is)
+        if image.mode not in ('RGB', 'L'):
             image = image.convert('RGB')
         
         # Extract text
@@ -128,7 +149,7 @@ def process_packaged_food_image(image_file):
     Complete OCR pipeline for packaged food images
     
     Args:
-        image_file: File object or path to image
+        image_file: File object, path to image, or decoded PIL Image
     
     Returns:
         Dictionary with extracted text and parsed ingredients
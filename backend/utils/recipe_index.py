@@ -0,0 +1,172 @@
+"""
+Token index over recipe names and categories
+
+Maps each normalized word of a recipe's name and category to the set of
+recipe IDs containing it, so dish-to-recipe lookups touch only matching
+recipes instead of substring-scanning the whole catalog. Query words are
+also matched as substrings of the indexed words (scanning the vocabulary,
+not the recipes), so partial names such as "carbon" or "pizza" still find
+"Carbonara" and "Chicken Pizzaiola". The index holds only IDs and is
+rebuilt from a name/category projection when it expires; the rebuild runs
+outside the lock and the previous index keeps serving until it is swapped in.
+"""
+import os
+import re
+import threading
+import time
+from utils.metrics import register_metrics
+
+RECIPE_INDEX_TTL = float(os.getenv('RECIPE_INDEX_TTL', 300))
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Shorter query words only match whole words ("ch" would match "chicken")
+MIN_SUBSTRING_LENGTH = 3
+
+def normalize_token(token):
+    """Fold simple plurals so 'tacos' matches 'taco' and 'noodles' matches 'noodle'"""
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+def tokenize(text):
+    """
+    Split text into normalized lowercase word tokens
+
+    Args:
+        text: Any string (None is treated as empty)
+
+    Returns:
+        Set of tokens
+    """
+    return {normalize_token(t) for t in TOKEN_PATTERN.findall((text or '').lower())}
+
+class RecipeIndex:
+    def __init__(self, recipes):
+        """
+        Build the index
+
+        Args:
+            recipes: Iterable of recipe documents with _id, name and category
+        """
+        self.name_tokens = {}
+        self.category_tokens = {}
+        self.size = 0
+
+        for recipe in recipes:
+            recipe_id = recipe['_id']
+            self.size += 1
+            for token in tokenize(recipe.get('name')):
+                self.name_tokens.setdefault(token, set()).add(recipe_id)
+            for token in tokenize(recipe.get('category')):
+                self.category_tokens.setdefault(token, set()).add(recipe_id)
+
+    def search(self, query, limit=None):
+        """
+        Find recipes whose name or category shares words with the query
+
+        Recipes are ranked by how many query words they match, with name
+        matches weighted above category matches and whole-word matches above
+        words that only contain the query word.
+
+        Args:
+            query: Search text, e.g. a dish name
+            limit: Maximum number of IDs to return
+
+        Returns:
+            List of recipe IDs, best match first
+        """
+        scores = {}
+        for term in tokenize(query):
+            for tokens, weight in ((self.name_tokens, 2), (self.category_tokens, 1)):
+                # A recipe counts once per term and field, at its best match
+                best = {}
+                for token in self._matching_tokens(tokens, term):
+                    boost = 2 if token == term else 1
+                    for recipe_id in tokens[token]:
+                        best[recipe_id] = max(best.get(recipe_id, 0), boost)
+                for recipe_id, boost in best.items():
+                    scores[recipe_id] = scores.get(recipe_id, 0) + weight * boost
+
+        ranked = sorted(scores, key=lambda recipe_id: (-scores[recipe_id], str(recipe_id)))
+        return ranked[:limit] if limit else ranked
+
+    @staticmethod
+    def _matching_tokens(tokens, term):
+        """Indexed words equal to or containing the query word"""
+        if len(term) < MIN_SUBSTRING_LENGTH:
+            return [term] if term in tokens else []
+        return [token for token in tokens if term in token]
+
+_index = None
+_index_built_at = 0.0
+# Bumped by invalidate_recipe_index; an index built from an older generation is stale
+_index_generation = 0
+_index_built_generation = -1
+# Guards the fields above and is only held briefly; _build_lock serializes rebuilds
+_index_lock = threading.Lock()
+_build_lock = threading.Lock()
+_index_stats = {'builds': 0, 'last_build_ms': None}
+
+def _index_is_fresh(ttl):
+    return (_index is not None and _index_built_generation == _index_generation
+            and time.time() - _index_built_at <= ttl)
+
+def get_recipe_index(loader=None, ttl=RECIPE_INDEX_TTL):
+    """
+    Get the shared recipe index, rebuilding it when older than ttl or invalidated
+
+    One thread rebuilds the index while the others keep using the previous
+    one, so requests only wait for the very first build.
+
+    Args:
+        loader: Callable returning recipe documents with _id, name and
+                category (defaults to RecipeDB.get_recipe_summaries)
+        ttl: Seconds before the index is rebuilt
+
+    Returns:
+        RecipeIndex
+    """
+    global _index, _index_built_at, _index_built_generation
+    with _index_lock:
+        if _index_is_fresh(ttl):
+            return _index
+        current = _index
+
+    if not _build_lock.acquire(blocking=current is None):
+        return current
+    try:
+        with _index_lock:
+            if _index_is_fresh(ttl):
+                return _index
+            generation = _index_generation
+
+        if loader is None:
+            from models.database import RecipeDB
+            loader = RecipeDB.get_recipe_summaries
+
+        start = time.perf_counter()
+        index = RecipeIndex(loader())
+        build_ms = round((time.perf_counter() - start) * 1000.0, 3)
+
+        with _index_lock:
+            _index = index
+            _index_built_at = time.time()
+            _index_built_generation = generation
+            _index_stats['builds'] += 1
+            _index_stats['last_build_ms'] = build_ms
+        return index
+    finally:
+        _build_lock.release()
+
+def invalidate_recipe_index():
+    """Make the next lookup rebuild the index (the current one serves until then)"""
+    global _index_generation
+    with _index_lock:
+        _index_generation += 1
+
+def recipe_index_stats():
+    with _index_lock:
+        return dict(_index_stats, size=_index.size if _index else 0, tokens=len(_index.name_tokens) if _index else 0)
+
+register_metrics('recipe_index', recipe_index_stats)
@@ -0,0 +1,242 @@
+"""
+Result cache for image recognition endpoints
+
+Exact re-uploads are found by SHA-256 of the raw bytes without decoding.
+Near-duplicate shots are found by comparing perceptual hashes of the decoded
+image within a configurable Hamming distance; results stored as exact-only
+(anything derived from OCR text) are never served to near duplicates. Entries are tagged with the
+version of whatever produced them (model version, OCR pipeline version) and
+ignored once that version changes.
+"""
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from utils.metrics import register_metrics
+
+RECOGNITION_CACHE_ENABLED = os.getenv('RECOGNITION_CACHE_ENABLED', 'True') == 'True'
+RECOGNITION_CACHE_SIZE = int(os.getenv('RECOGNITION_CACHE_SIZE', 512))
+RECOGNITION_CACHE_HAMMING = int(os.getenv('RECOGNITION_CACHE_HAMMING', 6))
+RECOGNITION_CACHE_DIR = os.getenv('RECOGNITION_CACHE_DIR', '')
+RECOGNITION_CACHE_DISK_SIZE = int(os.getenv('RECOGNITION_CACHE_DISK_SIZE', 10000))
+RECOGNITION_CACHE_PRUNE_EVERY = int(os.getenv('RECOGNITION_CACHE_PRUNE_EVERY', 100))
+
+def hamming_distance(a, b):
+    """Number of differing bits between two integer hashes"""
+    return bin(a ^ b).count('1')
+
+class RecognitionCache:
+    def __init__(self, max_entries=512, hamming_threshold=6, disk_dir=None, max_disk_entries=10000, prune_every=100):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Maximum number of images kept in memory
+            hamming_threshold: Maximum perceptual hash distance for a near hit
+                               (negative disables near-duplicate matching)
+            disk_dir: Directory evicted entries spill to (None keeps memory only)
+            max_disk_entries: Maximum number of spilled entries kept on disk
+                              (may be exceeded by up to prune_every entries)
+            prune_every: Number of spills between disk prunes
+        """
+        self.max_entries = max_entries
+        self.hamming_threshold = hamming_threshold
+        self.disk_dir = disk_dir
+        self.max_disk_entries = max_disk_entries
+        self.prune_every = max(1, prune_every)
+        self._spills_since_prune = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, sha256):
+        return os.path.join(self.disk_dir, f'{sha256}.json')
+
+    def _load_from_disk(self, sha256):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(sha256), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _spill_to_disk(self, sha256, entry):
+        if not self.disk_dir:
+            return
+        try:
+            # Write to a temp file and rename, so readers in other workers
+            # never see a partially written entry
+            with tempfile.NamedTemporaryFile('w', dir=self.disk_dir, suffix='.tmp', delete=False) as f:
+                temp_path = f.name
+                json.dump(entry, f)
+            os.replace(temp_path, self._disk_path(sha256))
+        except OSError as e:
+            print(f"Recognition cache spill failed: {e}")
+            return
+
+        # Listing the directory is O(entries), so only prune every few spills
+        with self._lock:
+            self._spills_since_prune += 1
+            if self._spills_since_prune < self.prune_every:
+                return
+            self._spills_since_prune = 0
+        self._prune_disk()
+
+    def _prune_disk(self):
+        """Remove the oldest spilled entries beyond max_disk_entries"""
+        try:
+            files = [os.path.join(self.disk_dir, name) for name in os.listdir(self.disk_dir) if name.endswith('.json')]
+            if len(files) <= self.max_disk_entries:
+                return
+
+            mtimes = {}
+            for path in files:
+                try:
+                    mtimes[path] = os.path.getmtime(path)
+                except OSError:
+                    pass  # Removed by another worker
+            oldest = sorted(mtimes, key=mtimes.get)
+            for path in oldest[:len(oldest) - self.max_disk_entries]:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        except OSError as e:
+            print(f"Recognition cache prune failed: {e}")
+
+    def get(self, kind, sha256, version, phash_fn=None):
+        """
+        Look up a cached result
+
+        Args:
+            kind: Result type, e.g. 'recognize', 'ocr' or 'dish'
+            sha256: SHA-256 of the raw image bytes
+            version: Version tag the result must have been produced with
+            phash_fn: Optional callable returning the perceptual hash; only
+                      called when there is no exact hit
+
+        Returns:
+            Cached result or None
+        """
+        with self._lock:
+            entry = self._entries.get(sha256)
+            if entry is not None:
+                self._entries.move_to_end(sha256)
+                cached = entry['results'].get(kind)
+                if cached and cached['version'] == version:
+                    self.exact_hits += 1
+                    return cached['value']
+
+        if entry is None:
+            entry = self._load_from_disk(sha256)
+            cached = entry['results'].get(kind) if entry else None
+            if cached and cached['version'] == version:
+                with self._lock:
+                    self._entries[sha256] = entry
+                    self.disk_hits += 1
+                self._evict()
+                return cached['value']
+
+        if phash_fn is not None and self.hamming_threshold >= 0:
+            phash = phash_fn()
+            with self._lock:
+                best = None
+                for candidate in self._entries.values():
+                    cached = candidate['results'].get(kind)
+                    if not cached or cached['version'] != version or candidate['phash'] is None:
+                        continue
+                    if not cached.get('near_duplicates', True):
+                        continue
+                    distance = hamming_distance(phash, candidate['phash'])
+                    if distance <= self.hamming_threshold and (best is None or distance < best[0]):
+                        best = (distance, cached['value'])
+
+                if best is not None:
+                    self.near_hits += 1
+                    return best[1]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, kind, sha256, version, value, phash=None, near_duplicates=True):
+        """
+        Store a result
+
+        Args:
+            kind: Result type
+            sha256: SHA-256 of the raw image bytes
+            version: Version tag of the producer
+            value: JSON-serializable result
+            phash: Perceptual hash of the decoded image (optional, ignored
+                   for exact-only results)
+            near_duplicates: Whether the result may be served for
+                             perceptually similar images
+        """
+        if not near_duplicates:
+            phash = None
+
+        with self._lock:
+            entry = self._entries.get(sha256)
+            if entry is None:
+                entry = {'phash': phash, 'results': {}}
+                self._entries[sha256] = entry
+            elif phash is not None:
+                entry['phash'] = phash
+
+            entry['results'][kind] = {'version': version, 'value': value, 'near_duplicates': near_duplicates}
+            self._entries.move_to_end(sha256)
+
+        self._evict()
+
+    def _evict(self):
+        spilled = []
+        with self._lock:
+            while len(self._entries) > self.max_entries:
+                spilled.append(self._entries.popitem(last=False))
+                self.evictions += 1
+
+        for sha256, entry in spilled:
+            self._spill_to_disk(sha256, entry)
+
+    def stats(self):
+        """
+        Get cache statistics
+
+        Returns:
+            Dictionary with size and hit counters
+        """
+        with self._lock:
+            hits = self.exact_hits + self.near_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'hamming_threshold': self.hamming_threshold,
+                'disk_dir': self.disk_dir,
+                'exact_hits': self.exact_hits,
+                'near_hits': self.near_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions
+            }
+
+recognition_cache = RecognitionCache(
+    max_entries=RECOGNITION_CACHE_SIZE,
+    hamming_threshold=RECOGNITION_CACHE_HAMMING,
+    disk_dir=RECOGNITION_CACHE_DIR or None,
+    max_disk_entries=RECOGNITION_CACHE_DISK_SIZE,
+    prune_every=RECOGNITION_CACHE_PRUNE_EVERY
+)
+register_metrics('recognition_cache', recognition_cache.stats)
@@ -1,5 +1,3 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 
 def create_recipe_text(recipe):
@@ -60,7 +58,10 @@ def content_based_filtering(user_ingredients, recipes, top_n=10):
     # Add user query to corpus
     corpus = [user_query] + recipe_texts
     
-    # Create TF-IDF vectors
+    # Create TF-IDF vectors (scikit-learn is only imported when this method runs)
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import cosine_similarity
+    
     vectorizer = TfidfVectorizer(stop_words='english', max_features=1000)
     tfidf_matrix = vectorizer.fit_transform(corpus)
     
@@ -165,20 +166,85 @@ def hybrid_recommendation(user_ingredients, recipes, top_n=10, alpha=0.9):
     
     return sorted_recipes[:top_n]
 
+def build_ingredient_match_pipeline(user_ingredients, top_n=10):
+    """
+    Build a Mongo aggregation pipeline that scores recipes by ingredient overlap
+    
+    The score matches calculate_match_score (fraction of user ingredients
+    found in the recipe), but uses exact case-insensitive name matches
+    instead of fuzzy matching so it can run on the ingredient index. Names
+    are trimmed on both sides, as the in-Python matcher does; the $match
+    stage relies on stored names being trimmed at write time
+    (RecipeDB.create_recipe and trim_ingredient_names).
+    
+    Args:
+        user_ingredients: List of user's ingredients
+        top_n: Number of recipes to return
+    
+    Returns:
+        Aggregation pipeline list
+    """
+    names = sorted({ing.lower().strip() for ing in user_ingredients if ing and ing.strip()})
+    
+    return [
+        # Uses the multikey index on ingredients.name
+        {'$match': {'ingredients.name': {'$in': names}}},
+        {'$addFields': {
+            '_recipe_ingredient_names': {
+                '$map': {
+                    'input': {'$ifNull': ['$ingredients', []]},
+                    'as': 'ing',
+                    'in': {'$trim': {'input': {'$toLower': {'$ifNull': ['$$ing.name', '']}}}}
+                }
+            }
+        }},
+        {'$addFields': {
+            'match_score': {
+                '$divide': [
+                    {'$size': {'$setIntersection': [names, '$_recipe_ingredient_names']}},
+                    max(len(names), 1)
+                ]
+            }
+        }},
+        {'$sort': {'match_score': -1, '_id': 1}},
+        {'$limit': top_n},
+        {'$unset': '_recipe_ingredient_names'}
+    ]
+
+def db_ingredient_matching(user_ingredients, top_n=10):
+    """
+    Ingredient matching executed inside MongoDB
+    
+    Args:
+        user_ingredients: List of user's ingredients
+        top_n: Number of recommendations
+    
+    Returns:
+        List of top N recipes with 'match_score' set
+    """
+    pipeline = build_ingredient_match_pipeline(user_ingredients, top_n)
+    if not pipeline[0]['$match']['ingredients.name']['$in']:
+        return []
+    
+    from models.database import RecipeDB
+    return RecipeDB.aggregate_by_ingredients(pipeline)
+
 def get_recommendations(user_ingredients, recipes, method='hybrid', top_n=10):
     """
     Get recipe recommendations
     
     Args:
         user_ingredients: List of user's ingredients
-        recipes: List of recipe dictionaries
-        method: 'hybrid', 'content', or 'ingredient'
+        recipes: List of recipe dictionaries (unused for 'db', may be None)
+        method: 'hybrid', 'content', 'ingredient', or 'db'
         top_n: Number of recommendations
     
     Returns:
         List of recommended recipes
     """
-    if method == 'content':
+    if method == 'db':
+        return db_ingredient_matching(user_ingredients, top_n)
+    elif method == 'content':
         return content_based_filtering(user_ingredients, recipes, top_n)
     elif method == 'ingredient':
         from utils.ingredient_matcher import rank_recipes_by_ingredients